@@ -0,0 +1,139 @@
+import datetime
+from typing import cast
+import numpy as np
+import pandas as pd
+from src.store import DATE_COLUMN, TransactionStore, require_dates
+
+
+CARD_COLUMN = 'Номер карты'
+AMOUNT_COLUMN = 'Сумма платежа'
+CASHBACK_COLUMN = 'Кэшбэк'
+MONTH_LEVEL = 'Месяц'
+DAY_LEVEL = 'День'
+# Кэшбэк: 1 рубль на каждые 100 рублей расходов, то есть на каждые 10000 копеек
+KOPECKS_PER_CASHBACK_RUBLE = 100 * 100
+
+
+def daily_card_totals(df: pd.DataFrame) -> pd.DataFrame:
+    '''Агрегирует расходы (отрицательные суммы платежа в копейках) по ключу (месяц, номер карты, день).
+    Операции без номера карты собираются в отдельную группу с пустым номером'''
+
+    payments = df.loc[df[AMOUNT_COLUMN] < 0, [DATE_COLUMN, CARD_COLUMN, AMOUNT_COLUMN]]
+    dates = payments[DATE_COLUMN]
+    keys = [dates.dt.to_period('M').rename(MONTH_LEVEL), card_keys(payments[CARD_COLUMN]),
+            dates.dt.day.rename(DAY_LEVEL)]
+    return payments[[AMOUNT_COLUMN]].groupby(keys, dropna=False).sum()
+
+
+def card_keys(cards: pd.Series) -> pd.Series:
+    '''Номера карт для группировки: категории приводятся к строкам, чтобы в группах были только
+    встречающиеся карты, а пропуски остаются NaN'''
+
+    if isinstance(cards.dtype, pd.CategoricalDtype):
+        return cards.astype(object)
+    return cards
+
+
+def cards_with_none(cards: pd.Series) -> pd.Series:
+    '''Заменяет пропущенный номер карты на None (null в JSON)'''
+
+    return cards.astype(object).where(cards.notna(), None)
+
+
+def cashback_rubles(total_kopecks: int) -> int:
+    '''Кэшбэк по правилу 1 рубль на каждые полные 100 рублей расходов'''
+
+    return abs(int(total_kopecks)) // KOPECKS_PER_CASHBACK_RUBLE
+
+
+def card_totals_records(totals: pd.DataFrame) -> list[dict]:
+    '''Переводит суммы расходов по картам в копейках в список словарей для ответа:
+    номер карты (None для операций без карты), сумма в рублях и кэшбэк в рублях'''
+
+    return [{CARD_COLUMN: card, AMOUNT_COLUMN: int(kopecks) / 100, CASHBACK_COLUMN: cashback_rubles(kopecks)}
+            for card, kopecks in zip(cards_with_none(totals[CARD_COLUMN]), totals[AMOUNT_COLUMN])]
+
+
+class CardMonthlyCube:
+    '''Предрасчитанная таблица сумм платежей и кэшбэка по картам с ключом (карта, месяц, день).
+    Сумма с начала месяца складывается из нескольких дневных строк таблицы и операций текущего дня,
+    вместо повторной группировки всех операций за месяц'''
+
+    def __init__(self, store: TransactionStore) -> None:
+        self._store = store
+        self._daily = daily_card_totals(store.df)
+
+    @property
+    def daily(self) -> pd.DataFrame:
+        '''Дневные суммы с индексом (месяц, номер карты, день)'''
+
+        return self._daily
+
+    def update(self, new_rows: pd.DataFrame) -> None:
+        '''Добавляет в таблицу новые операции. Суммируются только агрегаты новых строк
+        с уже посчитанными дневными строками, сырые операции повторно не группируются'''
+
+        added = daily_card_totals(new_rows)
+        if added.empty:
+            return
+        self._daily = pd.concat([self._daily, added]).groupby(level=[0, 1, 2], dropna=False).sum()
+
+    def month_to_date(self, input_date: datetime.datetime) -> pd.DataFrame:
+        '''Возвращает по каждой карте абсолютную сумму расходов в копейках с начала месяца до input_date
+        включительно: полные дни берутся из таблицы, текущий день - из операций до input_date'''
+
+        month = pd.Period(input_date, 'M')
+        start_of_day = input_date.replace(hour=0, minute=0, second=0, microsecond=0)
+        parts = []
+        # Полные дни месяца до текущего: не больше 31 строки на карту
+        if month in cast(pd.MultiIndex, self._daily.index).levels[0]:
+            month_rows = self._daily.xs(month, level=0)
+            parts.append(month_rows[month_rows.index.get_level_values(DAY_LEVEL) < input_date.day]
+                         .droplevel(DAY_LEVEL))
+        # Операции текущего дня до переданного времени
+        today = daily_card_totals(self._store.window(start_of_day, input_date))
+        parts.append(today.droplevel([0, 2]))
+
+        totals = pd.concat(parts).groupby(level=0, dropna=False).sum()
+        totals.index.name = CARD_COLUMN
+        totals[AMOUNT_COLUMN] = totals[AMOUNT_COLUMN].abs()
+        return totals.reset_index()
+
+
+def card_cube(store: TransactionStore) -> CardMonthlyCube:
+    '''Возвращает таблицу агрегатов по картам для хранилища. Таблица строится один раз
+    и дальше обновляется инкрементально при добавлении операций в хранилище'''
+
+    cube: CardMonthlyCube = store.derived('card_cube', CardMonthlyCube)
+    return cube
+
+
+def month_to_date_totals_batch(store: TransactionStore, input_dates: list[datetime.datetime]) -> list[list[dict]]:
+    '''Суммы расходов и кэшбэка по картам с начала месяца сразу для многих дат за один проход.
+    Для каждой карты считаются накопленные суммы по отсортированным операциям в копейках,
+    и сумма за любой период - разность двух накопленных значений, найденных бинарным поиском.
+    Возвращает для каждой даты список словарей, как process_xlsx_file_with_date_filter'''
+
+    require_dates(store)
+    df = store.df
+    payments = df[df[AMOUNT_COLUMN] < 0]
+    dates = payments[DATE_COLUMN].to_numpy()
+    amounts = payments[AMOUNT_COLUMN].to_numpy(dtype='int64')
+    ends = np.array([np.datetime64(date) for date in input_dates], dtype='datetime64[ns]')
+    starts = np.array([np.datetime64(date.replace(day=1, hour=0, minute=0, second=0)) for date in input_dates],
+                      dtype='datetime64[ns]')
+
+    results: list[list[dict]] = [[] for _ in input_dates]
+    # Карты в том же порядке, что и при группировке операций: по номеру, операции без карты - последними
+    codes, cards = pd.factorize(card_keys(payments[CARD_COLUMN]), sort=True, use_na_sentinel=False)
+    for code, card in enumerate(cards):
+        positions = np.flatnonzero(codes == code)
+        card_dates = dates[positions]
+        cum_amounts = np.concatenate([[0], np.cumsum(amounts[positions])])
+        left = np.searchsorted(card_dates, starts, side='left')
+        right = np.searchsorted(card_dates, ends, side='right')
+        for i in np.nonzero(right > left)[0]:
+            total = abs(int(cum_amounts[right[i]] - cum_amounts[left[i]]))
+            results[i].append({CARD_COLUMN: None if pd.isna(card) else card, AMOUNT_COLUMN: total / 100,
+                               CASHBACK_COLUMN: cashback_rubles(total)})
+    return results
@@ -0,0 +1,71 @@
+from dataclasses import dataclass, field
+from typing import Generic, Iterable, TypeVar
+import pandas as pd
+
+
+T = TypeVar('T')
+
+
+class BankDataError(Exception):
+    '''Базовая ошибка получения данных. retryable - имеет ли смысл повторить запрос позже'''
+
+    retryable = False
+
+
+class DataSourceError(BankDataError):
+    '''Файл с операциями не найден, не читается или поврежден'''
+
+
+class SchemaError(BankDataError):
+    '''В данных нет нужных столбцов или ответ внешнего API имеет неожиданный формат'''
+
+
+class UpstreamError(BankDataError):
+    '''Внешний API вернул ошибку или недоступен. status - код ответа (None, если ответа не было).
+    Повторять имеет смысл при ответах 429/5xx и ошибках соединения'''
+
+    def __init__(self, message: str, status: int | None = None) -> None:
+        super().__init__(message)
+        self.status = status
+        self.retryable = status is None or status == 429 or status >= 500
+
+
+class UpstreamTimeout(UpstreamError):
+    '''Внешний API не ответил за отведенное время'''
+
+
+def error_info(error: BaseException) -> dict:
+    '''Описание ошибки для ответа: тип, сообщение и можно ли повторить запрос'''
+
+    return {"type": type(error).__name__, "message": str(error),
+            "retryable": bool(getattr(error, "retryable", False))}
+
+
+def require_columns(df: pd.DataFrame, columns: Iterable[str]) -> None:
+    '''Проверяет, что в DataFrame есть все нужные столбцы, иначе SchemaError с перечнем недостающих'''
+
+    missing = [column for column in columns if column not in df.columns]
+    if missing:
+        raise SchemaError(f"Нет столбцов: {', '.join(missing)}")
+
+
+@dataclass
+class Result(Generic[T]):
+    '''Результат с данными и описанием ошибок, из-за которых данные могут быть неполными или устаревшими.
+    Позволяет вернуть то, что удалось получить (например, сохраненные курсы при недоступном API),
+    и сообщить вызывающему, что произошло, вместо пустого ответа'''
+
+    data: T
+    errors: dict[str, dict] = field(default_factory=dict)
+    stale: bool = False
+
+    @property
+    def ok(self) -> bool:
+        '''Получены ли данные без ошибок'''
+
+        return not self.errors
+
+    def add_error(self, name: str, error: BaseException) -> None:
+        '''Добавляет описание ошибки источника name'''
+
+        self.errors[name] = error_info(error)
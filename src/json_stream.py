@@ -0,0 +1,55 @@
+import json
+import textwrap
+from typing import Any, Callable, Iterable, Iterator, Sequence
+import numpy as np
+from src.serializer import finite, json_default
+
+
+def _encode(encoder: json.JSONEncoder, record: Any) -> str:
+    '''Кодирует запись; NaN и бесконечности кодируются как null, как в serializer.dumps'''
+
+    try:
+        return encoder.encode(record)
+    except ValueError:
+        return encoder.encode(finite(record))
+
+
+def iter_json_array(records: Iterable[Any], indent: int | None = None,
+                    default: Callable[[Any], Any] = json_default) -> Iterator[str]:
+    '''Кодирует последовательность записей в JSON-массив по частям: одна часть на запись.
+    Без indent кодирование компактное (без пробелов), с indent результат совпадает с json.dumps'''
+
+    if indent is None:
+        encoder = json.JSONEncoder(ensure_ascii=False, default=default, separators=(',', ':'), allow_nan=False)
+    else:
+        encoder = json.JSONEncoder(ensure_ascii=False, default=default, indent=indent, allow_nan=False)
+    first = True
+    for record in records:
+        text = _encode(encoder, record)
+        if indent is None:
+            yield ('[' if first else ',') + text
+        else:
+            yield ('[\n' if first else ',\n') + textwrap.indent(text, ' ' * indent)
+        first = False
+    if first:
+        yield '[]'
+    else:
+        yield ']' if indent is None else '\n]'
+
+
+def iter_ndjson(records: Iterable[Any], default: Callable[[Any], Any] = json_default) -> Iterator[str]:
+    '''Кодирует записи в формат NDJSON: одна компактная JSON-строка на запись'''
+
+    encoder = json.JSONEncoder(ensure_ascii=False, default=default, separators=(',', ':'), allow_nan=False)
+    for record in records:
+        yield _encode(encoder, record) + '\n'
+
+
+def paginate(items: Sequence | np.ndarray, offset: int = 0,
+             limit: int | None = None) -> tuple[Sequence | np.ndarray, int | None]:
+    '''Возвращает страницу items[offset:offset + limit] и курсор следующей страницы
+    (смещение, с которого она начинается) или None, если страница последняя'''
+
+    end = len(items) if limit is None else min(offset + limit, len(items))
+    next_cursor = end if end < len(items) else None
+    return items[offset:end], next_cursor
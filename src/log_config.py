@@ -0,0 +1,74 @@
+import os
+import queue
+import atexit
+import logging
+import threading
+from logging.handlers import QueueHandler, QueueListener
+
+
+# Логгер пакета: логгеры модулей (src.utils, src.store, ...) передают ему записи
+PACKAGE_LOGGER = 'src'
+LOG_FORMAT = '%(asctime)s - %(filename)s - %(levelname)s: %(message)s'
+# Уровень по умолчанию. Сообщения о каждом вызове функций пишутся на уровне DEBUG и по умолчанию
+# отбрасываются сразу, проверкой уровня, без форматирования
+DEFAULT_LEVEL = 'INFO'
+
+_listener: QueueListener | None = None
+_setup_lock = threading.Lock()
+
+
+def parse_levels(spec: str) -> dict[str, str]:
+    '''Разбирает уровни логгеров из строки вида "src.utils=DEBUG,src.store=WARNING"'''
+
+    levels = {}
+    for item in spec.split(','):
+        name, _, level = item.partition('=')
+        if name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+
+def setup_logging(level: str | None = None, levels: dict[str, str] | None = None) -> QueueListener:
+    '''Настраивает логирование пакета один раз за процесс: к логгеру пакета добавляется QueueHandler,
+    а запись в консоль выполняет отдельный поток QueueListener, поэтому вызывающий поток не ждет вывода.
+    Повторный вызов (в том числе после перезагрузки модулей) не добавляет обработчики, а только меняет
+    уровни. Уровень пакета - level или переменная окружения LOG_LEVEL, уровни отдельных модулей -
+    levels или переменная LOG_LEVELS ("src.utils=DEBUG,src.store=WARNING")'''
+
+    global _listener
+    with _setup_lock:
+        package_logger = logging.getLogger(PACKAGE_LOGGER)
+        package_logger.setLevel((level or os.getenv('LOG_LEVEL') or DEFAULT_LEVEL).upper())
+        module_levels = parse_levels(os.getenv('LOG_LEVELS', ''))
+        module_levels.update(levels or {})
+        for name, module_level in module_levels.items():
+            logging.getLogger(name).setLevel(module_level)
+
+        if _listener is None:
+            # Обработчик мог остаться от прежнего экземпляра модуля (importlib.reload)
+            for handler in list(package_logger.handlers):
+                if getattr(handler, 'package_queue', False):
+                    package_logger.removeHandler(handler)
+            log_queue: queue.SimpleQueue = queue.SimpleQueue()
+            queue_handler = QueueHandler(log_queue)
+            setattr(queue_handler, 'package_queue', True)
+            console_handler = logging.StreamHandler()
+            console_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+            _listener = QueueListener(log_queue, console_handler, respect_handler_level=True)
+            _listener.start()
+            atexit.register(_listener.stop)
+            package_logger.addHandler(queue_handler)
+            # Записи не передаются корневому логгеру, чтобы не выводиться дважды
+            package_logger.propagate = False
+        return _listener
+
+
+def get_logger(name: str) -> logging.Logger:
+    '''Логгер модуля. При первом обращении настраивает логирование пакета (setup_logging).
+    Имена вне пакета (например, __main__ при запуске python -m src.main) помещаются внутрь него'''
+
+    if _listener is None:
+        setup_logging()
+    if name != PACKAGE_LOGGER and not name.startswith(PACKAGE_LOGGER + '.'):
+        name = f'{PACKAGE_LOGGER}.{name}'
+    return logging.getLogger(name)
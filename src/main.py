@@ -0,0 +1,217 @@
+import json
+import time
+import asyncio
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+from urllib.parse import parse_qs, urlsplit
+from src.views import PATH_TO_FILE_XLSX, main_page
+from src.services import search_page, search_string_in_operations
+from src.reports import expenses_by_category
+from src.store import load_store
+from src.search_index import search_index
+from src.metrics import LatencyHistogram
+from src.serializer import dumps
+from src.errors import BankDataError, UpstreamError, UpstreamTimeout, error_info
+from src.log_config import get_logger
+
+
+logger = get_logger(__name__)
+
+
+HOST = "127.0.0.1"
+PORT = 8000
+# Число потоков для обработки запросов (работа с pandas и внешними API)
+WORKERS = 4
+# Наибольшее число строк заголовков в одном запросе
+MAX_HEADER_LINES = 100
+STATUS_TEXT = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+               500: "Internal Server Error", 502: "Bad Gateway", 503: "Service Unavailable", 504: "Gateway Timeout"}
+
+Query = dict[str, list[str]]
+
+
+class HTTPError(Exception):
+    '''Ошибка запроса, которая возвращается клиенту с заданным кодом ответа'''
+
+    def __init__(self, status: int, message: str) -> None:
+        super().__init__(message)
+        self.status = status
+
+
+def required_param(query: Query, name: str) -> str:
+    '''Возвращает обязательный параметр запроса или ошибку 400, если он не передан'''
+
+    values = query.get(name)
+    if not values:
+        raise HTTPError(400, f"Не передан параметр {name}")
+    return values[0]
+
+
+def error_status(error: BankDataError) -> int:
+    '''Код ответа для ошибки данных: таймаут внешнего API - 504, ошибка API - 502, ошибка файла - 503'''
+
+    if isinstance(error, UpstreamTimeout):
+        return 504
+    if isinstance(error, UpstreamError):
+        return 502
+    return 503
+
+
+class DashboardServer:
+    '''Асинхронный HTTP-сервер главной страницы, поиска и отчета по категории.
+    Загруженные транзакции, поисковый индекс и кэш данных внешних API живут в процессе между запросами.
+    Цикл событий только принимает соединения и разбирает запросы, а работа с pandas выполняется в пуле
+    потоков, поэтому запросы обрабатываются параллельно. Время выполнения запросов собирается
+    в гистограммы по адресам, они доступны по адресу /metrics'''
+
+    def __init__(self, path: str = PATH_TO_FILE_XLSX, workers: int = WORKERS) -> None:
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="dashboard-worker")
+        self.routes: dict[str, Callable[[Query], str]] = {
+            "/main": self.main,
+            "/search": self.search,
+            "/reports/expenses": self.expenses,
+        }
+        self.histograms = {route: LatencyHistogram() for route in self.routes}
+
+    def main(self, query: Query) -> str:
+        '''GET /main?datetime=YYYY-MM-DD HH:MM:SS - JSON-ответ главной страницы'''
+
+        return main_page(required_param(query, "datetime"), compact=True, path=self.path)
+
+    def search(self, query: Query) -> str:
+        '''GET /search?q=строка - операции, содержащие строку в описании или категории.
+        С параметром limit (и необязательным cursor) возвращается одна страница результатов,
+        параметр method задает способ поиска (см. services.find_operations)'''
+
+        search = required_param(query, "q")
+        method = query.get("method", ["index"])[0]
+        if "limit" not in query:
+            return search_string_in_operations(self.path, search, method=method, compact=True)
+        return search_page(self.path, search, cursor=int(query.get("cursor", ["0"])[0]),
+                           limit=int(required_param(query, "limit")), method=method)
+
+    def expenses(self, query: Query) -> str:
+        '''GET /reports/expenses?category=название&date=YYYY-MM-DD HH:MM:SS - траты по категории за 3 месяца'''
+
+        date_str = query["date"][0] if query.get("date") else None
+        result = expenses_by_category(self.path, required_param(query, "category"), date_str)
+        return dumps(result, compact=True)
+
+    def warm_up(self) -> None:
+        '''Загружает транзакции и строит поисковый индекс до первого запроса'''
+
+        try:
+            search_index(load_store(self.path))
+            logger.info('Данные загружены, поисковый индекс построен')
+        except Exception as e:
+            logger.warning('Не удалось загрузить данные заранее: %s', e)
+
+    def metrics(self) -> dict:
+        '''Гистограммы времени выполнения запросов по адресам'''
+
+        return {route: histogram.snapshot() for route, histogram in self.histograms.items()}
+
+    async def dispatch(self, method: str, target: str) -> tuple[int, str]:
+        '''Выполняет запрос в пуле потоков и возвращает код ответа и тело ответа'''
+
+        url = urlsplit(target)
+        if url.path == "/metrics":
+            return 200, dumps(self.metrics(), compact=True)
+        handler = self.routes.get(url.path)
+        if handler is None:
+            return 404, json.dumps({"error": STATUS_TEXT[404]})
+        if method != "GET":
+            return 405, json.dumps({"error": STATUS_TEXT[405]})
+        query = parse_qs(url.query)
+        started = time.perf_counter()
+        try:
+            body = await asyncio.get_running_loop().run_in_executor(self.executor, handler, query)
+            return 200, body
+        except HTTPError as e:
+            return e.status, json.dumps({"error": str(e)}, ensure_ascii=False)
+        except ValueError as e:
+            return 400, json.dumps({"error": str(e)}, ensure_ascii=False)
+        except BankDataError as e:
+            # Ошибка источника данных: клиент по "retryable" решает, повторять ли запрос
+            logger.error('Ошибка данных при обработке запроса %s: %s', url.path, e)
+            info = error_info(e)
+            return error_status(e), json.dumps({"error": info.pop("message"), **info}, ensure_ascii=False)
+        except Exception as e:
+            logger.error('Ошибка при обработке запроса %s: %s', url.path, e)
+            return 500, json.dumps({"error": STATUS_TEXT[500]})
+        finally:
+            self.histograms[url.path].observe(time.perf_counter() - started)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        '''Обрабатывает запросы одного соединения (HTTP/1.1 keep-alive), пока клиент его не закроет'''
+
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                for _ in range(MAX_HEADER_LINES):
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                # Тело запроса не используется, но его нужно дочитать, чтобы не сбить следующий запрос
+                if headers.get("content-length", "0").isdigit():
+                    await reader.readexactly(int(headers.get("content-length", "0")))
+                # Адрес обычно закодирован через %, но некоторые клиенты передают UTF-8 как есть
+                parts = request_line.decode("utf-8", errors="replace").split()
+                if len(parts) == 3:
+                    method, target, version = parts
+                    status, body = await self.dispatch(method, target)
+                    keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                else:
+                    status, body = 400, json.dumps({"error": STATUS_TEXT[400]})
+                    keep_alive = False
+                payload = body.encode("utf-8")
+                writer.write((f"HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n"
+                              "Content-Type: application/json; charset=utf-8\r\n"
+                              f"Content-Length: {len(payload)}\r\n"
+                              f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode("latin-1")
+                             + payload)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host: str = HOST, port: int = PORT) -> asyncio.Server:
+        '''Запускает сервер (порт 0 - любой свободный порт)'''
+
+        return await asyncio.start_server(self.handle_connection, host, port)
+
+
+async def serve(host: str = HOST, port: int = PORT, workers: int = WORKERS) -> None:
+    '''Прогревает данные и обслуживает запросы, пока процесс не будет остановлен'''
+
+    server = DashboardServer(workers=workers)
+    await asyncio.get_running_loop().run_in_executor(server.executor, server.warm_up)
+    tcp_server = await server.start(host, port)
+    logger.info('Сервер запущен на http://%s:%s', host, port)
+    async with tcp_server:
+        await tcp_server.serve_forever()
+
+
+def main() -> None:
+    '''Точка входа: python -m src.main [--host HOST] [--port PORT] [--workers N]'''
+
+    parser = argparse.ArgumentParser(description="HTTP-сервер главной страницы, поиска и отчетов")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=WORKERS)
+    args = parser.parse_args()
+    asyncio.run(serve(args.host, args.port, args.workers))
+
+
+if __name__ == '__main__':
+    main()
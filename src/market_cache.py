@@ -0,0 +1,168 @@
+import os
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable
+from src.errors import Result, UpstreamError
+
+
+# Время жизни данных по провайдерам, в секундах: (свежие данные, сколько ещё можно отдавать устаревшие)
+PROVIDER_TTL = {
+    "currency_rates": (10 * 60, 24 * 60 * 60),
+    # marketstack eod обновляется раз в день
+    "stock_prices": (6 * 60 * 60, 3 * 24 * 60 * 60),
+}
+
+
+class TTLCache:
+    '''Кэш данных внешних API: LRU в памяти с временем жизни записей и необязательное хранение на диске.
+    Свежая запись отдается сразу. Устаревшая, но не старше ttl + stale_ttl, тоже отдается сразу,
+    а обновление запускается в фоне (stale-while-revalidate). Иначе данные запрашиваются синхронно.
+    Часы (clock) можно подменить в тестах'''
+
+    def __init__(self, maxsize: int = 128, directory: str | None = None,
+                 clock: Callable[[], float] = time.time) -> None:
+        self.maxsize = maxsize
+        self.directory = directory
+        self.clock = clock
+        self._entries: OrderedDict[str, tuple[float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._refreshing: dict[str, Future] = {}
+        self._executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="cache-refresh")
+
+    @staticmethod
+    def make_key(provider: str, symbols: tuple[str, ...] | list[str] = ()) -> str:
+        '''Ключ кэша: провайдер и запрошенные символы'''
+
+        return json.dumps([provider, sorted(symbols)])
+
+    @staticmethod
+    def _disk_path(directory: str, key: str) -> str:
+        return os.path.join(directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def _read_disk(self, key: str) -> tuple[float, Any] | None:
+        if self.directory is None:
+            return None
+        try:
+            with open(self._disk_path(self.directory, key), encoding="utf-8") as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+        return entry["stored_at"], entry["value"]
+
+    def _write_disk(self, key: str, stored_at: float, value: Any) -> None:
+        if self.directory is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        with open(self._disk_path(self.directory, key), "w", encoding="utf-8") as file:
+            json.dump({"key": key, "stored_at": stored_at, "value": value}, file, ensure_ascii=False)
+
+    def get(self, key: str) -> tuple[float, Any] | None:
+        '''Возвращает (время сохранения, значение) из памяти или с диска'''
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        entry = self._read_disk(key)
+        if entry is not None:
+            self._remember(key, entry)
+        return entry
+
+    def _remember(self, key: str, entry: tuple[float, Any]) -> None:
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def set(self, key: str, value: Any) -> None:
+        '''Сохраняет значение в памяти и на диске'''
+
+        entry = (self.clock(), value)
+        self._remember(key, entry)
+        self._write_disk(key, *entry)
+
+    def _fetch_and_store(self, key: str, fetch: Callable[[], Any], should_cache: Callable[[Any], bool]) -> Any:
+        value = fetch()
+        if should_cache(value):
+            self.set(key, value)
+        return value
+
+    def _revalidate(self, key: str, fetch: Callable[[], Any], should_cache: Callable[[Any], bool]) -> None:
+        '''Запускает фоновое обновление записи, если оно ещё не запущено'''
+
+        with self._lock:
+            if key in self._refreshing:
+                return
+            future = self._executor.submit(self._fetch_and_store, key, fetch, should_cache)
+            self._refreshing[key] = future
+
+        def done(_: Future) -> None:
+            with self._lock:
+                self._refreshing.pop(key, None)
+
+        future.add_done_callback(done)
+
+    def get_or_fetch(self, key: str, fetch: Callable[[], Any], ttl: float, stale_ttl: float = 0,
+                     should_cache: Callable[[Any], bool] = bool) -> Any:
+        '''Возвращает значение по ключу, при необходимости запрашивая его функцией fetch.
+        Результат fetch сохраняется, только если should_cache(результат) истинно
+        (по умолчанию пустой ответ не кэшируется)'''
+
+        entry = self.get(key)
+        if entry is not None:
+            stored_at, value = entry
+            age = self.clock() - stored_at
+            if age < ttl:
+                return value
+            if age < ttl + stale_ttl:
+                self._revalidate(key, fetch, should_cache)
+                return value
+        return self._fetch_and_store(key, fetch, should_cache)
+
+    def pending_refreshes(self) -> list[Future]:
+        '''Фоновые обновления, которые ещё выполняются'''
+
+        with self._lock:
+            return list(self._refreshing.values())
+
+    def clear(self) -> None:
+        '''Очищает кэш в памяти'''
+
+        with self._lock:
+            self._entries.clear()
+
+
+def cached_market_data(cache: TTLCache, provider: str, fetch: Callable[..., Any],
+                       symbols: tuple[str, ...] | list[str]) -> Any:
+    '''Возвращает данные провайдера (курсы валют или акции) по символам через кэш
+    с временем жизни из PROVIDER_TTL'''
+
+    ttl, stale_ttl = PROVIDER_TTL[provider]
+    return cache.get_or_fetch(TTLCache.make_key(provider, symbols), lambda: fetch(symbols), ttl, stale_ttl)
+
+
+def cached_market_result(cache: TTLCache, provider: str, fetch: Callable[..., Any],
+                         symbols: tuple[str, ...] | list[str]) -> Result:
+    '''Как cached_market_data, но при ошибке внешнего API (UpstreamError) возвращает сохраненные данные
+    любой давности с описанием ошибки (stale-if-error). Если сохраненных данных нет или ошибка
+    не связана с API (например, не задан ключ), она передается вызывающему'''
+
+    try:
+        return Result(cached_market_data(cache, provider, fetch, symbols))
+    except UpstreamError as e:
+        entry = cache.get(TTLCache.make_key(provider, symbols))
+        if entry is None:
+            raise
+        result = Result(entry[1], stale=True)
+        result.add_error(provider, e)
+        return result
+
+
+# Кэш данных внешних API, общий для процесса. Каталог для хранения на диске задается переменной окружения
+market_cache = TTLCache(directory=os.getenv("MARKET_CACHE_DIR"))
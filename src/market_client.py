@@ -0,0 +1,150 @@
+import os
+import time
+import random
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable
+import requests
+from requests.adapters import HTTPAdapter
+from dotenv import load_dotenv
+
+
+MARKETSTACK_URL = "https://api.marketstack.com/v2/eod"
+APILAYER_URL = "https://api.apilayer.com/exchangerates_data/latest"
+# Время ожидания ответа внешних API в секундах
+REQUEST_TIMEOUT = 5
+# Коды ответа, после которых запрос повторяется
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+# Наибольшая задержка перед повтором в секундах. Если API просит подождать дольше (Retry-After),
+# запрос не повторяется: ответ к тому времени уже никому не нужен
+MAX_RETRY_DELAY = REQUEST_TIMEOUT
+
+
+class MarketDataClient:
+    '''Клиент внешних API курсов валют и акций. Держит пул постоянных соединений (keep-alive),
+    повторяет запрос при ответах 429/5xx и ошибках соединения с экспоненциальной задержкой со случайным
+    разбросом (не дольше max_delay), а одинаковые одновременные запросы объединяет в один (single-flight).
+    Если задан срок ответа (deadline по часам clock), запрос не повторяется после него, а время ожидания
+    ответа сокращается до оставшегося. Адреса API можно заменить, например, на локальный тестовый сервер'''
+
+    def __init__(self, marketstack_key: str | None = None, apilayer_key: str | None = None,
+                 marketstack_url: str = MARKETSTACK_URL, apilayer_url: str = APILAYER_URL,
+                 retries: int = 3, backoff: float = 0.5, pool_size: int = 10,
+                 sleep: Callable[[float], None] = time.sleep, max_delay: float = MAX_RETRY_DELAY,
+                 clock: Callable[[], float] = time.monotonic) -> None:
+        self.marketstack_key = marketstack_key
+        self.apilayer_key = apilayer_key
+        self.marketstack_url = marketstack_url
+        self.apilayer_url = apilayer_url
+        self.retries = retries
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.clock = clock
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_size)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._lock = threading.Lock()
+        self._in_flight: dict[tuple, Future[requests.Response]] = {}
+
+    @classmethod
+    def from_env(cls, **kwargs: Any) -> 'MarketDataClient':
+        '''Создает клиента с ключами API из переменных окружения (файл .env читается один раз здесь)'''
+
+        load_dotenv()
+        return cls(marketstack_key=os.getenv('API_Key_marketstack'), apilayer_key=os.getenv('APIlayer_KEY'),
+                   **kwargs)
+
+    def _backoff(self, attempt: int) -> float:
+        '''Экспоненциальная задержка со случайным разбросом, не больше max_delay'''
+
+        return float(min(self.backoff * 2 ** attempt * random.uniform(0.5, 1.5), self.max_delay))
+
+    def _delay(self, attempt: int, response: requests.Response) -> float | None:
+        '''Задержка перед повтором после ответа: Retry-After из ответа или _backoff.
+        None, если Retry-After больше max_delay и запрос повторять не нужно'''
+
+        retry_after = response.headers.get("Retry-After")
+        if retry_after is not None and retry_after.isdigit():
+            return float(retry_after) if float(retry_after) <= self.max_delay else None
+        return self._backoff(attempt)
+
+    def _in_time(self, delay: float, deadline: float | None) -> bool:
+        '''Успеет ли повтор после задержки delay до срока ответа'''
+
+        return deadline is None or self.clock() + delay < deadline
+
+    def _request(self, url: str, params: dict | None, headers: dict | None, timeout: float,
+                 deadline: float | None = None) -> requests.Response:
+        '''GET-запрос с повторами при ответах 429/5xx и ошибках соединения. Если API просит подождать
+        дольше max_delay или повтор не успевает до deadline, возвращается полученный ответ (или ошибка)
+        без повтора. Если срок уже прошел, запрос не выполняется - requests.Timeout'''
+
+        for attempt in range(self.retries + 1):
+            attempt_timeout = timeout
+            if deadline is not None:
+                remaining = deadline - self.clock()
+                if remaining <= 0:
+                    raise requests.Timeout(f"Срок ответа истек до запроса к {url}")
+                attempt_timeout = min(timeout, remaining)
+            try:
+                response = self.session.get(url, params=params, headers=headers, timeout=attempt_timeout)
+            except (requests.ConnectionError, requests.Timeout):
+                delay = self._backoff(attempt)
+                if attempt == self.retries or not self._in_time(delay, deadline):
+                    raise
+                self.sleep(delay)
+                continue
+            if response.status_code not in RETRY_STATUSES or attempt == self.retries:
+                return response
+            retry_delay = self._delay(attempt, response)
+            if retry_delay is None or not self._in_time(retry_delay, deadline):
+                return response
+            self.sleep(retry_delay)
+        raise AssertionError("unreachable")
+
+    def get(self, url: str, params: dict | None = None, headers: dict | None = None,
+            timeout: float = REQUEST_TIMEOUT, deadline: float | None = None) -> requests.Response:
+        '''Выполняет GET-запрос. Если такой же запрос уже выполняется в другом потоке,
+        ждет его и возвращает тот же ответ, не обращаясь к API повторно.
+        deadline - срок ответа по часам clock, после которого запрос не повторяется'''
+
+        key = (url, tuple(sorted((params or {}).items())), tuple(sorted((headers or {}).items())))
+        with self._lock:
+            running = self._in_flight.get(key)
+            if running is None:
+                future: Future[requests.Response] = Future()
+                self._in_flight[key] = future
+        if running is not None:
+            return running.result()
+        try:
+            future.set_result(self._request(url, params, headers, timeout, deadline))
+        except BaseException as e:
+            future.set_exception(e)
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+        return future.result()
+
+
+_client: MarketDataClient | None = None
+_client_lock = threading.Lock()
+
+
+def get_market_client() -> MarketDataClient:
+    '''Возвращает общий для процесса клиент внешних API, создавая его при первом обращении'''
+
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = MarketDataClient.from_env()
+        return _client
+
+
+def set_market_client(client: MarketDataClient | None) -> None:
+    '''Заменяет общий клиент (например, клиентом локального тестового сервера); None сбрасывает его'''
+
+    global _client
+    with _client_lock:
+        _client = client
@@ -0,0 +1,41 @@
+import bisect
+import threading
+
+
+# Верхние границы корзин гистограммы времени ответа, в секундах
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class LatencyHistogram:
+    '''Гистограмма времени выполнения запросов: число наблюдений в каждой корзине (не больше её границы),
+    общее число наблюдений и их сумма. Корзина "+Inf" учитывает значения больше последней границы'''
+
+    def __init__(self, buckets: tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.buckets = tuple(sorted(buckets))
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, seconds: float) -> None:
+        '''Добавляет наблюдение'''
+
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += seconds
+
+    def snapshot(self) -> dict:
+        '''Возвращает накопленные значения: число наблюдений не больше каждой границы (нарастающим итогом),
+        общее число и сумму'''
+
+        with self._lock:
+            counts = list(self._counts)
+            total = self._sum
+        cumulative = []
+        running = 0
+        for count in counts:
+            running += count
+            cumulative.append(running)
+        buckets = {str(bound): cumulative[i] for i, bound in enumerate(self.buckets)}
+        buckets["+Inf"] = cumulative[-1]
+        return {"buckets": buckets, "count": cumulative[-1], "sum": total}
@@ -0,0 +1,157 @@
+import os
+import json
+import pickle
+import hashlib
+import inspect
+import threading
+from collections import OrderedDict
+from functools import wraps
+from typing import Any, Callable, TypeVar, cast
+from src.store import dataset_fingerprint
+
+
+# Наибольшее число отчетов и их общий размер (в байтах, по pickle) в памяти
+REPORT_CACHE_SIZE = 256
+REPORT_CACHE_BYTES = 64 << 20
+
+ReportFunction = TypeVar('ReportFunction', bound=Callable[..., Any])
+
+
+class ReportCache:
+    '''Кэш результатов отчетов: LRU в памяти, ограниченный числом записей и их общим размером,
+    и необязательное хранение на диске (pickle, по файлу на ключ). Результаты хранятся в виде pickle,
+    и каждое чтение возвращает новую копию: изменение полученного результата не меняет кэш.
+    Запись на диск атомарная: во временный файл, затем переименование, поэтому другой процесс
+    не прочитает половину файла'''
+
+    def __init__(self, maxsize: int = REPORT_CACHE_SIZE, max_bytes: int = REPORT_CACHE_BYTES,
+                 directory: str | None = None) -> None:
+        self.maxsize = maxsize
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(str(self.directory), hashlib.sha1(key.encode("utf-8")).hexdigest() + ".pkl")
+
+    def _read_disk(self, key: str) -> bytes | None:
+        if self.directory is None:
+            return None
+        try:
+            with open(self._disk_path(key), "rb") as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def _write_disk(self, key: str, data: bytes) -> None:
+        if self.directory is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._disk_path(key)
+        temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(temp_path, "wb") as file:
+            file.write(data)
+        os.replace(temp_path, path)
+
+    def _remember(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._bytes -= len(previous)
+            self._entries[key] = data
+            self._bytes += len(data)
+            while len(self._entries) > self.maxsize or self._bytes > self.max_bytes:
+                self._bytes -= len(self._entries.popitem(last=False)[1])
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        '''Возвращает (найден ли результат, копия результата) из памяти или с диска'''
+
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+        from_disk = data is None
+        if data is None:
+            data = self._read_disk(key)
+            if data is None:
+                return False, None
+        try:
+            stored_key, value = pickle.loads(data)
+        except (pickle.PickleError, EOFError, ValueError):
+            return False, None
+        # Разные ключи с одинаковым хэшем имени файла не путаются
+        if stored_key != key:
+            return False, None
+        if from_disk:
+            self._remember(key, data)
+        return True, value
+
+    def put(self, key: str, value: Any) -> None:
+        '''Сохраняет результат в памяти и на диске (если задан каталог)'''
+
+        data = pickle.dumps((key, value))
+        self._remember(key, data)
+        self._write_disk(key, data)
+
+    def clear(self) -> None:
+        '''Очищает кэш в памяти (файлы на диске остаются)'''
+
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+def report_key(func: Callable, signature: inspect.Signature, args: tuple, kwargs: dict,
+               volatile: tuple[str, ...] = ()) -> str | None:
+    '''Ключ кэша отчета: имя функции, отпечаток данных (первый аргумент) и остальные аргументы
+    с подставленными значениями по умолчанию, так что f(df, "Такси") и f(df, category="Такси")
+    дают один ключ. None - результат не кэшируется: данные без отпечатка или None в аргументе из volatile
+    (например, дата отчета не передана и берется текущая)'''
+
+    bound = signature.bind(*args, **kwargs)
+    bound.apply_defaults()
+    arguments = list(bound.arguments.items())
+    if not arguments:
+        return None
+    fingerprint = dataset_fingerprint(arguments[0][1])
+    if fingerprint is None or any(name in volatile and value is None for name, value in arguments):
+        return None
+    # Кортежи и списки дают одинаковый JSON, поэтому (30, 90) и [30, 90] - один ключ
+    return json.dumps([f"{func.__module__}.{func.__qualname__}", fingerprint, arguments[1:]],
+                      default=str, ensure_ascii=False)
+
+
+def memoize_report(cache: ReportCache | None = None,
+                   volatile: tuple[str, ...] = ()) -> Callable[[ReportFunction], ReportFunction]:
+    '''Декоратор кэширования отчетов по версии данных и аргументам. Повторный вызов с теми же
+    аргументами по неизмененным данным возвращает сохраненный результат, не пересчитывая отчет.
+    Каждый вызов получает свою копию результата, поэтому ее можно изменять.
+    Ставится над write_to_json: при попадании в кэш файл отчета не перезаписывается'''
+
+    def decorator(func: ReportFunction) -> ReportFunction:
+        signature = inspect.signature(func)
+        results = cache if cache is not None else ReportCache()
+
+        @wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            key = report_key(func, signature, args, kwargs, volatile)
+            if key is None:
+                return func(*args, **kwargs)
+            found, value = results.get(key)
+            if found:
+                return value
+            value = func(*args, **kwargs)
+            results.put(key, value)
+            return value
+
+        setattr(wrapper, "cache", results)
+        return cast(ReportFunction, wrapper)
+
+    return decorator
@@ -0,0 +1,253 @@
+import os
+import gzip
+import stat
+import uuid
+import hashlib
+import datetime
+import tempfile
+import threading
+import contextlib
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Any, BinaryIO, Iterator
+from src.json_stream import iter_ndjson
+from src.serializer import dumps
+from src.log_config import get_logger
+
+try:
+    import zstandard  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover - zstandard не обязателен, без него доступно только сжатие gzip
+    zstandard = None
+
+
+logger = get_logger(__name__)
+
+
+# Расширения файлов сжатых отчетов
+COMPRESSION_EXTENSIONS = {"gzip": ".gz", "zstd": ".zst"}
+# Поля шаблона имени, которые дают новое имя при каждой записи: такие файлы не сравниваются с прошлыми
+UNIQUE_NAME_FIELDS = ("{uuid", "{time")
+# Наибольшее число запомненных записанных отчетов
+WRITTEN_REPORTS_SIZE = 256
+
+
+def _new_file_mode() -> int:
+    '''Права нового файла, как у open(): 0o666 с учетом umask процесса'''
+
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+# umask узнается один раз при импорте: os.umask меняет его для всех потоков процесса
+NEW_FILE_MODE = _new_file_mode()
+
+# Записанные отчеты (LRU): путь к файлу -> (время изменения и размер файла, sha256 содержимого)
+_written_reports: OrderedDict[str, tuple[tuple[int, int] | None, str]] = OrderedDict()
+_written_lock = threading.Lock()
+_writer: ThreadPoolExecutor | None = None
+_writer_lock = threading.Lock()
+_pending: set[Future] = set()
+
+
+def _file_mode(path: str) -> int:
+    '''Права существующего файла или права нового файла, если его нет'''
+
+    try:
+        return stat.S_IMODE(os.stat(path).st_mode)
+    except OSError:
+        return NEW_FILE_MODE
+
+
+def _written_report(key: str) -> tuple[tuple[int, int] | None, str] | None:
+    '''Состояние файла и хэш содержимого при прошлой записи отчета в этот файл'''
+
+    with _written_lock:
+        written = _written_reports.get(key)
+        if written is not None:
+            _written_reports.move_to_end(key)
+        return written
+
+
+def _remember_written(key: str, digest: str) -> None:
+    with _written_lock:
+        _written_reports[key] = (_file_state(key), digest)
+        _written_reports.move_to_end(key)
+        while len(_written_reports) > WRITTEN_REPORTS_SIZE:
+            _written_reports.popitem(last=False)
+
+
+def _file_state(path: str) -> tuple[int, int] | None:
+    '''Время изменения и размер файла или None, если файла нет'''
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+class AtomicFile:
+    '''Файл, который пишется во временный файл в том же каталоге (file) и заменяет path переименованием
+    при commit. Читатель видит либо старый файл целиком, либо новый целиком. discard удаляет временный файл.
+    mkstemp создает файл с правами 0o600, поэтому временному файлу сразу даются права заменяемого файла
+    (для нового файла - как у open())'''
+
+    def __init__(self, path: str) -> None:
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        descriptor, self.temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.",
+                                                      suffix=".tmp")
+        self.path = path
+        self.file: BinaryIO = os.fdopen(descriptor, "wb")
+        try:
+            os.chmod(self.temp_path, _file_mode(path))
+        except BaseException:
+            self.discard()
+            raise
+
+    def commit(self) -> None:
+        self.file.close()
+        os.replace(self.temp_path, self.path)
+
+    def discard(self) -> None:
+        self.file.close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(self.temp_path)
+
+
+def atomic_write(path: str, data: bytes) -> None:
+    '''Записывает файл атомарно: во временный файл в том же каталоге, затем переименование'''
+
+    target = AtomicFile(path)
+    try:
+        target.file.write(data)
+        target.commit()
+    except BaseException:
+        target.discard()
+        raise
+
+
+class ReportSink:
+    '''Запись результата отчета в файл. Имя файла может быть шаблоном с полями {name} (имя функции),
+    {time} (время записи), {pid} и {uuid} - тогда параллельные отчеты не перезаписывают друг друга.
+    compact - JSON без отступов, ndjson - список построчно в формате NDJSON, compression - "gzip" или "zstd"
+    (сжимается компактный JSON, к имени добавляется расширение .gz или .zst).
+    Файл пишется атомарно и не перезаписывается, если содержимое не изменилось с прошлой записи'''
+
+    def __init__(self, file_name: str = "reports.json", compact: bool = False, ndjson: bool = False,
+                 compression: str | None = None) -> None:
+        if compression is not None and compression not in COMPRESSION_EXTENSIONS:
+            raise ValueError(f"Неизвестный формат сжатия: {compression}")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("Сжатие zstd недоступно: не установлен пакет zstandard")
+        self.file_name = file_name
+        self.compact = compact or compression is not None
+        self.ndjson = ndjson
+        self.compression = compression
+
+    def path(self, name: str = "report") -> str:
+        '''Имя файла отчета с подставленными полями шаблона'''
+
+        file_name = self.file_name
+        if "{" in file_name:
+            file_name = file_name.format(name=name, pid=os.getpid(), uuid=uuid.uuid4().hex,
+                                         time=datetime.datetime.now().strftime("%Y%m%d-%H%M%S-%f"))
+        extension = COMPRESSION_EXTENSIONS.get(self.compression or "", "")
+        if extension and not file_name.endswith(extension):
+            file_name += extension
+        return file_name
+
+    def chunks(self, result: Any) -> Iterator[bytes]:
+        '''Кодирует результат отчета частями: в NDJSON - по строке на запись, иначе одной частью'''
+
+        if self.ndjson and isinstance(result, list):
+            for line in iter_ndjson(result):
+                yield line.encode("utf-8")
+        else:
+            yield dumps(result, indent=4, compact=self.compact).encode("utf-8")
+
+    def write_content(self, result: Any, file: BinaryIO) -> str:
+        '''Пишет закодированный результат в file по частям (через сжатие, если оно задано)
+        и возвращает sha256 несжатого содержимого. Весь отчет целиком в памяти не собирается'''
+
+        sha = hashlib.sha256()
+        stream: Any = None
+        if self.compression == "gzip":
+            # mtime=0 и пустое имя: одинаковый отчет дает одинаковые байты
+            stream = gzip.GzipFile(filename="", mode="wb", fileobj=file, mtime=0)
+        elif self.compression == "zstd":
+            stream = zstandard.ZstdCompressor().stream_writer(file, closefd=False)
+        output = stream if stream is not None else file
+        for chunk in self.chunks(result):
+            sha.update(chunk)
+            output.write(chunk)
+        if stream is not None:
+            stream.close()
+        return sha.hexdigest()
+
+    def digest(self, result: Any) -> str:
+        '''sha256 закодированного результата без записи на диск и сжатия'''
+
+        sha = hashlib.sha256()
+        for chunk in self.chunks(result):
+            sha.update(chunk)
+        return sha.hexdigest()
+
+    def write(self, result: Any, name: str = "report") -> str:
+        '''Записывает результат и возвращает путь к файлу. Если файл не менялся с прошлой записи,
+        сначала сравнивается хэш нового содержимого, и неизмененный отчет на диск не пишется.
+        Иначе отчет пишется во временный файл, а хэш считается по ходу записи. Имена с {uuid}
+        и {time} не повторяются, поэтому такие отчеты пишутся сразу и не запоминаются'''
+
+        path = self.path(name)
+        key = os.path.abspath(path)
+        unique = any(field in self.file_name for field in UNIQUE_NAME_FIELDS)
+        written = None if unique else _written_report(key)
+        if written is not None and written[0] == _file_state(key) and written[1] == self.digest(result):
+            return path
+        target = AtomicFile(path)
+        try:
+            digest = self.write_content(result, target.file)
+            target.commit()
+        except BaseException:
+            target.discard()
+            raise
+        if not unique:
+            _remember_written(key, digest)
+        return path
+
+
+def _get_writer() -> ThreadPoolExecutor:
+    '''Фоновый поток записи отчетов: один, чтобы отчеты в один файл записывались по порядку'''
+
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            _writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="report-writer")
+        return _writer
+
+
+def _report_done(future: Future) -> None:
+    with _writer_lock:
+        _pending.discard(future)
+    if future.exception() is not None:
+        logger.error('Не удалось записать отчет: %s', future.exception())
+
+
+def submit_report(sink: ReportSink, result: Any, name: str = "report") -> Future:
+    '''Записывает отчет в фоновом потоке и сразу возвращает Future с путем к файлу'''
+
+    future = _get_writer().submit(sink.write, result, name)
+    with _writer_lock:
+        _pending.add(future)
+    future.add_done_callback(_report_done)
+    return future
+
+
+def wait_for_reports(timeout: float | None = None) -> bool:
+    '''Ждет записи отчетов, отправленных в фоновый поток. Возвращает True, если все записаны'''
+
+    with _writer_lock:
+        pending = set(_pending)
+    return not wait(pending, timeout=timeout).not_done
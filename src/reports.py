@@ -1,68 +1,156 @@
-# import os
+import numpy as np
 import pandas as pd
 import datetime
-import json
-import logging
 from functools import wraps
+from typing import Any, Callable, cast, overload
+from src.store import DATE_COLUMN, DATE_FORMAT, TransactionSource, TransactionStore, load_store, money_to_rubles
+from src.errors import SchemaError, require_columns
+from src.report_sink import ReportSink, submit_report
+from src.report_cache import ReportCache, ReportFunction, memoize_report
+from src.log_config import get_logger
 
-logger = logging.getLogger(__name__)
-console_handler = logging.StreamHandler()
-file_formatter = logging.Formatter('%(asctime)s - %(filename)s - %(levelname)s: %(message)s')
-console_handler.setFormatter(file_formatter)
-logger.addHandler(console_handler)
-logger.setLevel(logging.DEBUG)
+logger = get_logger(__name__)
 
 
-def write_to_json(file_name="reports.json"):
-    """Декоратор для записи результата функции в файл в формате JSON."""
+@overload
+def write_to_json(file_name: ReportFunction) -> ReportFunction:
+    ...
+
+
+@overload
+def write_to_json(file_name: str = "reports.json", compact: bool = False, ndjson: bool = False,
+                  compression: str | None = None,
+                  background: bool = False) -> Callable[[ReportFunction], ReportFunction]:
+    ...
+
+
+def write_to_json(file_name: str | ReportFunction = "reports.json", compact: bool = False, ndjson: bool = False,
+                  compression: str | None = None, background: bool = False) -> Any:
+    """Декоратор для записи результата функции в файл в формате JSON.
+    compact=True записывает JSON без отступов, ndjson=True записывает список построчно в формате NDJSON,
+    compression="gzip" или "zstd" записывает сжатый компактный JSON.
+    Имя файла может быть шаблоном с полями {name}, {time}, {pid}, {uuid} (например, "reports/{name}_{uuid}.json"),
+    тогда параллельные отчеты пишутся в разные файлы. Файл записывается атомарно; если содержимое отчета
+    не изменилось с прошлой записи, файл не перезаписывается.
+    background=True записывает файл в фоновом потоке: функция возвращает результат, не дожидаясь записи."""
+
+    def decorator(func: ReportFunction) -> ReportFunction:
+        sink = ReportSink(file_name if isinstance(file_name, str) else "reports.json", compact=compact,
+                          ndjson=ndjson, compression=compression)
 
-    def decorator(func):
         @wraps(func)
-        def wrapper(*args, **kwargs):
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
             result = func(*args, **kwargs)
 
-            with open(file_name, "w", encoding="utf-8") as file:
-                json.dump(result, file, indent=4, default=str, ensure_ascii=False)
+            if background:
+                submit_report(sink, result, func.__name__)
+            else:
+                sink.write(result, func.__name__)
 
             return result
 
-        return wrapper
+        return cast(ReportFunction, wrapper)
 
     if callable(file_name):
-        func = file_name
-        file_name = "reports.json"
-        return decorator(func)
+        # Декоратор без скобок: @write_to_json
+        return decorator(file_name)
     return decorator
 
 
+# Периоды отчета по категориям по умолчанию, в днях
+REPORT_WINDOWS = (30, 90, 365)
+# Кэш отчетов по категориям: ключ - версия данных и аргументы
+report_cache = ReportCache()
+
+
+def parse_report_date(date_str: str | None) -> datetime.datetime:
+    '''Разбирает дату отчета в формате YYYY-MM-DD HH:MM:SS; если дата не передана, берется текущая'''
+
+    if date_str is None:
+        return datetime.datetime.now()
+    try:
+        return datetime.datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
+    except ValueError as e:
+        raise ValueError("Неверный формат даты. Ожидается формат YYYY-MM-DD HH:MM:SS") from e
+
+
+def dated_store(store: TransactionStore) -> TransactionStore:
+    '''Возвращает хранилище с разобранной датой операции. Если дата в хранилище - строка, она разбирается
+    один раз в копии, переданный DataFrame не изменяется. Нет столбца с датой или дата не в формате
+    DATE_FORMAT - SchemaError'''
+
+    if store.is_date_indexed:
+        return store
+    require_columns(store.df, (DATE_COLUMN,))
+    try:
+        dates = pd.to_datetime(store.df[DATE_COLUMN], format=DATE_FORMAT)
+    except (ValueError, TypeError) as e:
+        raise SchemaError(f"Столбец '{DATE_COLUMN}' не содержит дат в формате {DATE_FORMAT}") from e
+    df = store.df.assign(**{DATE_COLUMN: dates})
+    return TransactionStore(df, money_in_kopecks=True)
+
+
+def category_codes(column: pd.Series, categories: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    '''Возвращает коды категорий операций и коды запрошенных категорий (-1, если такой категории нет).
+    Для столбца-категории используются его коды, иначе значения кодируются один раз'''
+
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.cat.codes.to_numpy(), column.cat.categories.get_indexer(pd.Index(categories))
+    codes, uniques = pd.factorize(column)
+    return codes, pd.Index(uniques).get_indexer(pd.Index(categories))
+
+
+# @write_to_json("monthly_review.json")
+@memoize_report(report_cache, volatile=('date_str',))
+def expenses_report(df_operations: TransactionSource, categories: list[str],
+                    windows: tuple[int, ...] | list[int] = REPORT_WINDOWS,
+                    date_str: str | None = None) -> dict[str, dict[int, list[dict]]]:
+    '''Траты сразу по нескольким категориям за несколько периодов (в днях до переданной или текущей даты).
+    Дата разбирается один раз, переданный DataFrame не изменяется. Операции отбираются сравнением кодов
+    категорий, а затем за один проход группируются по категории и самому короткому периоду, в который
+    попадают. Возвращает {категория: {число дней: список операций}}, операции в порядке исходных данных.
+    Результат по файлу или хранилищу кэшируется до изменения данных (если дата отчета передана)'''
+
+    date = parse_report_date(date_str)
+    windows = sorted(set(windows))
+    starts = [date - datetime.timedelta(days=days) for days in windows]
+    # Из каталога с выгрузками читаются только партиции, попадающие в самый длинный период
+    store = dated_store(load_store(df_operations, starts[-1], date))
+    # Срез за самый длинный период находится бинарным поиском по отсортированным датам
+    df_window = store.window(starts[-1], date)
+    codes, requested = category_codes(df_window['Категория'], categories)
+    mask = np.isin(codes, requested[requested >= 0])
+    selected = df_window[mask]
+    # Номер самого короткого периода, в который попадает операция (0 - самый короткий)
+    ascending_starts = np.array([np.datetime64(start) for start in reversed(starts)], dtype='datetime64[ns]')
+    dates = selected[DATE_COLUMN].to_numpy(dtype='datetime64[ns]')
+    shortest = len(windows) - np.searchsorted(ascending_starts, dates, side='right')
+    groups = dict(list(selected.groupby([codes[mask], shortest], sort=False)))
+
+    report: dict[str, dict[int, list[dict]]] = {}
+    for category, code in zip(categories, requested):
+        report[category] = {}
+        for index, days in enumerate(windows):
+            parts = [groups[(code, window)] for window in range(index + 1) if (code, window) in groups]
+            # Порядок строк как в исходных данных, суммы из копеек переводятся в рубли
+            rows = pd.concat(parts).sort_index() if parts else selected.iloc[:0]
+            report[category][days] = money_to_rubles(rows).to_dict('records')
+    return report
+
+
 # @write_to_json
 # @write_to_json("parameter_reports.json")
-def expenses_by_category(df_operations, category, date_str=None):
-    '''Функция принимает на вход датафрейм с транзакциями, название категории, опциональную дату.
+def expenses_by_category(df_operations: TransactionSource, category: str, date_str: str | None = None) -> list[dict]:
+    '''Функция принимает на вход датафрейм с транзакциями (путь к файлу xlsx или уже загруженное хранилище),
+    название категории, опциональную дату.
     Если дата не передана, то берется текущая дата. Функция возвращает траты по заданной категории
     за последние три месяца (от переданной даты).'''
 
     try:
-        if date_str is not None:
-            try:
-                date = datetime.datetime.strptime(date_str, '%Y-%m-%d %H:%M:%S')
-            except ValueError as e:
-                raise ValueError("Неверный формат даты. Ожидается формат YYYY-MM-DD HH:MM:SS") from e
-        else:
-            date = datetime.datetime.now()
-
-        logger.info('Начальная дата для фильтрации транзакций получена')
-        # Определяем начальную дату трех месяцев назад
-        start_date = date - datetime.timedelta(days=90)
-        # Преобразуем столбец 'Дата операции' в формат datetime с указанием формата
-        df_operations['Дата операции'] = pd.to_datetime(df_operations['Дата операции'], format='%d.%m.%Y %H:%M:%S')
-        # Фильтруем данные по дате и категории
-        df_filtered = df_operations.query(
-            f'Категория == "{category}" & `Дата операции` >= @start_date & `Дата операции` <= @date',
-            local_dict={'start_date': start_date, 'date': date})
-        # Преобразуем датафрейм в список словарей
-        logger.info('Фильтрации транзакций за последние 90 дней произведена')
-        result_list = df_filtered.to_dict('records')
+        logger.debug('Фильтрация транзакций за последние 90 дней началась')
+        # Отчет по одной категории за один период - частный случай отчета по нескольким категориям
+        result_list = expenses_report(df_operations, [category], (90,), date_str)[category][90]
+        logger.debug('Фильтрации транзакций за последние 90 дней произведена')
         return result_list
         # Преобразуем результат в JSON
         # json_result = json.dumps(result_list, indent=4, default=str, ensure_ascii=False)
@@ -70,8 +158,7 @@ def expenses_by_category(df_operations, category, date_str=None):
         # return json_result
 
     except Exception as e:
-        print(f"Произошла ошибка: {e}")
-        logger.error('Произошла ошибка')
+        logger.error('Произошла ошибка: %s', e)
         raise
 
 
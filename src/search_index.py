@@ -0,0 +1,90 @@
+import re
+from typing import Iterable
+import numpy as np
+import pandas as pd
+from src.store import TransactionStore
+
+
+SEARCH_COLUMNS = ('Категория', 'Описание')
+TOKEN_PATTERN = re.compile(r'\w+')
+
+
+def normalize(text: str) -> str:
+    '''Приводит строку к виду для поиска без учета регистра'''
+
+    return str(text).casefold()
+
+
+def trigrams(text: str) -> set[str]:
+    '''Возвращает множество триграмм строки'''
+
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class SearchIndex:
+    '''Поисковый индекс по полям 'Категория' и 'Описание'. Индексируются различные значения полей
+    (их намного меньше, чем операций): словарь токенов для поиска по словам и триграммный индекс
+    для поиска подстроки. Найденные значения разворачиваются в отсортированные номера строк без повторов'''
+
+    def __init__(self, store: TransactionStore, columns: tuple[str, ...] = SEARCH_COLUMNS) -> None:
+        df = store.df
+        row_ids = []
+        texts = []
+        for column in columns:
+            values = df[column].dropna()
+            row_ids.append(values.index.to_numpy())
+            texts.append(values.map(normalize).to_numpy())
+        rows = pd.Series(np.concatenate(row_ids), index=np.concatenate(texts))
+        # Номера строк для каждого различного значения
+        self._values: list[str] = []
+        self._rows: list[np.ndarray] = []
+        for value, group in rows.groupby(level=0, sort=False):
+            self._values.append(str(value))
+            self._rows.append(np.unique(group.to_numpy()))
+        self._all_rows = np.unique(df.index.to_numpy())
+        self._tokens: dict[str, set[int]] = {}
+        self._trigrams: dict[str, set[int]] = {}
+        for value_id, value in enumerate(self._values):
+            for token in TOKEN_PATTERN.findall(value):
+                self._tokens.setdefault(token, set()).add(value_id)
+            for trigram in trigrams(value):
+                self._trigrams.setdefault(trigram, set()).add(value_id)
+
+    def _expand(self, value_ids: set[int] | list[int]) -> np.ndarray:
+        '''Переводит номера значений в отсортированные номера строк без повторов'''
+
+        if not value_ids:
+            return np.array([], dtype=self._all_rows.dtype)
+        return np.unique(np.concatenate([self._rows[value_id] for value_id in value_ids]))
+
+    def search(self, query: str) -> np.ndarray:
+        '''Возвращает номера строк, у которых категория или описание содержат query без учета регистра.
+        Кандидаты отбираются пересечением триграмм запроса, затем проверяется вхождение подстроки'''
+
+        query = normalize(query)
+        if not query:
+            return self._all_rows
+        candidates: Iterable[int]
+        if len(query) < 3:
+            candidates = range(len(self._values))
+        else:
+            postings = sorted((self._trigrams.get(trigram, set()) for trigram in trigrams(query)), key=len)
+            candidates = set.intersection(*postings)
+        return self._expand([value_id for value_id in candidates if query in self._values[value_id]])
+
+    def search_tokens(self, query: str) -> np.ndarray:
+        '''Возвращает номера строк, у которых категория или описание содержат все слова запроса'''
+
+        tokens = TOKEN_PATTERN.findall(normalize(query))
+        if not tokens:
+            return self._all_rows
+        postings = sorted((self._tokens.get(token, set()) for token in tokens), key=len)
+        return self._expand(set.intersection(*postings))
+
+
+def search_index(store: TransactionStore) -> SearchIndex:
+    '''Возвращает поисковый индекс хранилища. Индекс строится один раз на версию данных
+    и перестраивается после добавления операций'''
+
+    index: SearchIndex = store.derived('search_index', SearchIndex)
+    return index
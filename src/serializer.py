@@ -0,0 +1,99 @@
+import json
+import math
+from typing import Any
+import numpy as np
+import pandas as pd
+
+try:
+    import orjson  # type: ignore[import-not-found]
+except ImportError:  # pragma: no cover - orjson не обязателен, без него используется json из стандартной библиотеки
+    orjson = None
+
+
+# Знаков после запятой в суммах при кодировании DataFrame (копейки переводятся в рубли точно)
+DOUBLE_PRECISION = 15
+
+
+def finite(value: Any) -> Any:
+    '''Заменяет NaN и бесконечности в числах, списках и словарях на None (в JSON - null), как orjson'''
+
+    if isinstance(value, float):
+        return value if math.isfinite(value) else None
+    if isinstance(value, dict):
+        return {key: finite(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [finite(item) for item in value]
+    return value
+
+
+def json_default(value: Any) -> Any:
+    '''Кодирует значения, которые json не умеет кодировать сам. numpy-скаляры становятся числами,
+    массивы - списками, даты и остальные значения - строками, как раньше с default=str'''
+
+    if isinstance(value, np.datetime64):
+        return str(pd.Timestamp(value))
+    if isinstance(value, np.generic):
+        return finite(value.item())
+    if isinstance(value, np.ndarray):
+        return finite(value.tolist())
+    return str(value)
+
+
+def _orjson_option(indent: int | None) -> int:
+    '''Флаги orjson: numpy кодируется сам, даты передаются в json_default, ключи-не строки допускаются'''
+
+    option: int = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_NON_STR_KEYS
+    return option | orjson.OPT_INDENT_2 if indent is not None else option
+
+
+def _reindent(data: bytes, indent: int) -> bytes:
+    '''Переводит JSON с отступом 2 (единственный отступ orjson) в JSON с отступом indent. Переводы строк
+    внутри строк JSON экранируются, поэтому пробелы после перевода строки - всегда отступ. Отступы
+    заменяются от самых глубоких, замененные помечаются нулевым байтом (в JSON он бывает только
+    экранированным), чтобы не заменить их повторно'''
+
+    if indent == 2:
+        return data
+    depth = 0
+    while b"\n" + b"  " * (depth + 1) in data:
+        depth += 1
+    for level in range(depth, 0, -1):
+        data = data.replace(b"\n" + b"  " * level, b"\n\x00" + b" " * (indent * level))
+    return data.replace(b"\n\x00", b"\n")
+
+
+def dumps(obj: Any, indent: int | None = None, compact: bool = False) -> str:
+    '''Кодирует объект в JSON (кириллица не экранируется). compact=True - без пробелов между элементами.
+    Если установлен orjson, компактный JSON и JSON с любым отступом кодируются им (отступ 2 переводится
+    в нужный), иначе - модулем json. Значения при этом одинаковые, но запись чисел может отличаться: малые
+    числа orjson пишет как 1e-7, а json - как 1e-07. JSON без отступа с пробелами после запятых кодирует
+    модуль json. NaN и бесконечности кодируются как null при любом способе'''
+
+    if compact:
+        indent = None
+    if orjson is not None and (compact or indent is not None):
+        data: bytes = orjson.dumps(obj, default=json_default, option=_orjson_option(indent))
+        return (data if indent is None else _reindent(data, indent)).decode("utf-8")
+    separators = (",", ":") if compact else None
+    try:
+        return json.dumps(obj, indent=indent, separators=separators, default=json_default, ensure_ascii=False,
+                          allow_nan=False)
+    except ValueError:
+        # В данных есть NaN или бесконечность: json записал бы NaN, что не является JSON
+        return json.dumps(finite(obj), indent=indent, separators=separators, default=json_default,
+                          ensure_ascii=False, allow_nan=False)
+
+
+def frame_to_json(df: pd.DataFrame, lines: bool = False) -> str:
+    '''Кодирует строки DataFrame в компактный JSON-массив (lines=True - в NDJSON) средствами pandas,
+    без промежуточного списка словарей. Даты записываются как str(Timestamp), пропуски - null'''
+
+    dates = {column: df[column].map(str, na_action='ignore') for column in df.columns
+             if pd.api.types.is_datetime64_any_dtype(df[column])}
+    if dates:
+        df = df.assign(**dates)
+    text = df.to_json(orient="records", lines=lines, force_ascii=False, double_precision=DOUBLE_PRECISION,
+                      date_format="iso")
+    if lines and text and not text.endswith("\n"):
+        text += "\n"
+    return str(text)
@@ -1,47 +1,146 @@
 # import os
 import re
-import json
+import numpy as np
 import pandas as pd
-import logging
-
-
-logger = logging.getLogger(__name__)
-console_handler = logging.StreamHandler()
-file_formatter = logging.Formatter('%(asctime)s - %(filename)s - %(levelname)s: %(message)s')
-console_handler.setFormatter(file_formatter)
-logger.addHandler(console_handler)
-logger.setLevel(logging.DEBUG)
-
-
-def search_string_in_operations(path_to_excel_file: str, search: str) -> str:
-    '''Принимает xlsx файл с данными о банковских операциях и строку поиска,
-    а возвращает JSON-ответ со всеми транзакциями, содержащими запрос в описании или категории,
-    у которых в описании есть данная строка.'''
-
-    try:
-        # Преобразуем данные из excel файла в список словарей Python
-        operations = pd.read_excel(path_to_excel_file).to_dict(orient='records')
-        logger.info('Файл для поисковой строки преобразован')
-        filtered_list_operations = []
-        search = str(search)
-        for operation in operations:
-            for key, value in operation.items():
-                matches = ""
-                if key == "Категория" or key == "Описание":
-                    value = str(value)
-                    matches = re.findall(search, value, flags=re.IGNORECASE)
-                if matches:
-                    filtered_list_operations.append(operation)
-        logger.info('Поиск по словам произведен')
-        # Преобразуем словарь в строку JSON
-        json_response = json.dumps(filtered_list_operations, ensure_ascii=False)
-        logger.info('Вывод результата поиска')
-        return json_response
-
-    except Exception as e:
-        print(f"Произошла ошибка: {e}")
-        logger.error('Произошла ошибка')
-        return ""
+from typing import Iterator, Sequence
+from src.store import DATE_COLUMN, DATE_FORMAT, TransactionSource, TransactionStore, load_store, money_to_rubles
+from src.json_stream import iter_json_array, iter_ndjson, paginate
+from src.search_index import search_index
+from src.serializer import dumps, frame_to_json
+from src.errors import require_columns
+from src.log_config import get_logger
+
+
+logger = get_logger(__name__)
+
+
+# Столбцы, в которых ищется строка поиска
+SEARCH_COLUMNS = ("Категория", "Описание")
+# Символы, при наличии которых строка поиска считается регулярным выражением
+REGEX_SPECIAL_CHARS = re.compile(r'[.^$*+?{}\[\]\\|()]')
+
+
+def scan_operations(df: pd.DataFrame, search: str) -> list:
+    '''Полный проход по операциям: возвращает номера строк, у которых категория или описание
+    содержат совпадение с регулярным выражением search без учета регистра. Каждая строка входит один раз.
+    Пропуски не ищутся, как и в индексе и векторном поиске (иначе str дал бы строку "nan")'''
+
+    pattern = re.compile(search, flags=re.IGNORECASE)
+    row_ids = []
+    for row_id, category, description in zip(df.index, df["Категория"], df["Описание"]):
+        if any(not pd.isna(value) and pattern.search(str(value)) for value in (category, description)):
+            row_ids.append(row_id)
+    return sorted(row_ids)
+
+
+def match_operations(df: pd.DataFrame, search: str, regex: bool = True) -> pd.Index:
+    '''Векторный поиск строковыми функциями pandas: возвращает номера строк, у которых категория
+    или описание содержат search без учета регистра. При regex=False строка ищется как есть,
+    иначе как регулярное выражение, которое компилируется один раз'''
+
+    if regex:
+        pattern = re.compile(search, flags=re.IGNORECASE)
+        matches = [df[column].str.contains(pattern, na=False) for column in ("Категория", "Описание")]
+    else:
+        matches = [df[column].str.contains(search, case=False, regex=False, na=False)
+                   for column in ("Категория", "Описание")]
+    return df.index[matches[0] | matches[1]].sort_values()
+
+
+def find_operations(store: TransactionStore, search: str, method: str = "index", regex: bool = True) -> np.ndarray:
+    '''Возвращает отсортированные номера строк операций, у которых категория или описание содержат
+    строку поиска. Способы поиска: "index" - по поисковому индексу хранилища, "vectorized" - строковыми
+    функциями pandas по столбцам, "scan" - проходом по операциям, "words" - по словарю слов поискового
+    индекса: категория или описание должны содержать все слова запроса целиком, в любом порядке.
+    При regex=False строка ищется как есть, иначе как регулярное выражение; регулярное выражение
+    в режиме "index" ищется векторно, в режиме "words" regex не учитывается.
+    Неверное регулярное выражение - ValueError'''
+
+    search = str(search)
+    require_columns(store.df, SEARCH_COLUMNS)
+    if method == "words":
+        return search_index(store).search_tokens(search)
+    if regex:
+        try:
+            re.compile(search)
+        except re.error as e:
+            raise ValueError(f"Неверное регулярное выражение: {e}") from e
+    if method == "index" and (not regex or not REGEX_SPECIAL_CHARS.search(search)):
+        return search_index(store).search(search)
+    if method in ("index", "vectorized"):
+        return match_operations(store.df, search, regex=regex).to_numpy()
+    if method == "scan":
+        row_ids = scan_operations(store.df, search if regex else re.escape(search))
+        found: np.ndarray = pd.Index(row_ids, dtype=store.df.index.dtype).to_numpy()
+        return found
+    raise ValueError(f"Неизвестный способ поиска: {method}")
+
+
+def operations_frame(store: TransactionStore, row_ids: np.ndarray | Sequence[int]) -> pd.DataFrame:
+    '''Возвращает операции с переданными номерами строк. Дата операции в хранилище уже разобрана,
+    для ответа она возвращается в исходный формат файла, а суммы из копеек - в рубли'''
+
+    df = money_to_rubles(store.df.loc[list(row_ids) if not isinstance(row_ids, np.ndarray) else row_ids])
+    if store.is_date_indexed:
+        df = df.assign(**{DATE_COLUMN: df[DATE_COLUMN].dt.strftime(DATE_FORMAT)})
+    return df
+
+
+def search_string_in_operations(path_to_excel_file: TransactionSource, search: str, method: str = "index",
+                                regex: bool = True, compact: bool = False) -> str:
+    '''Принимает xlsx файл (или уже загруженное хранилище транзакций) с данными о банковских операциях
+    и строку поиска, а возвращает JSON-ответ со всеми транзакциями, содержащими запрос в описании
+    или категории, у которых в описании есть данная строка. Способ поиска и regex - как в find_operations.
+    compact=True - компактный JSON, который pandas кодирует прямо из DataFrame, без списка словарей.
+    Ошибки не скрываются пустым ответом: ошибка чтения файла - DataSourceError, нет столбцов - SchemaError,
+    неверное регулярное выражение или способ поиска - ValueError.'''
+
+    store = load_store(path_to_excel_file)
+    logger.debug('Файл для поисковой строки преобразован')
+    row_ids = find_operations(store, search, method=method, regex=regex)
+    # Номера строк отсортированы, поэтому операции идут в порядке строк исходного файла
+    operations = operations_frame(store, row_ids)
+    logger.debug('Поиск по словам произведен')
+    # Преобразуем операции в строку JSON
+    if compact:
+        json_response = frame_to_json(operations)
+    else:
+        json_response = dumps(operations.to_dict(orient='records'))
+    logger.debug('Вывод результата поиска')
+    return json_response
+
+
+def iter_search_results(path_to_excel_file: TransactionSource, search: str, offset: int = 0,
+                        limit: int | None = None, output_format: str = "json", chunk_size: int = 500,
+                        method: str = "index", regex: bool = True) -> Iterator[str]:
+    '''Потоковый вариант поиска: генератор отдает результат по частям - компактный JSON-массив
+    (output_format="json") или строки NDJSON (output_format="ndjson"). Отдаются операции
+    со смещения offset, не больше limit штук; в память одновременно преобразуется не больше
+    chunk_size операций'''
+
+    if output_format not in ("json", "ndjson"):
+        raise ValueError(f"Неизвестный формат вывода: {output_format}")
+    store = load_store(path_to_excel_file)
+    row_ids, _ = paginate(find_operations(store, search, method=method, regex=regex), offset, limit)
+    records = (record for start in range(0, len(row_ids), chunk_size)
+               for record in operations_frame(store, row_ids[start:start + chunk_size]).to_dict('records'))
+    if output_format == "ndjson":
+        yield from iter_ndjson(records)
+    else:
+        yield from iter_json_array(records)
+
+
+def search_page(path_to_excel_file: TransactionSource, search: str, cursor: int = 0, limit: int = 100,
+                method: str = "index", regex: bool = True) -> str:
+    '''Возвращает одну страницу результатов поиска в компактном JSON: операции, курсор следующей
+    страницы (None для последней) и общее количество найденных операций'''
+
+    store = load_store(path_to_excel_file)
+    row_ids = find_operations(store, search, method=method, regex=regex)
+    page, next_cursor = paginate(row_ids, cursor, limit)
+    # Операции кодируются прямо из DataFrame и подставляются в ответ первым ключом
+    rest = dumps({"next_cursor": next_cursor, "total": len(row_ids)}, compact=True)
+    return '{"operations":' + frame_to_json(operations_frame(store, page)) + ',' + rest[1:]
 
 
 # if __name__ == '__main__':
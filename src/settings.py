@@ -0,0 +1,40 @@
+import os
+import json
+import threading
+
+
+# Получаем абсолютный путь к корневой директории проекта
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+USER_SETTINGS_PATH = os.path.join(BASE_DIR, "user_settings.json")
+
+# Валюты и акции, запрашиваемые, если файла настроек нет
+DEFAULT_CURRENCIES = ("USD", "EUR")
+DEFAULT_STOCKS = ("AAPL", "AMZN", "GOOGL", "MSFT", "TSLA")
+
+# Прочитанные настройки: путь к файлу -> (время изменения и размер файла, настройки)
+_settings_cache: dict[str, tuple[tuple[int, int], dict]] = {}
+_settings_lock = threading.Lock()
+
+
+def load_user_settings(path: str = USER_SETTINGS_PATH) -> dict:
+    '''Возвращает пользовательские настройки из user_settings.json: списки валют (user_currencies)
+    и акций (user_stocks) в виде кортежей. Файл читается один раз и перечитывается, только если
+    изменились время его изменения или размер. Если файла нет, возвращаются значения по умолчанию'''
+
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return {"user_currencies": DEFAULT_CURRENCIES, "user_stocks": DEFAULT_STOCKS}
+    fingerprint = (stat.st_mtime_ns, stat.st_size)
+    with _settings_lock:
+        cached = _settings_cache.get(path)
+        if cached is not None and cached[0] == fingerprint:
+            return cached[1]
+        with open(path, encoding="utf-8") as file:
+            data = json.load(file)
+        settings = {
+            "user_currencies": tuple(data.get("user_currencies", DEFAULT_CURRENCIES)),
+            "user_stocks": tuple(data.get("user_stocks", DEFAULT_STOCKS))
+        }
+        _settings_cache[path] = (fingerprint, settings)
+        return settings
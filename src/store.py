@@ -0,0 +1,570 @@
+import os
+import re
+import glob
+import json
+import datetime
+import uuid
+import hashlib
+import threading
+import multiprocessing
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from typing import Any, Callable
+from src.errors import DataSourceError, SchemaError, require_columns
+from src.log_config import get_logger
+
+try:
+    import pyarrow.feather as feather  # type: ignore[import-untyped]
+except ImportError:  # pragma: no cover - pyarrow входит в зависимости; без него кэш пишется в pickle
+    feather = None
+
+
+logger = get_logger(__name__)
+
+
+DATE_COLUMN = 'Дата операции'
+DATE_FORMAT = '%d.%m.%Y %H:%M:%S'
+# Версия формата кэша: увеличивается при изменении схемы загружаемого DataFrame
+CACHE_VERSION = 2
+# Столбцы с небольшим числом различных значений хранятся как категории
+CATEGORY_COLUMNS = ('Дата платежа', 'Номер карты', 'Статус', 'Валюта операции', 'Валюта платежа', 'Категория')
+# Столбцы с произвольным текстом хранятся как строки (в Arrow, если установлен pyarrow); пропуск - NaN
+STRING_COLUMNS = ('Описание',)
+
+
+def string_dtype() -> Any:
+    '''Строковый тип с пропусками NaN, как в остальных столбцах. В pandas 2.3 и новее это StringDtype
+    с na_value=NaN, в pandas 2.2 - 'pyarrow_numpy' (строки Arrow). Без pyarrow в pandas 2.2 такого типа нет,
+    и строки остаются object'''
+
+    try:
+        return pd.StringDtype('pyarrow' if feather is not None else 'python', na_value=np.nan)
+    except TypeError:
+        # Тип 'pyarrow_numpy' есть только в pandas 2.2, в заглушках типов pandas его нет
+        return pd.StringDtype('pyarrow_numpy') if feather is not None else 'object'  # type: ignore[call-overload]
+
+
+STRING_DTYPE = string_dtype()
+# Денежные столбцы хранятся в целых копейках (int64), в рубли переводятся только при выводе
+MONEY_COLUMNS = ('Сумма операции', 'Сумма платежа', 'Кэшбэк', 'Сумма операции с округлением')
+# Форматы файлов-партиций в каталоге с выгрузками
+PARTITION_EXTENSIONS = ('.xlsx', '.csv', '.parquet')
+# Месяц в имени файла-партиции, например operations_2021-12.xlsx или 202112.csv
+PARTITION_MONTH_PATTERN = re.compile(r'(?<!\d)(\d{4})[-_.]?(\d{2})(?!\d)')
+# Число процессов для параллельного чтения партиций
+PARTITION_WORKERS = min(4, os.cpu_count() or 1)
+# Наибольшее число загруженных хранилищ в процессе: разные файлы и наборы партиций для разных периодов
+LOADED_STORES_SIZE = 8
+
+
+def _file_fingerprint(file_path: str) -> dict | None:
+    '''Возвращает время изменения и размер файла или None, если файла нет'''
+
+    try:
+        stat = os.stat(file_path)
+    except (OSError, TypeError):
+        return None
+    return {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size}
+
+
+def _file_hash(file_path: str) -> str:
+    '''Считает sha256 содержимого файла'''
+
+    sha = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b''):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def cache_paths(file_path: str) -> tuple[str, str]:
+    '''Возвращает пути к колоночной копии файла и к её метаданным. Кэш лежит рядом с исходным файлом'''
+
+    directory, name = os.path.split(os.path.abspath(file_path))
+    base = os.path.join(directory, f'.{name}.cache')
+    return base + ('.feather' if feather is not None else '.pkl'), base + '.json'
+
+
+def read_cache(file_path: str) -> pd.DataFrame | None:
+    '''Читает колоночную копию файла, если она актуальна. Кэш считается устаревшим, если у исходного файла
+    изменились время изменения, размер или хэш содержимого. Возвращает None, если кэш нужно перестроить'''
+
+    fingerprint = _file_fingerprint(file_path)
+    if fingerprint is None:
+        return None
+    data_path, meta_path = cache_paths(file_path)
+    try:
+        with open(meta_path, encoding='utf-8') as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if meta.get('version') != CACHE_VERSION or meta.get('size') != fingerprint['size']:
+        return None
+    if meta.get('mtime_ns') != fingerprint['mtime_ns']:
+        # Время изменилось, а размер нет - сверяем хэш, чтобы не перечитывать файл после простого touch
+        if meta.get('sha256') != _file_hash(file_path):
+            return None
+        meta.update(fingerprint)
+        _write_meta(meta_path, meta)
+    try:
+        if feather is not None:
+            df: pd.DataFrame = feather.read_table(data_path, memory_map=True).to_pandas()
+        else:
+            df = pd.read_pickle(data_path)
+        return df
+    except (OSError, ValueError) as e:
+        logger.warning('Кэш транзакций не прочитан: %s', e)
+        return None
+
+
+def _write_meta(meta_path: str, meta: dict) -> None:
+    '''Записывает метаданные кэша'''
+
+    with open(meta_path, 'w', encoding='utf-8') as file:
+        json.dump(meta, file)
+
+
+def write_cache(file_path: str, df: pd.DataFrame) -> None:
+    '''Сохраняет типизированную колоночную копию DataFrame рядом с исходным файлом.
+    Ошибки записи не прерывают загрузку, кэш просто не создается'''
+
+    fingerprint = _file_fingerprint(file_path)
+    if fingerprint is None:
+        return
+    data_path, meta_path = cache_paths(file_path)
+    try:
+        if feather is not None:
+            df.reset_index(drop=True).to_feather(data_path)
+        else:
+            df.to_pickle(data_path)
+        meta = {'version': CACHE_VERSION, 'sha256': _file_hash(file_path), **fingerprint}
+        if DATE_COLUMN in df.columns and pd.api.types.is_datetime64_any_dtype(df[DATE_COLUMN]) and len(df):
+            # Диапазон дат нужен, чтобы не читать партицию, если она не попадает в запрошенный период
+            meta['min_date'] = df[DATE_COLUMN].min().isoformat()
+            meta['max_date'] = df[DATE_COLUMN].max().isoformat()
+        _write_meta(meta_path, meta)
+        logger.debug('Кэш транзакций записан')
+    except (OSError, ValueError) as e:
+        logger.warning('Кэш транзакций не записан: %s', e)
+
+
+def cached_date_range(file_path: str) -> tuple[pd.Timestamp, pd.Timestamp] | None:
+    '''Возвращает диапазон дат операций файла из метаданных его кэша, если кэш актуален'''
+
+    fingerprint = _file_fingerprint(file_path)
+    try:
+        with open(cache_paths(file_path)[1], encoding='utf-8') as file:
+            meta = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if (fingerprint is None or meta.get('version') != CACHE_VERSION or meta.get('size') != fingerprint['size']
+            or meta.get('mtime_ns') != fingerprint['mtime_ns'] or 'min_date' not in meta):
+        return None
+    return pd.Timestamp(meta['min_date']), pd.Timestamp(meta['max_date'])
+
+
+def apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    '''Приводит столбцы операций к компактным типам: категории для столбцов с небольшим числом значений
+    и строковый тип для описаний. Пропуски остаются пропусками в каждом столбце'''
+
+    dtypes: dict[str, Any] = {}
+    for column in CATEGORY_COLUMNS:
+        if column in df.columns and not isinstance(df[column].dtype, pd.CategoricalDtype):
+            dtypes[column] = 'category'
+    for column in STRING_COLUMNS:
+        if column in df.columns and df[column].dtype != STRING_DTYPE:
+            dtypes[column] = STRING_DTYPE
+    return df.astype(dtypes) if dtypes else df
+
+
+def to_kopecks(rubles: pd.Series) -> pd.Series:
+    '''Переводит суммы в рублях в целые копейки. Столбец с пропусками получает тип Int64,
+    пропуски остаются пропусками'''
+
+    kopecks = (rubles.astype('float64') * 100).round()
+    return kopecks.astype('Int64' if kopecks.isna().any() else 'int64')
+
+
+def to_rubles(kopecks: pd.Series) -> pd.Series:
+    '''Переводит целые копейки в рубли (float), пропуски - NaN'''
+
+    return kopecks.astype('float64') / 100
+
+
+def money_to_kopecks(df: pd.DataFrame) -> pd.DataFrame:
+    '''Переводит денежные столбцы из рублей в копейки'''
+
+    converted = {column: to_kopecks(df[column]) for column in MONEY_COLUMNS if column in df.columns}
+    return df.assign(**converted) if converted else df
+
+
+def money_to_rubles(df: pd.DataFrame) -> pd.DataFrame:
+    '''Переводит денежные столбцы из копеек обратно в рубли - для вывода результата'''
+
+    converted = {column: to_rubles(df[column]) for column in MONEY_COLUMNS if column in df.columns}
+    return df.assign(**converted) if converted else df
+
+
+def read_source_file(file_path: str) -> pd.DataFrame:
+    '''Читает файл с операциями (xlsx, csv или parquet) как есть, с разобранной датой операции.
+    Отсутствующий, поврежденный или нечитаемый файл - DataSourceError, нет столбца с датой - SchemaError'''
+
+    extension = os.path.splitext(file_path)[1].lower()
+    try:
+        if extension == '.parquet':
+            df = pd.read_parquet(file_path)
+        elif extension == '.csv':
+            df = pd.read_csv(file_path)
+        else:
+            df = pd.read_excel(file_path)
+    except FileNotFoundError as e:
+        raise DataSourceError(f"Файл с операциями не найден: {file_path}") from e
+    except Exception as e:
+        raise DataSourceError(f"Не удалось прочитать файл {file_path}: {e}") from e
+    # Столбец проверяется после чтения: иначе pandas сообщает о нем ValueError, неотличимым от поврежденного файла
+    require_columns(df, [DATE_COLUMN])
+    if not pd.api.types.is_datetime64_any_dtype(df[DATE_COLUMN]):
+        try:
+            df[DATE_COLUMN] = pd.to_datetime(df[DATE_COLUMN], format=DATE_FORMAT)
+        except (ValueError, TypeError):
+            # Как parse_dates в pandas: даты в другом формате остаются как есть
+            pass
+    return df
+
+
+def read_transactions_file(file_path: str, use_cache: bool = True) -> pd.DataFrame:
+    '''Читает файл с операциями (xlsx, csv или parquet) с уже разобранной датой операции и столбцами
+    в компактных типах (apply_schema). Для xlsx и csv используется колоночная копия файла, если она актуальна'''
+
+    extension = os.path.splitext(file_path)[1].lower()
+    if extension == '.parquet':
+        return apply_schema(read_source_file(file_path))
+    cached = read_cache(file_path) if use_cache else None
+    if cached is not None:
+        # Категории восстанавливаются из кэша как есть, строки Arrow приводятся к строковому типу
+        return apply_schema(cached)
+    df = apply_schema(read_source_file(file_path))
+    if use_cache:
+        write_cache(file_path, df)
+    return df
+
+
+class TransactionStore:
+    '''Хранилище транзакций. Файл xlsx читается один раз: даты и типы столбцов разбираются при загрузке,
+    после чего DataFrame держится в памяти и передается во все функции utils, services и reports
+    вместо повторного чтения файла. Денежные столбцы в хранилище - целые копейки: переданный DataFrame
+    с суммами в рублях переводится при создании, если money_in_kopecks не указан'''
+
+    def __init__(self, df: pd.DataFrame, source: str | None = None, money_in_kopecks: bool = False) -> None:
+        if not money_in_kopecks:
+            df = money_to_kopecks(df)
+        # Держим операции отсортированными по дате, чтобы любое окно дат находилось бинарным поиском.
+        # Исходный индекс сохраняется и соответствует порядку строк в файле
+        if (DATE_COLUMN in df.columns and pd.api.types.is_datetime64_any_dtype(df[DATE_COLUMN])
+                and not df[DATE_COLUMN].is_monotonic_increasing):
+            df = df.sort_values(DATE_COLUMN, kind='stable', na_position='last')
+        self._df = df
+        self.source = source
+        # Версия данных увеличивается при каждом добавлении операций
+        self.version = 0
+        # Производные структуры (агрегаты, индексы), построенные по данным хранилища
+        self._derived: dict[str, Any] = {}
+
+    @classmethod
+    def from_excel(cls, file_path: str, use_cache: bool = True) -> 'TransactionStore':
+        '''Читает xlsx файл с операциями и возвращает хранилище с уже разобранной датой операции.
+        Если рядом с файлом есть актуальная колоночная копия, читается она, а не xlsx'''
+
+        return cls(read_transactions_file(file_path, use_cache), source=file_path)
+
+    @property
+    def df(self) -> pd.DataFrame:
+        '''Загруженный DataFrame. Общий для всех потребителей, поэтому изменять его на месте нельзя'''
+
+        return self._df
+
+    @property
+    def is_date_indexed(self) -> bool:
+        '''Отсортированы ли операции по разобранной дате операции'''
+
+        return DATE_COLUMN in self._df.columns and pd.api.types.is_datetime64_any_dtype(self._df[DATE_COLUMN])
+
+    def window(self, start: datetime.datetime, end: datetime.datetime) -> pd.DataFrame:
+        '''Возвращает операции с датой от start до end включительно. Границы находятся бинарным поиском
+        по отсортированным датам за O(log n), результат - срез без копирования данных'''
+
+        if not self.is_date_indexed:
+            raise TypeError(f"Столбец '{DATE_COLUMN}' не содержит разобранных дат")
+        dates = self._df[DATE_COLUMN]
+        left = dates.searchsorted(pd.Timestamp(start), side='left')
+        right = dates.searchsorted(pd.Timestamp(end), side='right')
+        return self._df.iloc[left:right]
+
+    def derived(self, name: str, factory: Callable[['TransactionStore'], Any]) -> Any:
+        '''Возвращает производную структуру данных хранилища (агрегаты, индексы), построенную один раз.
+        Структуры с методом update обновляются при добавлении операций, остальные строятся заново'''
+
+        if name not in self._derived:
+            self._derived[name] = factory(self)
+        return self._derived[name]
+
+    def append(self, rows: pd.DataFrame) -> None:
+        '''Добавляет новые операции (суммы в рублях) в хранилище. Новым строкам присваивается индекс
+        после последней строки, сортировка по дате сохраняется'''
+
+        start = self._df.index.max() + 1 if len(self._df) else 0
+        rows = money_to_kopecks(rows).set_axis(pd.RangeIndex(start, start + len(rows)))
+        df = pd.concat([self._df, rows])
+        # Категории с разным набором значений pandas объединяет в object - возвращаем им тип category
+        categories = {column: 'category' for column in self._df.columns
+                      if isinstance(self._df[column].dtype, pd.CategoricalDtype)
+                      and not isinstance(df[column].dtype, pd.CategoricalDtype)}
+        if categories:
+            df = df.astype(categories)
+        if self.is_date_indexed and not df[DATE_COLUMN].is_monotonic_increasing:
+            df = df.sort_values(DATE_COLUMN, kind='stable', na_position='last')
+        self._df = df
+        self.version += 1
+        for name, item in list(self._derived.items()):
+            if hasattr(item, 'update'):
+                item.update(rows)
+            else:
+                del self._derived[name]
+
+    def __len__(self) -> int:
+        return len(self._df)
+
+
+TransactionSource = str | pd.DataFrame | TransactionStore
+
+# Загруженные в процессе хранилища (LRU): путь к файлу (или список файлов-партиций) -> (отпечаток, хранилище)
+_loaded_stores: OrderedDict[str, tuple[Any, TransactionStore]] = OrderedDict()
+_loaded_lock = threading.Lock()
+_partition_executor: ProcessPoolExecutor | None = None
+
+
+def require_dates(store: TransactionStore) -> None:
+    '''Проверяет, что дата операции в хранилище разобрана, иначе SchemaError (например, даты в файле
+    записаны не в формате DATE_FORMAT и остались строками)'''
+
+    require_columns(store.df, (DATE_COLUMN,))
+    if not store.is_date_indexed:
+        raise SchemaError(f"Столбец '{DATE_COLUMN}' не содержит дат в формате {DATE_FORMAT}")
+
+
+def _get_loaded_store(key: str, fingerprint: Any) -> TransactionStore | None:
+    '''Возвращает загруженное хранилище, если файлы с тех пор не изменились'''
+
+    with _loaded_lock:
+        loaded = _loaded_stores.get(key)
+        if loaded is None or loaded[0] != fingerprint:
+            return None
+        _loaded_stores.move_to_end(key)
+        return loaded[1]
+
+
+def _get_previous_store(key: str) -> tuple[Any, TransactionStore] | None:
+    '''Возвращает (отпечаток, хранилище), загруженное из файла до его изменения'''
+
+    with _loaded_lock:
+        return _loaded_stores.get(key)
+
+
+def _remember_store(key: str, fingerprint: Any, store: TransactionStore) -> None:
+    '''Запоминает загруженное хранилище. Давно не использованные хранилища вытесняются,
+    чтобы в памяти не копились данные за каждый запрошенный период'''
+
+    with _loaded_lock:
+        _loaded_stores[key] = (fingerprint, store)
+        _loaded_stores.move_to_end(key)
+        while len(_loaded_stores) > LOADED_STORES_SIZE:
+            _loaded_stores.popitem(last=False)
+
+
+def _append_loaded_store(key: str, previous: tuple[Any, TransactionStore], fingerprint: Any,
+                         rows: pd.DataFrame) -> TransactionStore | None:
+    '''Добавляет дописанные в файл операции в загруженное хранилище: производные структуры с методом update
+    (агрегаты по картам) обновляются, а не строятся заново. Под блокировкой, чтобы параллельные вызовы
+    не добавили одни и те же строки дважды. None - хранилище за это время заменено другим'''
+
+    with _loaded_lock:
+        loaded = _loaded_stores.get(key)
+        if loaded is not None and loaded[0] == fingerprint:
+            return loaded[1]
+        if loaded is not previous:
+            return None
+        store = previous[1]
+        store.append(rows)
+        _loaded_stores[key] = (fingerprint, store)
+        _loaded_stores.move_to_end(key)
+    logger.debug('Добавлено операций из файла: %d', len(rows))
+    return store
+
+
+def appended_rows(store: TransactionStore, df: pd.DataFrame) -> pd.DataFrame | None:
+    '''Если df - операции хранилища с дописанными в конец новыми строками (файл только вырос),
+    возвращает новые строки, иначе None. Строки хранилища в порядке файла сравниваются с началом df
+    по хэшам значений, поэтому разный набор категорий у столбцов не мешает сравнению'''
+
+    count = len(store)
+    if len(df) <= count or list(df.columns) != list(store.df.columns):
+        return None
+    old = store.df.sort_index()
+    if not old.index.equals(pd.RangeIndex(count)):
+        return None
+    prefix = money_to_rubles(money_to_kopecks(df.iloc[:count]))
+    if not pd.util.hash_pandas_object(prefix, index=False).equals(
+            pd.util.hash_pandas_object(money_to_rubles(old), index=False)):
+        return None
+    return df.iloc[count:]
+
+
+def is_partitioned(source: str) -> bool:
+    '''Является ли путь каталогом с файлами-партициями или шаблоном (glob) файлов'''
+
+    return os.path.isdir(source) or glob.has_magic(source)
+
+
+def partition_files(source: str) -> list[str]:
+    '''Возвращает отсортированный список файлов xlsx, csv и parquet в каталоге или по шаблону.
+    Скрытые файлы (в том числе кэш) и временные файлы Excel (~$...) пропускаются'''
+
+    pattern = os.path.join(source, '*') if os.path.isdir(source) else source
+    return sorted(path for path in glob.glob(pattern)
+                  if path.lower().endswith(PARTITION_EXTENSIONS) and not os.path.basename(path).startswith('~$'))
+
+
+def partition_date_range(file_path: str) -> tuple[pd.Timestamp, pd.Timestamp] | None:
+    '''Диапазон дат операций партиции: месяц из имени файла, иначе минимальная и максимальная дата
+    из метаданных кэша. None, если диапазон неизвестен и файл нужно прочитать'''
+
+    match = PARTITION_MONTH_PATTERN.search(os.path.basename(file_path))
+    if match is not None and 1 <= int(match.group(2)) <= 12:
+        start = pd.Timestamp(int(match.group(1)), int(match.group(2)), 1)
+        return start, start + pd.offsets.MonthBegin(1) - pd.Timedelta(1, 'ns')
+    return cached_date_range(file_path)
+
+
+def prune_partitions(files: list[str], start: datetime.datetime | None,
+                     end: datetime.datetime | None) -> list[str]:
+    '''Оставляет партиции, диапазон дат которых пересекается с периодом от start до end'''
+
+    selected = []
+    for file_path in files:
+        date_range = partition_date_range(file_path)
+        if (date_range is not None
+                and ((end is not None and date_range[0] > pd.Timestamp(end))
+                     or (start is not None and date_range[1] < pd.Timestamp(start)))):
+            continue
+        selected.append(file_path)
+    return selected
+
+
+def _get_partition_executor() -> ProcessPoolExecutor:
+    '''Пул процессов для чтения партиций, создается при первом обращении. Процессы запускаются через
+    forkserver (или spawn), а не fork, так как в процессе уже могут работать потоки'''
+
+    global _partition_executor
+    if _partition_executor is None:
+        method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        _partition_executor = ProcessPoolExecutor(max_workers=PARTITION_WORKERS,
+                                                  mp_context=multiprocessing.get_context(method))
+    return _partition_executor
+
+
+def load_partitions(files: list[str]) -> pd.DataFrame:
+    '''Читает файлы-партиции (несколько файлов - параллельно в пуле процессов) и объединяет их
+    в один DataFrame. Номера строк идут подряд в порядке файлов'''
+
+    if len(files) == 1:
+        frames = [read_transactions_file(files[0])]
+    else:
+        frames = list(_get_partition_executor().map(read_transactions_file, files))
+    # У партиций разные наборы категорий, после объединения типы приводятся заново
+    return apply_schema(pd.concat(frames, ignore_index=True))
+
+
+def load_partitioned_store(source: str, start: datetime.datetime | None = None,
+                           end: datetime.datetime | None = None) -> TransactionStore:
+    '''Загружает хранилище из каталога или шаблона файлов, читая только партиции, которые пересекаются
+    с периодом от start до end. Если ни одна партиция не попадает в период, возвращается пустое
+    хранилище со столбцами первой партиции'''
+
+    files = partition_files(source)
+    if not files:
+        raise DataSourceError(f"Нет файлов с операциями: {source}")
+    selected = prune_partitions(files, start, end)
+    # Если период пустой, читается одна партиция - только чтобы получить столбцы
+    to_read = selected or files[:1]
+    key = '\n'.join(os.path.abspath(file_path) for file_path in to_read)
+    fingerprint = [_file_fingerprint(file_path) for file_path in to_read]
+    store = _get_loaded_store(key, fingerprint)
+    if store is None:
+        logger.info('Чтение партиций: %d из %d', len(to_read), len(files))
+        store = TransactionStore(load_partitions(to_read), source=source)
+        _remember_store(key, fingerprint, store)
+    if not selected:
+        return TransactionStore(store.df.iloc[:0], source=source, money_in_kopecks=True)
+    return store
+
+
+def load_store(source: TransactionSource, start: datetime.datetime | None = None,
+               end: datetime.datetime | None = None) -> TransactionStore:
+    '''Принимает путь к xlsx файлу, каталог или шаблон файлов-партиций, DataFrame или уже загруженное
+    хранилище и возвращает хранилище. Файл читается только если передан путь; повторный вызов с тем же
+    неизмененным файлом возвращает уже загруженное в процессе хранилище, а если в файл только дописаны
+    операции, они добавляются в него (TransactionStore.append). Для каталога или шаблона
+    период от start до end позволяет не читать партиции за другие месяцы'''
+
+    if isinstance(source, TransactionStore):
+        return source
+    if isinstance(source, pd.DataFrame):
+        return TransactionStore(source)
+    if is_partitioned(source):
+        return load_partitioned_store(source, start, end)
+
+    fingerprint = _file_fingerprint(source)
+    if fingerprint is None:
+        return TransactionStore.from_excel(source)
+    key = os.path.abspath(source)
+    store = _get_loaded_store(key, fingerprint)
+    if store is not None:
+        return store
+    df = read_transactions_file(source)
+    previous = _get_previous_store(key)
+    rows = appended_rows(previous[1], df) if previous is not None else None
+    if previous is not None and rows is not None:
+        store = _append_loaded_store(key, previous, fingerprint, rows)
+        if store is not None:
+            return store
+    store = TransactionStore(df, source=source)
+    _remember_store(key, fingerprint, store)
+    return store
+
+
+def get_transactions(source: TransactionSource) -> pd.DataFrame:
+    '''Возвращает DataFrame с транзакциями из пути к файлу, DataFrame или хранилища'''
+
+    return load_store(source).df
+
+
+def dataset_fingerprint(source: TransactionSource) -> str | None:
+    '''Отпечаток версии данных для ключей кэша отчетов. Для файла - путь, время изменения и размер,
+    для каталога или шаблона - то же для каждого файла-партиции. Для хранилища - метка, которая создается
+    один раз и меняется при добавлении операций. Для DataFrame и несуществующего файла возвращается None:
+    DataFrame можно изменить на месте, поэтому результаты по нему не кэшируются'''
+
+    if isinstance(source, TransactionStore):
+        # Производные структуры без метода update сбрасываются в append, вместе с ними и метка
+        return str(source.derived('fingerprint', lambda store: uuid.uuid4().hex))
+    if isinstance(source, pd.DataFrame):
+        return None
+    files = partition_files(source) if is_partitioned(source) else [source]
+    fingerprints = [_file_fingerprint(file_path) for file_path in files]
+    if not files or any(fingerprint is None for fingerprint in fingerprints):
+        return None
+    return json.dumps([[os.path.abspath(file_path), fingerprint['mtime_ns'], fingerprint['size']]
+                       for file_path, fingerprint in zip(files, fingerprints) if fingerprint is not None],
+                      ensure_ascii=False)
@@ -0,0 +1,68 @@
+import bisect
+import datetime
+from typing import Any, Sequence
+import numpy as np
+import pandas as pd
+
+
+NS_PER_SECOND = 1_000_000_000
+NS_PER_DAY = 24 * 60 * 60 * NS_PER_SECOND
+# Начала частей суток (кроме полуночи) и приветствия для них: ночь, утро, день, вечер
+DAY_PART_STARTS = (datetime.time(6), datetime.time(12), datetime.time(18))
+DAY_PART_GREETINGS = ('Доброй ночи', 'Доброе утро', 'Добрый день', 'Добрый вечер')
+
+
+def time_to_ns(value: datetime.time) -> int:
+    '''Время суток в наносекундах от полуночи'''
+
+    seconds = value.hour * 3600 + value.minute * 60 + value.second
+    return seconds * NS_PER_SECOND + value.microsecond * 1000
+
+
+class TimeBuckets:
+    '''Разбиение суток на интервалы по времени: starts - начала интервалов (кроме полуночи) по возрастанию,
+    labels - названия интервалов, на одно больше, чем границ. Интервал включает свое начало и не включает
+    начало следующего, последний длится до конца суток включительно. Границы переводятся в наносекунды
+    от полуночи один раз, а интервал для массива дат находится одним вызовом np.searchsorted'''
+
+    def __init__(self, starts: Sequence[datetime.time] = DAY_PART_STARTS,
+                 labels: Sequence[str] = DAY_PART_GREETINGS, missing: str = '') -> None:
+        if len(labels) != len(starts) + 1:
+            raise ValueError("Названий интервалов должно быть на одно больше, чем границ")
+        bounds = [time_to_ns(start) for start in starts]
+        if any(left >= right for left, right in zip(bounds, bounds[1:])) or (bounds and bounds[0] == 0):
+            raise ValueError("Границы интервалов должны возрастать и быть позже полуночи")
+        self.starts = tuple(starts)
+        self.labels = tuple(labels)
+        self.missing = missing
+        self._bounds = np.array(bounds, dtype=np.int64)
+        self._bounds_list = bounds
+        # Последний элемент - название для пропущенных дат (код -1)
+        self._label_array = np.array([*labels, missing], dtype=object)
+
+    def codes(self, values: Any) -> np.ndarray:
+        '''Номера интервалов для массива, Series или списка дат; для пропущенной даты -1'''
+
+        dates = np.asarray(pd.to_datetime(values), dtype='datetime64[ns]')
+        time_of_day = dates.view(np.int64) % NS_PER_DAY
+        codes = np.searchsorted(self._bounds, time_of_day, side='right')
+        return np.where(np.isnat(dates), -1, codes)
+
+    def classify(self, values: Any) -> np.ndarray | pd.Series:
+        '''Названия интервалов для массива, Series или списка дат. Для Series возвращается Series
+        с тем же индексом, иначе массив; пропущенная дата получает название missing'''
+
+        labels: np.ndarray = self._label_array[self.codes(values)]
+        if isinstance(values, pd.Series):
+            return pd.Series(labels, index=values.index, name=values.name)
+        return labels
+
+    def label(self, value: datetime.datetime | datetime.time) -> str:
+        '''Название интервала для одной даты или времени (те же границы, без создания массивов)'''
+
+        moment = value.time() if isinstance(value, datetime.datetime) else value
+        return str(self.labels[bisect.bisect_right(self._bounds_list, time_to_ns(moment))])
+
+
+# Части суток для приветствия на главной странице
+day_parts = TimeBuckets()
@@ -0,0 +1,57 @@
+import heapq
+import datetime
+import numpy as np
+import pandas as pd
+from src.store import DATE_COLUMN, TransactionStore
+from src.aggregates import AMOUNT_COLUMN
+
+
+def top_expenses(df: pd.DataFrame, n: int = 5, by: str | None = None) -> pd.DataFrame:
+    '''Выбирает n операций с наибольшим расходом (отрицательной суммой платежа) за O(n) через nlargest,
+    без полной сортировки. Если передан столбец by (например, номер карты или категория),
+    топ-n выбирается в каждой группе за один проход. Сумма платежа в результате - абсолютное значение'''
+
+    expenses = df[df[AMOUNT_COLUMN] < 0]
+    amounts = expenses[AMOUNT_COLUMN].abs()
+    if by is None:
+        index = amounts.nlargest(n).index
+    else:
+        index = amounts.groupby(expenses[by], dropna=False, observed=True).nlargest(n).index.get_level_values(-1)
+    return expenses.loc[index].assign(**{AMOUNT_COLUMN: amounts.loc[index]})
+
+
+def month_to_date_top_expenses_batch(store: TransactionStore, input_dates: list[datetime.datetime],
+                                     n: int = 5) -> list[pd.DataFrame]:
+    '''Топ-n расходов с начала месяца сразу для многих дат за один проход по операциям. Даты обрабатываются
+    по возрастанию, и внутри месяца топ-n пополняется только новыми операциями (куча из n элементов),
+    поэтому каждая операция просматривается один раз. Возвращает для каждой даты то же, что top_expenses
+    для окна с начала месяца'''
+
+    df = store.df
+    dates = df[DATE_COLUMN].to_numpy()
+    amounts = df[AMOUNT_COLUMN].to_numpy()
+    results: list[pd.DataFrame] = [df.iloc[:0]] * len(input_dates)
+    heap: list[tuple[float, int]] = []
+    month = None
+    position = 0
+    for i in sorted(range(len(input_dates)), key=lambda index: input_dates[index]):
+        input_date = input_dates[i]
+        if (input_date.year, input_date.month) != month:
+            month = (input_date.year, input_date.month)
+            heap = []
+            start_of_month = input_date.replace(day=1, hour=0, minute=0, second=0)
+            position = int(np.searchsorted(dates, np.datetime64(start_of_month), side='left'))
+        end = int(np.searchsorted(dates, np.datetime64(input_date), side='right'))
+        while position < end:
+            if amounts[position] < 0:
+                # При равных суммах выше операция, которая встретилась раньше, как в nlargest
+                item = (-amounts[position], -position)
+                if len(heap) < n:
+                    heapq.heappush(heap, item)
+                elif item > heap[0]:
+                    heapq.heapreplace(heap, item)
+            position += 1
+        rows = [-row for _, row in sorted(heap, reverse=True)]
+        top = df.iloc[rows]
+        results[i] = top.assign(**{AMOUNT_COLUMN: top[AMOUNT_COLUMN].abs()})
+    return results
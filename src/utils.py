@@ -1,201 +1,196 @@
-import os
+from datetime import datetime
+from typing import Any, Callable
 import pandas as pd
-from datetime import datetime, time
-from dotenv import load_dotenv
 import requests
-import logging
+from src.store import DATE_COLUMN, TransactionSource, load_store, money_to_rubles, require_dates
+from src.aggregates import AMOUNT_COLUMN, CARD_COLUMN, card_cube, card_totals_records
+from src.errors import SchemaError, UpstreamError, UpstreamTimeout, require_columns
+from src.top_n import top_expenses
+from src.market_client import REQUEST_TIMEOUT, get_market_client
+from src.settings import DEFAULT_CURRENCIES, DEFAULT_STOCKS
+from src.time_buckets import day_parts
+from src.log_config import get_logger
 
 
-logger = logging.getLogger(__name__)
-console_handler = logging.StreamHandler()
-file_formatter = logging.Formatter('%(asctime)s - %(filename)s - %(levelname)s: %(message)s')
-console_handler.setFormatter(file_formatter)
-logger.addHandler(console_handler)
-logger.setLevel(logging.DEBUG)
+logger = get_logger(__name__)
+
+# Максимальное количество тикеров в одном запросе к marketstack
+MARKETSTACK_MAX_SYMBOLS = 100
+# Столбцы топ-транзакций в ответе
+TOP_COLUMNS = (DATE_COLUMN, AMOUNT_COLUMN, 'Категория', 'Описание')
 
 
 def greet_by_time(datetime_str: str) -> str:
     '''Функция принимает на вход строку с датой и временем в формате YYYY-MM-DD HH:MM:SS
-    и в зависимости от времени дня выводит приветствие'''
+    и в зависимости от времени дня выводит приветствие. Для массива дат - day_parts.classify'''
 
     try:
         # Преобразуем строку в объект datetime
         dt = datetime.strptime(datetime_str, '%Y-%m-%d %H:%M:%S')
-        logger.info('Дата принята к обработке')
-        # Определяем начало и конец каждого временного интервала
-        morning_start = time(6, 0, 0)
-        day_start = time(12, 0, 0)
-        evening_start = time(18, 0, 0)
-        night_start = time(0, 0, 0)
-        time_max = time(23, 59, 59)  # можно в условии заменить на time.max
-
-        # Получаем текущее время
-        current_time = dt.time()
-        # Сравнения с временными интервалами
-        greeting = ''
-        if morning_start <= current_time < day_start:
-            greeting = 'Доброе утро'
-        elif day_start <= current_time < evening_start:
-            greeting = 'Добрый день'
-        elif evening_start <= current_time < time_max:
-            greeting = 'Добрый вечер'
-        elif night_start <= current_time < morning_start:
-            greeting = 'Доброй ночи'
-        # можно еще эти строки, вместо двух последних elif:
-        # elif evening_start <= current_time < time.max:
-        #     greeting = 'Добрый вечер'
-        # else:
-        #     greeting = 'Доброй ночи'
-        logger.info('Приветствие выполнено успешно')
-        return greeting
-    except Exception as e:
-        print(f"Произошла ошибка: {e}")
+    except (TypeError, ValueError) as e:
         logger.error('Произошла ошибка при вводе даты')
-        return ''
+        raise ValueError("Неверный формат даты. Ожидается формат YYYY-MM-DD HH:MM:SS") from e
+    logger.debug('Дата принята к обработке')
+    # Часть суток по границам 06:00, 12:00 и 18:00; вечер длится до 23:59:59 включительно
+    greeting = day_parts.label(dt)
+    logger.debug('Приветствие выполнено успешно')
+    return greeting
+
+
+def process_xlsx_file_with_date_filter(file_path: TransactionSource, input_date_str: str) -> list[dict]:
+    '''Принимает на вход файл xlsx (или уже загруженное хранилище транзакций), преобразует в DataFrame,
+    отфильтровывает по дате операций - конечная дата это дата принимается функцией в качестве аргумента
+    в виде строки, а начальная дата - это первый день месяца конечной даты. Группирует по номеру карты
+    и агрегирует суммы платежей и кэшбека c получением абсолютного значения суммы платежей.
+    Возвращает список словарей. Пустой список означает, что расходов за период нет: неверная дата - ValueError,
+    ошибка чтения файла - DataSourceError, нет нужных столбцов - SchemaError'''
+
+    # Преобразуем строку с датой в формат datetime
+    input_date = datetime.strptime(input_date_str, '%Y-%m-%d %H:%M:%S')
+    # Получение данных из хранилища (файл xlsx читается, только если передан путь;
+    # из каталога с выгрузками читаются только партиции за месяц даты)
+    store = load_store(file_path, input_date.replace(day=1, hour=0, minute=0, second=0), input_date)
+    require_columns(store.df, (DATE_COLUMN, CARD_COLUMN, AMOUNT_COLUMN))
+    require_dates(store)
+    logger.debug('Данные получены, группировка по номеру карты и агрегация по сумме началась')
+    # Суммы расходов (только отрицательные суммы платежа) и кэшбэка по картам с начала месяца
+    # берутся из предрасчитанной таблицы дневных агрегатов, абсолютное значение - векторно
+    grouped_df = card_cube(store).month_to_date(input_date)
+    # Суммы в копейках переводятся в рубли, кэшбэк - 1 рубль на каждые 100 рублей расходов
+    list_dict = card_totals_records(grouped_df)
+    logger.debug('Группировка и агрегация карт прошла успешно')
+    return list_dict
+
+
+def top_transactions_records(top_df: pd.DataFrame, group_by: str | None = None) -> list[dict]:
+    '''Преобразует выбранные топ-транзакции в список словарей с датой, суммой платежа, категорией
+    и описанием (и столбцом группировки, если он передан)'''
+
+    # Ограничиваемся нужными столбцами, пропуски в выбранных строках становятся None (null в JSON)
+    columns = list(TOP_COLUMNS)
+    if group_by is not None and group_by not in columns:
+        columns.insert(0, group_by)
+    # Сумма платежа хранится в копейках и переводится в рубли только здесь, при выводе
+    top_rows = money_to_rubles(top_df[columns]).astype(object)
+    top_rows = top_rows.where(top_rows.notna(), None)
+    # Преобразуем дату в обычный строковый формат
+    top_rows['Дата операции'] = top_df['Дата операции'].dt.strftime('%d.%m.%Y')
+    # Преобразуем DataFrame в список словарей
+    return top_rows.to_dict('records')
+
+
+def top_transactions_by_amount(file_path: TransactionSource, input_date_str: str, n: int = 5,
+                               group_by: str | None = None) -> list[dict]:
+    '''Принимает на вход файл xlsx (или уже загруженное хранилище транзакций), преобразует в DataFrame,
+    отфильтровывает по дате операций - конечная дата это дата принимается функцией в качестве аргумента
+    в виде строки, а начальная дата - это первый день месяца конечной даты. Возвращает список со словарями
+    топ-n (по умолчанию топ-5) транзакций по сумме платежа. Если передан столбец group_by
+    (например, 'Номер карты' или 'Категория'), топ-n выбирается в каждой группе.
+    Ошибки не скрываются пустым списком - как в process_xlsx_file_with_date_filter'''
+
+    # Преобразуем строку с датой в формат datetime
+    input_date = datetime.strptime(input_date_str, '%Y-%m-%d %H:%M:%S')
+    # Определяем начало месяца
+    start_of_month = input_date.replace(day=1, hour=0, minute=0, second=0)
+    # Получение данных из хранилища (файл xlsx читается, только если передан путь;
+    # из каталога с выгрузками читаются только партиции за месяц даты)
+    store = load_store(file_path, start_of_month, input_date)
+    require_columns(store.df, TOP_COLUMNS + ((group_by,) if group_by is not None else ()))
+    require_dates(store)
+    logger.debug('Данные получены, фильтрация по выбору топ-5 транзакций началась')
+    # Срез операций за период находится бинарным поиском по отсортированным датам
+    filtered_df = store.window(start_of_month, input_date)
+    # Выбор топ-n расходов без полной сортировки, сумма платежа уже по модулю
+    top_df = top_expenses(filtered_df, n, by=group_by)
+    result_list = top_transactions_records(top_df, group_by)
+    logger.debug('Cписок топ-5 транзакций по сумме платежа успешно получен')
+    return result_list
+
+
+def api_json(get: Callable[..., requests.Response], url: str, params: dict | None = None,
+             headers: dict | None = None, timeout: float = REQUEST_TIMEOUT, deadline: float | None = None) -> Any:
+    '''GET-запрос к внешнему API, возвращает ответ в JSON. Если API не ответил вовремя - UpstreamTimeout,
+    ответил ошибкой или недоступен - UpstreamError с кодом ответа, ответ не JSON - SchemaError.
+    deadline - срок ответа (time.monotonic), после которого запрос не повторяется'''
 
+    try:
+        response = get(url, params=params, headers=headers, timeout=timeout, deadline=deadline)
+    except requests.Timeout as e:
+        logger.error('Внешний API не ответил вовремя')
+        raise UpstreamTimeout(f"API не ответил за {timeout} с") from e
+    except requests.RequestException as e:
+        logger.error('Внешний API недоступен')
+        raise UpstreamError(f"API недоступен: {e}") from e
+    # Проверяем успешность запроса
+    if response.status_code != 200:
+        logger.error('Запрос к внешнему API не выполнен')
+        raise UpstreamError(f"Запрос не выполнен с кодом состояния: {response.status_code}", response.status_code)
+    try:
+        return response.json()
+    except ValueError as e:
+        raise SchemaError("Ответ API не в формате JSON") from e
 
-def process_xlsx_file_with_date_filter(file_path: str, input_date_str: str) -> list[dict]:
-    '''Принимает на вход файла xlsx, преобразует в DataFrame, отфильтровывает по дате операций - конечная дата
-    это дата принимается функцией в качестве аргумента в виде строки, а начальная дата - это первый день месяца
-    конечной даты. Группирует по номеру карты и агрегирует суммы платежей и кэшбека c получением абсолютного
-    значения суммы платежей. Возвращает список словарей'''
 
-    try:
-        # Чтение данных из файла xlsx
-        df = pd.read_excel(file_path, parse_dates=['Дата операции'],
-                           date_format='%d.%m.%Y %H:%M:%S')
-        # Замена всех NaN значений на 0
-        df.fillna(0, inplace=True)
-        # Преобразуем строку с датой в формат datetime
-        input_date = datetime.strptime(input_date_str, '%Y-%m-%d %H:%M:%S')
-        logger.info('Данные получены, группировка по номеру карты и агрегация по сумме началась')
-        # Определяем начало месяца
-        start_of_month = input_date.replace(day=1, hour=0, minute=0, second=0)
-        # Фильтруем данные по диапазону дат
-        filtered_df = df[(df['Дата операции'] >= start_of_month) & (df['Дата операции'] <= input_date)]
-        # Исключение строк, где сумма платежа больше нуля
-        exclusion_of_positive_amounts = filtered_df.query("`Сумма платежа` < 0")
-        # Группировка по номеру карты и агрегирование суммы платежей и кэшбека c получением
-        # абсолютного значения суммы платежей
-        grouped_df = exclusion_of_positive_amounts.groupby(['Номер карты']).agg({
-            'Сумма платежа': lambda x: abs(x.sum()),
-            'Кэшбэк': 'sum'
-        }).reset_index()
-        # Преобразование DataFrame в список словарей
-        list_dict = grouped_df.to_dict('records')
-        logger.info('Группировка и агрегация карт прошла успешно')
-        return list_dict
-    except Exception as e:
-        print(f"Произошла ошибка: {e}")
-        logger.error('Произошла ошибка')
-        return []
-
-
-def top_transactions_by_amount(file_path: str, input_date_str: str) -> list[dict]:
-    '''Принимает на вход файла xlsx, преобразует в DataFrame, отфильтровывает по дате операций - конечная дата
-    это дата принимается функцией в качестве аргумента в виде строки, а начальная дата - это первый день месяца
-    конечной даты. Возвращает список со словарями топ-5 транзакций по сумме платежа'''
+def stock_prices_func(symbols: tuple[str, ...] | list[str] = DEFAULT_STOCKS,
+                      timeout: float = REQUEST_TIMEOUT, deadline: float | None = None) -> list[dict]:
+    '''Происходит обращение к внешнему API для получения текущей стоимости акций из S&P500.
+    symbols - тикеры акций любого количества: они запрашиваются пачками по MARKETSTACK_MAX_SYMBOLS,
+    для каждого тикера берется цена закрытия последнего торгового дня.
+    timeout - время ожидания ответа API в секундах, deadline - срок ответа (time.monotonic),
+    после которого запросы не повторяются'''
 
-    try:
-        # Чтение данных из файла xlsx
-        df = pd.read_excel(file_path, parse_dates=['Дата операции'], date_format='%d.%m.%Y %H:%M:%S')
-        # Замена всех NaN значений на 0
-        df.fillna(0, inplace=True)
-        # Преобразуем строку с датой в формат datetime
-        input_date = datetime.strptime(input_date_str, '%Y-%m-%d %H:%M:%S')
-        logger.info('Данные получены, фильтрация по выбору топ-5 транзакций началась')
-        # Определяем начало месяца
-        start_of_month = input_date.replace(day=1, hour=0, minute=0, second=0)
-        # Фильтруем данные по диапазону дат
-        filtered_df = df[(df['Дата операции'] >= start_of_month) & (df['Дата операции'] <= input_date)]
-        # Исключение строк, где сумма платежа больше нуля
-        exclusion_of_positive_amounts = filtered_df.query("`Сумма платежа` < 0")
-        # Применяем abs() к столбцу 'Сумма операции'
-        exclusion_of_positive_amounts.loc[:, 'Сумма платежа'] = (
-            exclusion_of_positive_amounts['Сумма платежа'].apply(abs))
-        # Сортируем DataFrame по убыванию суммы операции
-        sorted_df = exclusion_of_positive_amounts.sort_values(by=['Сумма платежа'], ascending=False)
-        # Ограничиваемся первыми пятью строками и нужными столбцами
-        top_5_rows = sorted_df[['Дата операции', 'Сумма платежа', 'Категория', 'Описание']].head(5)
-        # Преобразуем дату в обычный строковый формат
-        top_5_rows['Дата операции'] = top_5_rows['Дата операции'].dt.strftime('%d.%m.%Y')
-        # Преобразуем DataFrame в список словарей
-        result_list = top_5_rows.to_dict('records')
-        logger.info('Cписок топ-5 транзакций по сумме платежа успешно получен')
-        return result_list
-    except Exception as e:
-        print(f"Произошла ошибка: {e}")
-        logger.error('Произошла ошибка')
-        return []
-
-
-def stock_prices_func() -> list[dict]:
-    '''Происходит обращение к внешнему API для получения текущей стоимости акций из S&P500'''
-
-    # Загрузка переменных окружения из файла .env
-    load_dotenv()
-    API_Key_marketstack = os.getenv('API_Key_marketstack')
-
-    if not API_Key_marketstack:
+    # Клиент API с ключами, загруженными из окружения один раз, и пулом соединений
+    client = get_market_client()
+
+    if not client.marketstack_key:
         logger.error('Произошла ошибка. Ключ API не задан.')
         raise ValueError("Ключ API_marketstack не задан в среде.")
 
+    symbols = list(symbols)
+    # Последняя запись по каждому тикеру (marketstack может вернуть несколько дней на тикер)
+    latest: dict[str, dict] = {}
     try:
-        # Формирование URL для запроса к API
-        url = f"https://api.marketstack.com/v2/eod?access_key={API_Key_marketstack}"
-        # Параметры запроса (символы акций)
-        querystring = {"symbols": "AAPL,AMZN,GOOGL,MSFT,TSLA"}
-        # Отправка GET-запроса
-        response = requests.get(url, params=querystring)
-        # Проверяем успешность запроса
-        if response.status_code != 200:
-            logger.error('Запрос по получению стоимости акций не выполнен')
-            raise Exception(f"Запрос не выполнен с кодом состояния: {response.status_code}")
-        # Преобразование ответа в JSON
-        data = response.json()
-        logger.info('Ответ о стоимости акций получен, идет обработка')
+        for start in range(0, len(symbols), MARKETSTACK_MAX_SYMBOLS):
+            # Параметры запроса (ключ и пачка символов акций)
+            querystring = {"access_key": client.marketstack_key,
+                           "symbols": ",".join(symbols[start:start + MARKETSTACK_MAX_SYMBOLS])}
+            data = api_json(client.get, client.marketstack_url, params=querystring, timeout=timeout,
+                            deadline=deadline)
+            logger.debug('Ответ о стоимости акций получен, идет обработка')
+            for item in data['data']:
+                current = latest.get(item['symbol'])
+                if current is None or item.get('date', '') > current.get('date', ''):
+                    latest[item['symbol']] = item
         # Извлекаем нужные данные
-        list_dict_data = []
-        for item in data['data']:
-            list_dict_data.append({
-                'symbol': item['symbol'],
-                'close': item['close']
-            })
-        result = list_dict_data[0:5]
-        logger.info('Ответ о стоимости акций успешно обработан')
-        return result
+        result = [{'symbol': symbol, 'close': item['close']} for symbol, item in latest.items()]
+    except (KeyError, TypeError) as e:
+        logger.error('Произошла ошибка, ответ о стоимости акций имеет неожиданный формат')
+        raise SchemaError(f"Неожиданный формат ответа marketstack: нет поля {e}") from e
+    logger.debug('Ответ о стоимости акций успешно обработан')
+    return result
 
-    except Exception as e:
-        print(f"Произошла ошибка: {e}")
-        logger.error('Произошла ошибка, данные о стоимости акций не получены')
-        return []
 
+def recent_currency_rates(symbols: tuple[str, ...] | list[str] = DEFAULT_CURRENCIES,
+                          timeout: float = REQUEST_TIMEOUT, deadline: float | None = None) -> list[dict]:
+    '''Происходит обращение к внешнему API для получения текущекурса валют (по умолчанию USD и EUR).
+    symbols - коды валют, timeout - время ожидания ответа API в секундах,
+    deadline - срок ответа (time.monotonic), после которого запрос не повторяется'''
 
-def recent_currency_rates() -> list[dict]:
-    '''Происходит обращение к внешнему API для получения текущекурса USD и EUR'''
+    # Клиент API с ключами, загруженными из окружения один раз, и пулом соединений
+    client = get_market_client()
 
-    # Загрузка переменных окружения из файла .env
-    load_dotenv()
-    APIlayer_KEY = os.getenv('APIlayer_KEY')
-
-    if not APIlayer_KEY:
+    if not client.apilayer_key:
         logger.error('Произошла ошибка. Ключ APIlayer не задан.')
         raise ValueError("Ключ API не задан в среде.")
 
     headers = {
-        "apikey": APIlayer_KEY
+        "apikey": client.apilayer_key
     }
+    data = api_json(client.get, client.apilayer_url, params={"symbols": ",".join(symbols)}, headers=headers,
+                    timeout=timeout, deadline=deadline)
     try:
-        # Формирование URL для запроса к API
-        url = f"https://api.apilayer.com/exchangerates_data/latest?symbols={"USD,EUR"}"
-        response = requests.get(url, headers=headers)
-        # Проверяем успешность запроса
-        if response.status_code != 200:
-            logger.error('Запрос по получению ставок валют не выполнен')
-            raise Exception(f"Запрос не выполнен с кодом состояния: {response.status_code}")
-        # Преобразование ответа в JSON
-        rates = response.json()['rates']
-        logger.info('Ответ о стоимости ставок валюты получен, идет обработка')
+        rates = data['rates']
+        logger.debug('Ответ о стоимости ставок валюты получен, идет обработка')
         # Создаём пустой список для хранения результатов
         result = []
         # Извлекаем данные курсов валют
@@ -204,13 +199,11 @@ def recent_currency_rates() -> list[dict]:
                 'currency': currency,
                 'rate': rate
             })
-        logger.info('Ответ о стоимости ставок валюты успешно обработан')
-        return result
-
-    except Exception as e:
-        print(f"Произошла ошибка: {e}")
-        logger.error('Произошла ошибка, данные по ставка валюты не получены')
-        return []
+    except (KeyError, TypeError, AttributeError) as e:
+        logger.error('Произошла ошибка, ответ о ставках валюты имеет неожиданный формат')
+        raise SchemaError(f"Неожиданный формат ответа apilayer: {e}") from e
+    logger.debug('Ответ о стоимости ставок валюты успешно обработан')
+    return result
 
 
 # if __name__ == '__main__':
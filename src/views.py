@@ -1,51 +1,148 @@
 import os
-import json
+import time
+from datetime import datetime
+from functools import partial
+from typing import Any
+from concurrent.futures import Future, ThreadPoolExecutor, wait
 from src.utils import greet_by_time, process_xlsx_file_with_date_filter, top_transactions_by_amount, \
-    recent_currency_rates, stock_prices_func
+    top_transactions_records, recent_currency_rates, stock_prices_func
+from src.store import TransactionSource, load_store
+from src.aggregates import month_to_date_totals_batch
+from src.top_n import month_to_date_top_expenses_batch
+from src.settings import load_user_settings
+from src.market_cache import market_cache, cached_market_result
+from src.errors import Result
+from src.serializer import dumps
+from src.time_buckets import day_parts
 
+PATH_TO_FILE_XLSX = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "operations.xlsx")
 
-def main_page(datetime_str: str) -> str:
-    '''Главная функция, принимающую на вход строку с датой и временем в формате YYYY-MM-DD HH:MM:SS
-    и возвращающую JSON-ответ со следующими данными: приветствие в зависимости от времени суток, по каждой карте:
-    последние 4 цифры карты, общую сумма расходов, кешбэк, топ-5 транзакций по сумме платежа, курс валют и
-    стоимость акций из S&P500'''
+# Общее время на получение данных внешних API для одного ответа, в секундах
+RESPONSE_DEADLINE = 10
 
-    PATH_TO_FILE_XLSX = os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "operations.xlsx")
+# Пул потоков для запросов к внешним API, общий для всех вызовов
+market_data_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="market-data")
 
-    greeting = greet_by_time(datetime_str)
-    cards = process_xlsx_file_with_date_filter(PATH_TO_FILE_XLSX, datetime_str)
-    top_transactions = top_transactions_by_amount(PATH_TO_FILE_XLSX, datetime_str)
-    currency_rates = recent_currency_rates()
-    stock_prices = stock_prices_func()
-
-    # Получаем абсолютный путь к корневой директории проекта
-    BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    # Указываем путь к записи user_settings.json
-    file_json_path = os.path.join(BASE_DIR, "user_settings.json")
-    # Данные, которые необходимо записать в файл
-    user_currencies = ["USD", "EUR"]
-    user_stocks = ["AAPL", "AMZN", "GOOGL", "MSFT", "TSLA"]
-
-    # Создаем словарь с данными
-    user_settings = {
-        "user_currencies": user_currencies,
-        "user_stocks": user_stocks
+
+def month_start(date: datetime) -> datetime:
+    '''Начало месяца даты'''
+
+    return date.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def collect_results(futures: dict[str, Future], timeout: float) -> tuple[dict, dict]:
+    '''Ждет завершения задач не дольше timeout секунд. Возвращает результаты задач и ошибки:
+    для незавершенной или упавшей задачи результатом будет пустой список, а в ошибках - её описание.
+    Если задача вернула Result, в результаты попадают его данные, а в ошибки - его ошибки'''
+
+    wait(futures.values(), timeout=max(timeout, 0))
+    results: dict[str, Any] = {}
+    errors: dict[str, str] = {}
+    for name, future in futures.items():
+        results[name] = []
+        if not future.done():
+            future.cancel()
+            errors[name] = "timeout"
+        elif future.exception() is not None:
+            exception = future.exception()
+            errors[name] = f"{type(exception).__name__}: {exception}"
+        elif isinstance(future.result(), Result):
+            # Сохраненные данные при недоступном API: отдаются вместе с описанием ошибки
+            result = future.result()
+            results[name] = result.data
+            for error in result.errors.values():
+                errors[name] = f"{error['type']}: {error['message']}" + (" (данные из кэша)" if result.stale else "")
+        else:
+            results[name] = future.result()
+    return results, errors
+
+
+def submit_market_data(user_settings: dict, deadline: float | None = None) -> dict[str, Future]:
+    '''Запускает в пуле потоков получение курсов валют и стоимости акций пользователя через кэш.
+    deadline - срок ответа (time.monotonic): после него запросы не повторяются, и поток пула освобождается,
+    а не остается занятым повторами, результат которых уже никто не ждет (future.cancel их не прерывает)'''
+
+    return {
+        "currency_rates": market_data_executor.submit(
+            cached_market_result, market_cache, "currency_rates", partial(recent_currency_rates, deadline=deadline),
+            user_settings["user_currencies"]),
+        "stock_prices": market_data_executor.submit(
+            cached_market_result, market_cache, "stock_prices", partial(stock_prices_func, deadline=deadline),
+            user_settings["user_stocks"])
     }
-    # Запись данных в файл
-    with open(file_json_path, "w") as file:
-        json.dump(user_settings, file, default=str, ensure_ascii=False, indent=4)
+
+
+def dashboard_json(greeting: str, cards: list[dict], top_transactions: list[dict], market_data: dict,
+                   errors: dict, compact: bool = False) -> str:
+    '''Собирает JSON-ответ главной страницы; ключ "errors" добавляется, только если были ошибки.
+    compact=True - JSON без отступов (для HTTP-ответов)'''
 
     # Объединяем все данные в один словарь
     data = {
         "greeting": greeting,
         "cards": cards,
         "top_transactions": top_transactions,
-        "currency_rates": currency_rates,
-        "stock_prices": stock_prices
+        "currency_rates": market_data["currency_rates"],
+        "stock_prices": market_data["stock_prices"]
     }
+    if errors:
+        data["errors"] = errors
     # Преобразуем словарь в строку JSON
-    json_response = json.dumps(data, indent=4, default=str, ensure_ascii=False)
-    return json_response
+    return dumps(data, indent=4, compact=compact)
+
+
+def main_page(datetime_str: str, deadline: float = RESPONSE_DEADLINE, compact: bool = False,
+              path: TransactionSource = PATH_TO_FILE_XLSX) -> str:
+    '''Главная функция, принимающую на вход строку с датой и временем в формате YYYY-MM-DD HH:MM:SS
+    и возвращающую JSON-ответ со следующими данными: приветствие в зависимости от времени суток, по каждой карте:
+    последние 4 цифры карты, общую сумма расходов, кешбэк, топ-5 транзакций по сумме платежа, курс валют и
+    стоимость акций из S&P500. Курсы валют и акции запрашиваются параллельно с обработкой транзакций;
+    если API не ответил за deadline секунд или вернул ошибку, соответствующий блок будет пустым,
+    а в ответ добавится ключ "errors" с описанием ошибки. compact=True - JSON без отступов.
+    path - файл с операциями (или каталог с выгрузками, или уже загруженное хранилище)'''
+
+    started = time.monotonic()
+    # Валюты и акции пользователя (файл настроек перечитывается, только если он изменился)
+    user_settings = load_user_settings()
+    # Запросы к внешним API выполняются в пуле потоков, пока обрабатываются транзакции.
+    # Ответы кэшируются, поэтому повторные вызовы не обращаются к API, пока данные не устарели
+    futures = submit_market_data(user_settings, started + deadline)
+
+    # Файл читается один раз, дальше обе функции работают с загруженным хранилищем.
+    # Из каталога с выгрузками читаются только партиции с начала месяца до переданной даты
+    input_date = datetime.strptime(datetime_str, '%Y-%m-%d %H:%M:%S')
+    store = load_store(path, month_start(input_date), input_date)
+
+    greeting = greet_by_time(datetime_str)
+    cards = process_xlsx_file_with_date_filter(store, datetime_str)
+    top_transactions = top_transactions_by_amount(store, datetime_str)
+    market_data, errors = collect_results(futures, deadline - (time.monotonic() - started))
+    return dashboard_json(greeting, cards, top_transactions, market_data, errors, compact)
+
+
+def main_pages(datetime_strs: list[str], deadline: float = RESPONSE_DEADLINE,
+               compact: bool = False, path: TransactionSource = PATH_TO_FILE_XLSX) -> list[str]:
+    '''Пакетный вариант main_page: принимает список строк с датой и временем в формате YYYY-MM-DD HH:MM:SS
+    и возвращает JSON-ответы в том же порядке. Файл операций читается один раз, суммы по картам и топ-5
+    транзакций для всех дат считаются за один проход по отсортированным операциям. Курсы валют и акции
+    не зависят от даты (это текущие данные внешних API), поэтому запрашиваются один раз на весь пакет.
+    path - как в main_page'''
+
+    started = time.monotonic()
+    user_settings = load_user_settings()
+    input_dates = [datetime.strptime(datetime_str, '%Y-%m-%d %H:%M:%S') for datetime_str in datetime_strs]
+    futures = submit_market_data(user_settings, started + deadline)
+
+    # Из каталога с выгрузками читаются только партиции с начала самого раннего месяца до самой поздней даты
+    store = load_store(path, min(map(month_start, input_dates), default=None), max(input_dates, default=None))
+    cards_batch = month_to_date_totals_batch(store, input_dates)
+    top_batch = month_to_date_top_expenses_batch(store, input_dates)
+    # Приветствия для всех дат - одним вызовом по массиву дат
+    greetings = day_parts.classify(input_dates)
+
+    market_data, errors = collect_results(futures, deadline - (time.monotonic() - started))
+    return [dashboard_json(greeting, cards, top_transactions_records(top_df), market_data, errors, compact)
+            for greeting, cards, top_df in zip(greetings, cards_batch, top_batch)]
 
 
 # if __name__ == '__main__':
@@ -54,10 +151,10 @@ def main_page(datetime_str: str) -> str:
 # result = '''
 # {"greeting": "Добрый день",
 #     "cards": [
-#         {"Номер карты": 0, "Сумма платежа": 84830.55, "Кэшбэк": 0.0},
-#         {"Номер карты": "*4556", "Сумма платежа": 3775.7000000000003, "Кэшбэк": 181.0},
-#         {"Номер карты": "*5091", "Сумма платежа": 15193.330000000002, "Кэшбэк": 0.0},
-#         {"Номер карты": "*7197", "Сумма платежа": 24576.629999999997, "Кэшбэк": 0.0}],
+#         {"Номер карты": "*4556", "Сумма платежа": 3775.7, "Кэшбэк": 37},
+#         {"Номер карты": "*5091", "Сумма платежа": 15193.33, "Кэшбэк": 151},
+#         {"Номер карты": "*7197", "Сумма платежа": 24576.63, "Кэшбэк": 245},
+#         {"Номер карты": null, "Сумма платежа": 84830.55, "Кэшбэк": 848}],
 #     "top_transactions": [
 #         {"Дата операции": "22.12.2021", "Сумма платежа": 28001.94, "Категория": "Переводы",
 #           "Описание": "Перевод Кредитная карта. ТП 10.2 RUR"},
@@ -0,0 +1,104 @@
+import datetime
+import itertools
+from typing import Iterator
+import numpy as np
+import pandas as pd
+from openpyxl import load_workbook  # type: ignore[import-untyped]
+from src.store import DATE_COLUMN, DATE_FORMAT, money_to_kopecks, money_to_rubles
+from src.aggregates import AMOUNT_COLUMN, CARD_COLUMN, card_keys, card_totals_records
+from src.top_n import top_expenses
+from src.reports import parse_report_date
+from src.utils import top_transactions_records
+
+
+# Число строк листа, которые держатся в памяти одновременно
+CHUNK_SIZE = 10_000
+# Номер строки файла - для порядка операций с одинаковой датой, как при чтении всего файла
+ROW_COLUMN = '_row'
+
+
+def iter_xlsx_chunks(file_path: str, start: datetime.datetime | None = None, end: datetime.datetime | None = None,
+                     chunk_size: int = CHUNK_SIZE) -> Iterator[pd.DataFrame]:
+    '''Читает xlsx файл с операциями построчно (openpyxl в режиме read-only) и отдает DataFrame
+    не больше чем по chunk_size строк с разобранной датой операции и суммами в копейках. Если передан период,
+    строки вне него отбрасываются сразу, поэтому память не зависит от размера файла.
+    Индекс строк - номер операции в файле, как у DataFrame из pd.read_excel'''
+
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+        columns = [str(name) for name in header]
+        offset = 0
+        while True:
+            values = list(itertools.islice(rows, chunk_size))
+            if not values:
+                break
+            chunk = pd.DataFrame(values, columns=columns, index=pd.RangeIndex(offset, offset + len(values)))
+            offset += len(values)
+            # Пустые ячейки - NaN, как у pd.read_excel
+            chunk = chunk.where(chunk.notna(), np.nan)
+            chunk[DATE_COLUMN] = pd.to_datetime(chunk[DATE_COLUMN], format=DATE_FORMAT)
+            chunk = money_to_kopecks(chunk)
+            if start is not None:
+                chunk = chunk[chunk[DATE_COLUMN] >= start]
+            if end is not None:
+                chunk = chunk[chunk[DATE_COLUMN] <= end]
+            if len(chunk):
+                yield chunk
+    finally:
+        workbook.close()
+
+
+def stream_card_totals(file_path: str, input_date_str: str, chunk_size: int = CHUNK_SIZE) -> list[dict]:
+    '''Потоковый вариант process_xlsx_file_with_date_filter: суммы расходов и кэшбэка по картам
+    с начала месяца до переданной даты. В памяти держится одна порция строк и суммы по картам'''
+
+    input_date = datetime.datetime.strptime(input_date_str, '%Y-%m-%d %H:%M:%S')
+    start_of_month = input_date.replace(day=1, hour=0, minute=0, second=0)
+    totals = None
+    for chunk in iter_xlsx_chunks(file_path, start_of_month, input_date, chunk_size):
+        payments = chunk[chunk[AMOUNT_COLUMN] < 0]
+        grouped = payments[[AMOUNT_COLUMN]].groupby(card_keys(payments[CARD_COLUMN]), dropna=False).sum()
+        totals = grouped if totals is None else pd.concat([totals, grouped]).groupby(level=0, dropna=False).sum()
+    if totals is None:
+        return []
+    totals.index.name = CARD_COLUMN
+    totals[AMOUNT_COLUMN] = totals[AMOUNT_COLUMN].abs()
+    return card_totals_records(totals.reset_index())
+
+
+def stream_top_transactions(file_path: str, input_date_str: str, n: int = 5, group_by: str | None = None,
+                            chunk_size: int = CHUNK_SIZE) -> list[dict]:
+    '''Потоковый вариант top_transactions_by_amount: топ-n расходов с начала месяца до переданной даты.
+    Из каждой порции строк к текущему топу добавляются только её лучшие n операций (в каждой группе)'''
+
+    input_date = datetime.datetime.strptime(input_date_str, '%Y-%m-%d %H:%M:%S')
+    start_of_month = input_date.replace(day=1, hour=0, minute=0, second=0)
+    best = None
+    for chunk in iter_xlsx_chunks(file_path, start_of_month, input_date, chunk_size):
+        pool = chunk if best is None else pd.concat([best, chunk])
+        # При равных суммах выше операция с более ранней датой, как в хранилище, отсортированном по дате
+        pool = pool.assign(**{ROW_COLUMN: pool.index}).sort_values([DATE_COLUMN, ROW_COLUMN], kind='stable')
+        best = pool.loc[top_expenses(pool, n, by=group_by).index].drop(columns=ROW_COLUMN)
+    if best is None:
+        return []
+    best = best.assign(**{ROW_COLUMN: best.index}).sort_values([DATE_COLUMN, ROW_COLUMN], kind='stable')
+    return top_transactions_records(top_expenses(best.drop(columns=ROW_COLUMN), n, by=group_by), group_by)
+
+
+def stream_expenses_by_category(file_path: str, category: str, date_str: str | None = None,
+                                chunk_size: int = CHUNK_SIZE) -> list[dict]:
+    '''Потоковый вариант expenses_by_category: траты по категории за 90 дней до переданной даты
+    (или текущей). В памяти держится одна порция строк и найденные операции'''
+
+    date = parse_report_date(date_str)
+    start_date = date - datetime.timedelta(days=90)
+    found = [chunk[chunk['Категория'] == category]
+             for chunk in iter_xlsx_chunks(file_path, start_date, date, chunk_size)]
+    found = [part for part in found if len(part)]
+    if not found:
+        return []
+    return money_to_rubles(pd.concat(found)).to_dict('records')
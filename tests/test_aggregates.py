@@ -0,0 +1,111 @@
+import pytest
+import pandas as pd
+from datetime import datetime
+from src.store import TransactionStore
+from src.aggregates import card_cube, card_totals_records, daily_card_totals, month_to_date_totals_batch
+
+
+@pytest.fixture
+def mock_data():
+    """Фикстура для создания тестового DataFrame."""
+    data = {
+        "Дата операции": ["2021-12-30 16:44:00", "2021-12-11 19:03:48", "2021-12-11 09:00:00", "2021-12-03 22:24:47",
+                          "2021-11-26 14:43:37", "2021-12-31 18:00:00"],
+        "Номер карты": ["*7197", "*7197", None, "*5091", "*7197", "*5091"],
+        "Сумма платежа": [-160.89, -309.0, -50.0, -496.51, -105.84, -100.0],
+        "Кэшбэк": [float('nan'), 3.09, 0, 4.97, 2, 1]
+    }
+    df = pd.DataFrame(data)
+    df['Дата операции'] = pd.to_datetime(df['Дата операции'], format='%Y-%m-%d %H:%M:%S')
+    return df
+
+
+def raw_month_to_date(df, input_date):
+    '''Эталонный расчет сумм по картам в копейках группировкой сырых операций'''
+
+    df = df.assign(**{'Сумма платежа': (df['Сумма платежа'] * 100).round().astype('int64')})
+    start_of_month = input_date.replace(day=1, hour=0, minute=0, second=0)
+    filtered = df[(df['Дата операции'] >= start_of_month) & (df['Дата операции'] <= input_date)]
+    filtered = filtered[filtered['Сумма платежа'] < 0]
+    grouped = filtered.groupby('Номер карты', dropna=False)[['Сумма платежа']].sum()
+    grouped['Сумма платежа'] = grouped['Сумма платежа'].abs()
+    return grouped.reset_index()
+
+
+def test_daily_card_totals(mock_data):
+    '''Дневные агрегаты считаются только по расходам, операции без карты - в группе с пустым номером'''
+
+    daily = daily_card_totals(mock_data)
+
+    assert daily.loc[(pd.Period('2021-12', 'M'), '*7197', 11), 'Сумма платежа'] == -309.0
+    no_card = daily[daily.index.get_level_values('Номер карты').isna()]
+    assert no_card['Сумма платежа'].tolist() == [-50.0]
+    assert len(daily) == 6
+
+
+@pytest.mark.parametrize('input_date', [
+    datetime(2021, 12, 31, 16, 44),
+    datetime(2021, 12, 31, 18, 0),
+    datetime(2021, 12, 11, 12, 0),
+    datetime(2021, 11, 30, 0, 0),
+    datetime(2022, 1, 10, 0, 0),
+])
+def test_month_to_date_matches_raw_grouping(mock_data, input_date):
+    '''Суммы из таблицы агрегатов совпадают с группировкой сырых операций'''
+
+    result = card_cube(TransactionStore(mock_data)).month_to_date(input_date)
+    expected = raw_month_to_date(mock_data, input_date)
+
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+
+
+def test_cube_built_once(mock_data):
+    '''Таблица агрегатов строится один раз для хранилища'''
+
+    store = TransactionStore(mock_data)
+    assert card_cube(store) is card_cube(store)
+
+
+def test_cube_updated_on_append(mock_data):
+    '''При добавлении операций таблица обновляется, а не строится заново'''
+
+    store = TransactionStore(mock_data.iloc[:3])
+    cube = card_cube(store)
+    store.append(mock_data.iloc[3:])
+
+    assert card_cube(store) is cube
+    result = cube.month_to_date(datetime(2021, 12, 31, 23, 59, 59))
+    expected = raw_month_to_date(mock_data, datetime(2021, 12, 31, 23, 59, 59))
+    pd.testing.assert_frame_equal(result, expected, check_dtype=False)
+    assert store.version == 1
+    assert len(store) == 6
+
+
+def test_month_to_date_totals_batch(mock_data):
+    '''Пакетный расчет для многих дат совпадает с расчетом для каждой даты отдельно'''
+
+    input_dates = [datetime(2021, 12, 31, 16, 44), datetime(2021, 11, 30), datetime(2021, 12, 11, 12, 0),
+                   datetime(2022, 1, 10), datetime(2021, 12, 31, 18, 0)]
+    store = TransactionStore(mock_data)
+
+    results = month_to_date_totals_batch(store, input_dates)
+
+    assert len(results) == len(input_dates)
+    for result, input_date in zip(results, input_dates):
+        assert result == card_totals_records(card_cube(store).month_to_date(input_date))
+
+
+def test_card_totals_exact_in_kopecks():
+    '''Суммы считаются в копейках без ошибок округления, кэшбэк - 1 рубль на каждые полные 100 рублей'''
+
+    df = pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2021-12-01 10:00:00", "2021-12-02 10:00:00", "2021-12-03 10:00:00"]),
+        "Номер карты": ["*7197", "*7197", "*7197"],
+        "Сумма платежа": [-0.1, -0.2, -199.75],
+        "Кэшбэк": [None, None, None]
+    })
+    store = TransactionStore(df)
+
+    assert store.df["Сумма платежа"].tolist() == [-10, -20, -19975]
+    totals = card_totals_records(card_cube(store).month_to_date(datetime(2021, 12, 31)))
+    assert totals == [{"Номер карты": "*7197", "Сумма платежа": 200.05, "Кэшбэк": 2}]
@@ -0,0 +1,124 @@
+from datetime import datetime
+import pandas as pd
+import pytest
+import requests
+from unittest.mock import Mock, patch
+from src.errors import DataSourceError, Result, SchemaError, UpstreamError, UpstreamTimeout, error_info, \
+    require_columns
+from src.store import load_store
+from src.market_client import MarketDataClient, set_market_client
+from src.aggregates import month_to_date_totals_batch
+from src.reports import expenses_report
+from src.utils import process_xlsx_file_with_date_filter, recent_currency_rates, stock_prices_func, \
+    top_transactions_by_amount
+
+
+@pytest.mark.parametrize('error, retryable', [
+    (UpstreamError("Запрос не выполнен", 503), True),
+    (UpstreamError("Запрос не выполнен", 429), True),
+    (UpstreamError("Запрос не выполнен", 401), False),
+    (UpstreamError("API недоступен"), True),
+    (UpstreamTimeout("API не ответил"), True),
+    (SchemaError("Нет столбцов"), False),
+])
+def test_error_info(error, retryable):
+    '''Описание ошибки содержит тип, сообщение и признак, что запрос можно повторить'''
+
+    assert error_info(error) == {"type": type(error).__name__, "message": str(error), "retryable": retryable}
+
+
+def test_result():
+    '''Результат с ошибкой хранит данные и описание ошибки'''
+
+    result = Result([{"currency": "USD"}])
+    assert result.ok
+    result.add_error("currency_rates", UpstreamTimeout("API не ответил"))
+
+    assert not result.ok
+    assert result.data == [{"currency": "USD"}]
+    assert result.errors["currency_rates"]["type"] == "UpstreamTimeout"
+
+
+def test_require_columns():
+    '''Недостающие столбцы перечисляются в SchemaError'''
+
+    with pytest.raises(SchemaError, match="Номер карты, Описание"):
+        require_columns(pd.DataFrame({"Категория": []}), ("Категория", "Номер карты", "Описание"))
+
+
+def test_missing_or_corrupt_file(tmp_path):
+    '''Отсутствующий или поврежденный файл - DataSourceError, а не пустой результат'''
+
+    corrupt = tmp_path / "operations.xlsx"
+    corrupt.write_bytes(b"not an xlsx file")
+
+    with pytest.raises(DataSourceError, match="не найден"):
+        load_store(str(tmp_path / "missing.xlsx"))
+    with pytest.raises(DataSourceError):
+        process_xlsx_file_with_date_filter(str(corrupt), "2021-12-31 16:44:00")
+
+
+def test_missing_date_column_in_file(tmp_path):
+    '''Файл читается, но в нем нет столбца с датой - SchemaError, а не DataSourceError'''
+
+    path = tmp_path / "operations.csv"
+    path.write_text("Сумма платежа,Описание\n-1.0,Колхоз\n", encoding="utf-8")
+
+    with pytest.raises(SchemaError, match="Дата операции"):
+        load_store(str(path))
+
+
+@pytest.mark.parametrize('call', [
+    lambda path: process_xlsx_file_with_date_filter(path, "2021-12-31 16:44:00"),
+    lambda path: top_transactions_by_amount(path, "2021-12-31 16:44:00"),
+    lambda path: month_to_date_totals_batch(load_store(path), [datetime(2021, 12, 31)]),
+    lambda path: expenses_report(path, ["Такси"], date_str="2021-12-31 16:44:00"),
+])
+def test_dates_in_other_format(tmp_path, call):
+    '''Даты в файле не в формате DATE_FORMAT остаются строками: отчеты по датам - SchemaError,
+    а не AttributeError или TypeError при обращении к датам'''
+
+    path = tmp_path / "operations.csv"
+    path.write_text("Дата операции,Номер карты,Сумма платежа,Кэшбэк,Категория,Описание\n"
+                    "2021-12-30 16:44:00,*7197,-160.89,,Такси,Яндекс Такси\n", encoding="utf-8")
+
+    with pytest.raises(SchemaError, match="Дата операции"):
+        call(str(path))
+
+
+def test_missing_columns():
+    '''Нет нужного столбца - SchemaError'''
+
+    df = pd.DataFrame({"Дата операции": pd.to_datetime(["2021-12-30"]), "Сумма платежа": [-1.0]})
+
+    with pytest.raises(SchemaError, match="Номер карты"):
+        process_xlsx_file_with_date_filter(df, "2021-12-31 16:44:00")
+
+
+@pytest.fixture
+def client():
+    '''Клиент внешних API без задержек между повторами'''
+
+    set_market_client(MarketDataClient("marketstack", "apilayer", sleep=lambda seconds: None))
+    yield
+    set_market_client(None)
+
+
+@patch('requests.Session.get')
+def test_upstream_errors(mock_get, client):
+    '''Таймаут, ответ с ошибкой и неожиданный ответ внешнего API - разные типы ошибок'''
+
+    mock_get.side_effect = requests.Timeout()
+    with pytest.raises(UpstreamTimeout):
+        recent_currency_rates()
+
+    mock_get.side_effect = None
+    mock_get.return_value = Mock(status_code=401)
+    with pytest.raises(UpstreamError) as exc_info:
+        recent_currency_rates()
+    assert exc_info.value.status == 401
+    assert not exc_info.value.retryable
+
+    mock_get.return_value = Mock(status_code=200, json=Mock(return_value={"error": "limit"}))
+    with pytest.raises(SchemaError):
+        stock_prices_func()
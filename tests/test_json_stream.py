@@ -0,0 +1,63 @@
+import json
+import pytest
+from src.json_stream import iter_json_array, iter_ndjson, paginate
+
+
+RECORDS = [{"Категория": "Супермаркеты", "Сумма": -160.89}, {"Категория": "Фастфуд", "Сумма": -309.0}]
+
+
+@pytest.mark.parametrize('records', [RECORDS, RECORDS[:1], []])
+def test_iter_json_array_indent_matches_json_dumps(records):
+    '''С отступами результат совпадает с json.dumps'''
+
+    result = "".join(iter_json_array(iter(records), indent=4))
+
+    assert result == json.dumps(records, indent=4, ensure_ascii=False)
+
+
+def test_iter_json_array_compact():
+    '''Компактный JSON отдается по одной части на запись'''
+
+    chunks = list(iter_json_array(iter(RECORDS)))
+
+    assert len(chunks) == 3
+    assert "".join(chunks) == '[{"Категория":"Супермаркеты","Сумма":-160.89},{"Категория":"Фастфуд","Сумма":-309.0}]'
+
+
+def test_iter_ndjson():
+    '''Одна строка NDJSON на запись'''
+
+    lines = list(iter_ndjson(RECORDS))
+
+    assert [json.loads(line) for line in lines] == RECORDS
+    assert all(line.endswith("\n") for line in lines)
+
+
+@pytest.mark.parametrize('encode', [
+    lambda records: "".join(iter_json_array(records)),
+    lambda records: "".join(iter_json_array(records, indent=4)),
+    lambda records: "[" + ",".join(iter_ndjson(records)) + "]",
+])
+def test_nan_is_null(encode):
+    '''NaN кодируется как null, а не как NaN, которого нет в JSON'''
+
+    result = encode([{"Кэшбэк": float("nan"), "Сумма": -1.0}, {"Кэшбэк": 5.0, "Сумма": float("inf")}])
+
+    assert "NaN" not in result and "Infinity" not in result
+    assert json.loads(result) == [{"Кэшбэк": None, "Сумма": -1.0}, {"Кэшбэк": 5.0, "Сумма": None}]
+
+
+@pytest.mark.parametrize('offset, limit, expected_page, expected_cursor', [
+    (0, 2, [0, 1], 2),
+    (2, 2, [2, 3], 4),
+    (4, 2, [4], None),
+    (0, None, [0, 1, 2, 3, 4], None),
+    (5, 2, [], None),
+])
+def test_paginate(offset, limit, expected_page, expected_cursor):
+    '''Страница и курсор следующей страницы'''
+
+    page, cursor = paginate(list(range(5)), offset, limit)
+
+    assert list(page) == expected_page
+    assert cursor == expected_cursor
@@ -0,0 +1,63 @@
+import time
+import threading
+import logging
+import importlib
+from logging.handlers import QueueHandler
+import src.log_config
+from src.log_config import get_logger, parse_levels, setup_logging
+
+
+def package_queue_handlers():
+    return [handler for handler in logging.getLogger('src').handlers if isinstance(handler, QueueHandler)]
+
+
+def test_setup_logging_idempotent():
+    '''Повторная настройка и перезагрузка модулей не добавляют обработчики'''
+
+    setup_logging()
+    setup_logging()
+    importlib.reload(src.log_config)
+    src.log_config.setup_logging()
+    importlib.reload(importlib.import_module('src.utils'))
+
+    assert len(package_queue_handlers()) == 1
+    assert not logging.getLogger('src.utils').handlers
+
+
+def test_records_go_through_listener():
+    '''Записи передаются обработчикам в потоке QueueListener, а не в вызывающем потоке'''
+
+    records = []
+
+    class Collect(logging.Handler):
+        def emit(self, record):
+            records.append((record.getMessage(), threading.current_thread()))
+
+    listener = src.log_config.setup_logging()
+    handlers = listener.handlers
+    listener.handlers = handlers + (Collect(),)
+    try:
+        get_logger('src.test').warning('Сообщение %s', 'из теста')
+        deadline = time.monotonic() + 5
+        while not records and time.monotonic() < deadline:
+            time.sleep(0.01)
+    finally:
+        listener.handlers = handlers
+
+    assert records[0][0] == 'Сообщение из теста'
+    assert records[0][1] is not threading.current_thread()
+
+
+def test_levels():
+    '''Уровни модулей задаются отдельно, сообщения DEBUG по умолчанию отбрасываются'''
+
+    src.log_config.setup_logging(levels={'src.store': 'WARNING'})
+    try:
+        assert not get_logger('src.utils').isEnabledFor(logging.DEBUG)
+        assert get_logger('src.utils').isEnabledFor(logging.INFO)
+        assert not get_logger('src.store').isEnabledFor(logging.INFO)
+        assert get_logger('__main__').name == 'src.__main__'
+        levels = parse_levels('src.utils=debug, src.store=WARNING,,bad')
+        assert levels == {'src.utils': 'DEBUG', 'src.store': 'WARNING'}
+    finally:
+        logging.getLogger('src.store').setLevel(logging.NOTSET)
@@ -0,0 +1,119 @@
+import json
+import asyncio
+import threading
+from unittest.mock import patch
+from src.main import DashboardServer
+from src.metrics import LatencyHistogram
+from src.errors import DataSourceError, UpstreamError, UpstreamTimeout
+
+
+async def fetch(port: int, target: str, method: str = "GET") -> tuple[int, dict]:
+    '''Отправляет один запрос серверу и возвращает код и разобранное тело ответа'''
+
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(f"{method} {target} HTTP/1.1\r\nHost: localhost\r\nConnection: close\r\n\r\n".encode())
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+    head, _, body = response.partition(b"\r\n\r\n")
+    return int(head.split()[1]), json.loads(body)
+
+
+def run_with_server(server: DashboardServer, *targets: str) -> list[tuple[int, dict]]:
+    '''Запускает сервер на свободном порту, выполняет запросы параллельно и останавливает сервер'''
+
+    async def scenario() -> list[tuple[int, dict]]:
+        tcp_server = await server.start("127.0.0.1", 0)
+        port = tcp_server.sockets[0].getsockname()[1]
+        async with tcp_server:
+            return await asyncio.gather(*(fetch(port, target) for target in targets))
+
+    return asyncio.run(scenario())
+
+
+def test_routes():
+    '''Запросы передаются в функции главной страницы, поиска и отчета с параметрами из адреса'''
+
+    server = DashboardServer(path="operations.xlsx")
+    with patch('src.main.main_page', return_value='{"greeting": "Добрый день"}') as mock_main_page, \
+         patch('src.main.search_string_in_operations', return_value='[]') as mock_search, \
+         patch('src.main.expenses_by_category', return_value=[{"Категория": "Фастфуд"}]) as mock_expenses:
+        results = run_with_server(server, "/main?datetime=2021-12-31%2016:44:00", "/search?q=%D0%BA%D0%B0",
+                                  "/reports/expenses?category=Фастфуд")
+
+    assert results == [(200, {"greeting": "Добрый день"}), (200, []), (200, [{"Категория": "Фастфуд"}])]
+    mock_main_page.assert_called_once_with("2021-12-31 16:44:00", compact=True, path="operations.xlsx")
+    mock_search.assert_called_once_with("operations.xlsx", "ка", method="index", compact=True)
+    mock_expenses.assert_called_once_with("operations.xlsx", "Фастфуд", None)
+
+
+def test_errors():
+    '''Неизвестный адрес - 404, нет обязательного параметра или неверная дата - 400'''
+
+    server = DashboardServer()
+    with patch('src.main.main_page', side_effect=ValueError("Неверный формат даты")):
+        results = run_with_server(server, "/unknown", "/search", "/main?datetime=31.12.2021")
+
+    assert [status for status, _ in results] == [404, 400, 400]
+    assert results[2][1] == {"error": "Неверный формат даты"}
+
+
+def test_data_errors():
+    '''Ошибки данных возвращаются с типом и признаком повтора: файл - 503, API - 502, таймаут API - 504'''
+
+    server = DashboardServer()
+    with patch('src.main.search_string_in_operations', side_effect=DataSourceError("Файл не найден")), \
+         patch('src.main.main_page', side_effect=UpstreamTimeout("API не ответил")), \
+         patch('src.main.expenses_by_category', side_effect=UpstreamError("Ошибка", 401)):
+        results = run_with_server(server, "/search?q=a", "/main?datetime=2021-12-31%2016:44:00",
+                                  "/reports/expenses?category=a")
+
+    assert [status for status, _ in results] == [503, 504, 502]
+    assert results[0][1] == {"error": "Файл не найден", "type": "DataSourceError", "retryable": False}
+    assert results[1][1]["retryable"]
+
+
+def test_requests_handled_concurrently():
+    '''Медленный запрос не блокирует остальные: работа выполняется в пуле потоков'''
+
+    release = threading.Event()
+    server = DashboardServer(workers=2)
+
+    def slow_main_page(datetime_str: str, compact: bool = False, path: str = "") -> str:
+        release.wait(5)
+        return '{}'
+
+    def fast_search(path: str, search: str, method: str = "index", compact: bool = False) -> str:
+        release.set()
+        return '[]'
+
+    with patch('src.main.main_page', side_effect=slow_main_page), \
+         patch('src.main.search_string_in_operations', side_effect=fast_search):
+        results = run_with_server(server, "/main?datetime=2021-12-31%2016:44:00", "/search?q=a")
+
+    assert results == [(200, {}), (200, [])]
+    assert release.is_set()
+
+
+def test_metrics():
+    '''Время выполнения запросов попадает в гистограмму своего адреса'''
+
+    server = DashboardServer()
+    with patch('src.main.search_string_in_operations', return_value='[]'):
+        run_with_server(server, "/search?q=a", "/search?q=b")
+        (status, metrics), = run_with_server(server, "/metrics")
+
+    assert status == 200
+    assert metrics["/search"]["count"] == 2
+    assert metrics["/search"]["buckets"]["+Inf"] == 2
+    assert metrics["/main"]["count"] == 0
+
+
+def test_latency_histogram():
+    '''Наблюдения считаются нарастающим итогом по границам корзин'''
+
+    histogram = LatencyHistogram(buckets=(0.1, 1.0))
+    for seconds in (0.05, 0.1, 0.5, 3.0):
+        histogram.observe(seconds)
+
+    assert histogram.snapshot() == {"buckets": {"0.1": 2, "1.0": 3, "+Inf": 4}, "count": 4, "sum": 3.65}
@@ -0,0 +1,158 @@
+import threading
+import pytest
+from unittest.mock import Mock
+from src.errors import UpstreamError, UpstreamTimeout
+from src.market_cache import TTLCache, cached_market_data, cached_market_result
+
+
+class FakeClock:
+    """Часы, время которых меняется вручную."""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+
+class Fetcher:
+    """Источник данных, считающий обращения."""
+
+    def __init__(self, values):
+        self.values = list(values)
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.values.pop(0)
+
+
+def test_fresh_value_from_cache(clock):
+    '''Свежая запись отдается без обращения к источнику'''
+
+    cache = TTLCache(clock=clock)
+    fetch = Fetcher([["first"], ["second"]])
+
+    assert cache.get_or_fetch("key", fetch, ttl=60) == ["first"]
+    clock.now += 59
+    assert cache.get_or_fetch("key", fetch, ttl=60) == ["first"]
+    assert fetch.calls == 1
+
+
+def test_expired_value_fetched_again(clock):
+    '''Запись старше ttl + stale_ttl запрашивается заново'''
+
+    cache = TTLCache(clock=clock)
+    fetch = Fetcher([["first"], ["second"]])
+
+    cache.get_or_fetch("key", fetch, ttl=60, stale_ttl=60)
+    clock.now += 121
+
+    assert cache.get_or_fetch("key", fetch, ttl=60, stale_ttl=60) == ["second"]
+
+
+def test_stale_while_revalidate(clock):
+    '''Устаревшая запись отдается сразу, обновление идет в фоне'''
+
+    cache = TTLCache(clock=clock)
+    started = threading.Event()
+    release = threading.Event()
+    values = iter([["first"], ["second"]])
+
+    def fetch():
+        value = next(values)
+        if value == ["second"]:
+            started.set()
+            release.wait(5)
+        return value
+
+    cache.get_or_fetch("key", fetch, ttl=60, stale_ttl=600)
+    clock.now += 61
+
+    assert cache.get_or_fetch("key", fetch, ttl=60, stale_ttl=600) == ["first"]
+    assert started.wait(5)
+    # Повторное обращение во время обновления не запускает второе обновление
+    assert cache.get_or_fetch("key", fetch, ttl=60, stale_ttl=600) == ["first"]
+    release.set()
+    for future in cache.pending_refreshes():
+        future.result(5)
+
+    assert cache.get_or_fetch("key", fetch, ttl=60, stale_ttl=600) == ["second"]
+
+
+def test_empty_result_not_cached(clock):
+    '''Пустой ответ (ошибка API) не кэшируется'''
+
+    cache = TTLCache(clock=clock)
+    fetch = Fetcher([[], ["value"]])
+
+    assert cache.get_or_fetch("key", fetch, ttl=60) == []
+    assert cache.get_or_fetch("key", fetch, ttl=60) == ["value"]
+
+
+def test_lru_eviction(clock):
+    '''При переполнении вытесняется давно не использованная запись'''
+
+    cache = TTLCache(maxsize=2, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == (clock.now, 1)
+
+
+def test_disk_store(tmp_path, clock):
+    '''Записи сохраняются на диске и доступны другому экземпляру кэша'''
+
+    TTLCache(directory=str(tmp_path), clock=clock).set("key", [{"currency": "USD", "rate": 1.03}])
+    fetch = Fetcher([["new"]])
+
+    cache = TTLCache(directory=str(tmp_path), clock=clock)
+    assert cache.get_or_fetch("key", fetch, ttl=60) == [{"currency": "USD", "rate": 1.03}]
+    assert fetch.calls == 0
+
+
+def test_cached_market_data_key_includes_symbols(clock):
+    '''Ключ кэша включает запрошенные символы'''
+
+    cache = TTLCache(clock=clock)
+    calls = []
+
+    def fetch(symbols):
+        calls.append(symbols)
+        return [{"symbol": symbol} for symbol in symbols]
+
+    assert cached_market_data(cache, "stock_prices", fetch, ("AAPL",)) == [{"symbol": "AAPL"}]
+    assert cached_market_data(cache, "stock_prices", fetch, ("TSLA",)) == [{"symbol": "TSLA"}]
+    assert cached_market_data(cache, "stock_prices", fetch, ("AAPL",)) == [{"symbol": "AAPL"}]
+    assert calls == [("AAPL",), ("TSLA",)]
+
+
+def test_cached_market_result_serves_stale_on_upstream_error(clock):
+    '''При ошибке API отдаются сохраненные данные любой давности с описанием ошибки'''
+
+    cache = TTLCache(clock=clock)
+    responses = [[{"currency": "USD"}], UpstreamTimeout("API не ответил")]
+
+    def fetch(symbols):
+        response = responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+    assert cached_market_result(cache, "currency_rates", fetch, ("USD",)).data == [{"currency": "USD"}]
+    clock.now += 10 * 24 * 60 * 60
+    result = cached_market_result(cache, "currency_rates", fetch, ("USD",))
+
+    assert result.stale
+    assert result.data == [{"currency": "USD"}]
+    assert result.errors["currency_rates"]["type"] == "UpstreamTimeout"
+    with pytest.raises(UpstreamError):
+        cached_market_result(cache, "currency_rates", Mock(side_effect=UpstreamError("Ошибка", 500)), ("EUR",))
@@ -0,0 +1,208 @@
+import json
+import threading
+import time
+import pytest
+import requests
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from concurrent.futures import ThreadPoolExecutor
+from src.market_client import MarketDataClient, set_market_client
+from src.utils import stock_prices_func, recent_currency_rates
+
+
+class StubServer:
+    """Локальный HTTP-сервер, отвечающий заранее заданными ответами."""
+
+    def __init__(self):
+        self.responses = []
+        self.requests = []
+        self.client_ports = set()
+        self.delay = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                stub.requests.append(self.path)
+                stub.client_ports.add(self.client_address[1])
+                time.sleep(stub.delay)
+                status, body, *headers = stub.responses.pop(0) if len(stub.responses) > 1 else stub.responses[0]
+                data = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                for name, value in (headers[0] if headers else {}).items():
+                    self.send_header(name, value)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(target=self.server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubServer()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def client(stub):
+    delays = []
+    client = MarketDataClient(marketstack_key="key", apilayer_key="key", marketstack_url=stub.url + "/v2/eod",
+                              apilayer_url=stub.url + "/exchangerates_data/latest", sleep=delays.append)
+    client.delays = delays
+    set_market_client(client)
+    yield client
+    set_market_client(None)
+
+
+EOD = {"data": [{"symbol": "AAPL", "close": 233.22, "date": "2024-09-27T00:00:00+0000"},
+                {"symbol": "TSLA", "close": 374.32, "date": "2024-09-27T00:00:00+0000"}]}
+
+
+def test_connections_reused(stub, client):
+    '''Запросы идут через одно постоянное соединение'''
+
+    stub.responses = [(200, EOD)]
+    for _ in range(3):
+        assert client.get(client.marketstack_url, params={"symbols": "AAPL"}).status_code == 200
+
+    assert len(stub.requests) == 3
+    assert len(stub.client_ports) == 1
+
+
+def test_retry_on_server_error(stub, client):
+    '''Ответы 429 и 5xx повторяются с растущей задержкой'''
+
+    stub.responses = [(503, {}), (429, {}), (200, EOD)]
+
+    response = client.get(client.marketstack_url)
+
+    assert response.status_code == 200
+    assert len(stub.requests) == 3
+    assert len(client.delays) == 2
+    assert 0.25 <= client.delays[0] <= 0.75
+    assert 0.5 <= client.delays[1] <= 1.5
+
+
+def test_retries_exhausted(stub, client):
+    '''После исчерпания повторов возвращается последний ответ'''
+
+    stub.responses = [(500, {})]
+
+    assert client.get(client.marketstack_url).status_code == 500
+    assert len(stub.requests) == client.retries + 1
+
+
+def test_retry_after_respected_within_limit(stub, client):
+    '''Задержка из Retry-After используется, если она не больше max_delay'''
+
+    stub.responses = [(429, {}, {"Retry-After": "2"}), (200, EOD)]
+
+    assert client.get(client.marketstack_url).status_code == 200
+    assert client.delays == [2.0]
+
+
+def test_long_retry_after_not_waited(stub, client):
+    '''Если API просит подождать дольше max_delay, поток не засыпает, а возвращает ответ 429'''
+
+    stub.responses = [(429, {}, {"Retry-After": "3600"}), (200, EOD)]
+
+    assert client.get(client.marketstack_url).status_code == 429
+    assert len(stub.requests) == 1
+    assert client.delays == []
+
+
+def test_backoff_capped(stub, client):
+    '''Экспоненциальная задержка не превышает max_delay'''
+
+    client.max_delay = 0.6
+    stub.responses = [(503, {})]
+
+    client.get(client.marketstack_url)
+
+    assert len(client.delays) == client.retries
+    assert max(client.delays) <= 0.6
+
+
+def test_no_retry_after_deadline(stub, client):
+    '''Повтор, который не успевает до срока ответа, не выполняется: поток не занят после срока'''
+
+    now = [0.0]
+    client.clock = lambda: now[0]
+    client.sleep = lambda delay: now.__setitem__(0, now[0] + delay)
+    stub.responses = [(503, {})]
+
+    assert client.get(client.marketstack_url, deadline=1.0).status_code == 503
+    assert len(stub.requests) < client.retries + 1
+    assert now[0] < 1.0
+
+
+def test_deadline_limits_request_timeout(stub, client):
+    '''Время ожидания ответа сокращается до оставшегося срока, после срока запрос не выполняется'''
+
+    stub.delay = 0.5
+    stub.responses = [(200, EOD)]
+    started = time.monotonic()
+
+    with pytest.raises(requests.Timeout):
+        client.get(client.marketstack_url, deadline=started + 0.1)
+    assert time.monotonic() - started < 0.4
+
+    requests_made = len(stub.requests)
+    with pytest.raises(requests.Timeout):
+        client.get(client.marketstack_url, deadline=time.monotonic() - 1)
+    assert len(stub.requests) == requests_made
+
+
+def test_no_retry_on_client_error(stub, client):
+    '''Ответ 400 не повторяется'''
+
+    stub.responses = [(400, {})]
+
+    assert client.get(client.marketstack_url).status_code == 400
+    assert len(stub.requests) == 1
+
+
+def test_concurrent_requests_coalesced(stub, client):
+    '''Одинаковые одновременные запросы объединяются в один запрос к API'''
+
+    stub.responses = [(200, EOD)]
+    stub.delay = 0.3
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        responses = list(executor.map(lambda _: client.get(client.marketstack_url, params={"symbols": "AAPL"}),
+                                      range(5)))
+
+    assert all(response.json() == EOD for response in responses)
+    assert len(stub.requests) == 1
+
+
+def test_stock_prices_func_with_stub(stub, client):
+    '''Получение стоимости акций через локальный сервер'''
+
+    stub.responses = [(200, EOD)]
+
+    assert stock_prices_func(["AAPL", "TSLA"]) == [{"symbol": "AAPL", "close": 233.22},
+                                                   {"symbol": "TSLA", "close": 374.32}]
+    assert stub.requests[0] == "/v2/eod?access_key=key&symbols=AAPL%2CTSLA"
+
+
+def test_recent_currency_rates_with_stub(stub, client):
+    '''Получение курсов валют через локальный сервер'''
+
+    stub.responses = [(200, {"rates": {"USD": 1.03, "EUR": 1}})]
+
+    assert recent_currency_rates() == [{"currency": "USD", "rate": 1.03}, {"currency": "EUR", "rate": 1}]
+    assert stub.requests[0] == "/exchangerates_data/latest?symbols=USD%2CEUR"
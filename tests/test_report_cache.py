@@ -0,0 +1,119 @@
+import pandas as pd
+import pytest
+from src.report_cache import ReportCache, memoize_report
+from src.store import TransactionStore, dataset_fingerprint
+
+
+@pytest.fixture
+def store():
+    '''Хранилище с двумя операциями'''
+
+    return TransactionStore(pd.DataFrame({
+        'Дата операции': pd.to_datetime(['2021-12-01 10:00:00', '2021-12-02 10:00:00']),
+        'Категория': ['Такси', 'Супермаркеты'],
+        'Сумма операции': [-100.0, -200.0]
+    }))
+
+
+def counting_report(cache):
+    '''Отчет, который считает свои вызовы'''
+
+    calls = []
+
+    @memoize_report(cache, volatile=('date_str',))
+    def report(source, category, date_str=None, windows=(30, 90)):
+        calls.append(category)
+        return [category, len(source)]
+
+    return report, calls
+
+
+def test_memoize_report_same_arguments(store):
+    '''Повторный вызов с теми же (нормализованными) аргументами не пересчитывает отчет'''
+
+    report, calls = counting_report(ReportCache())
+
+    first = report(store, 'Такси', '2021-12-31 00:00:00')
+    assert report(store, category='Такси', date_str='2021-12-31 00:00:00', windows=[30, 90]) == first
+    assert report(store, 'Супермаркеты', '2021-12-31 00:00:00') == ['Супермаркеты', 2]
+    assert calls == ['Такси', 'Супермаркеты']
+
+
+def test_memoize_report_returns_copy(store):
+    '''Изменение полученного результата не меняет кэш: каждый вызов получает свою копию'''
+
+    report, calls = counting_report(ReportCache())
+
+    report(store, 'Такси', '2021-12-31 00:00:00').clear()
+    cached = report(store, 'Такси', '2021-12-31 00:00:00')
+    cached.clear()
+
+    assert report(store, 'Такси', '2021-12-31 00:00:00') == ['Такси', 2]
+    assert calls == ['Такси']
+
+
+def test_memoize_report_invalidated_by_append(store):
+    '''После добавления операций версия данных меняется и отчет пересчитывается'''
+
+    report, calls = counting_report(ReportCache())
+
+    assert report(store, 'Такси', '2021-12-31 00:00:00') == ['Такси', 2]
+    store.append(pd.DataFrame({'Дата операции': pd.to_datetime(['2021-12-03 10:00:00']),
+                               'Категория': ['Такси'], 'Сумма операции': [-50.0]}))
+    assert report(store, 'Такси', '2021-12-31 00:00:00') == ['Такси', 3]
+    assert calls == ['Такси', 'Такси']
+
+
+def test_memoize_report_not_cached(store):
+    '''Без даты отчета и для DataFrame результат не кэшируется'''
+
+    report, calls = counting_report(ReportCache())
+
+    report(store, 'Такси')
+    report(store, 'Такси')
+    report(store.df, 'Такси', '2021-12-31 00:00:00')
+    report(store.df, 'Такси', '2021-12-31 00:00:00')
+    assert len(calls) == 4
+    assert dataset_fingerprint(store.df) is None
+
+
+def test_memoize_report_file_fingerprint(tmp_path):
+    '''Для файла ключ зависит от времени изменения и размера: измененный файл пересчитывается'''
+
+    path = tmp_path / 'operations.csv'
+    path.write_text('a\n1\n')
+    report, calls = counting_report(ReportCache())
+
+    report(str(path), 'Такси', '2021-12-31 00:00:00')
+    report(str(path), 'Такси', '2021-12-31 00:00:00')
+    path.write_text('a\n1\n2\n')
+    report(str(path), 'Такси', '2021-12-31 00:00:00')
+    assert len(calls) == 2
+
+
+def test_report_cache_eviction():
+    '''Вытесняются давно не использованные записи: по числу записей и по общему размеру'''
+
+    cache = ReportCache(maxsize=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == (True, 1)
+    cache.put('c', 3)
+    assert cache.get('b') == (False, None)
+    assert len(cache) == 2
+
+    small = ReportCache(max_bytes=200)
+    small.put('big', 'x' * 1000)
+    small.put('small', 1)
+    assert small.get('big') == (False, None)
+    assert small.get('small') == (True, 1)
+
+
+def test_report_cache_disk(tmp_path):
+    '''Результат на диске доступен новому экземпляру кэша (например, после перезапуска процесса)'''
+
+    ReportCache(directory=str(tmp_path)).put('key', {'Сумма': 1.5})
+
+    assert ReportCache(directory=str(tmp_path)).get('key') == (True, {'Сумма': 1.5})
+    assert ReportCache(directory=str(tmp_path)).get('other') == (False, None)
+    assert not list(tmp_path.glob('*.tmp'))
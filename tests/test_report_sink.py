@@ -0,0 +1,154 @@
+import os
+import gzip
+import json
+import stat
+import threading
+import pytest
+from unittest.mock import patch
+import src.report_sink
+from src.report_sink import NEW_FILE_MODE, ReportSink, atomic_write, submit_report, wait_for_reports
+from src.reports import write_to_json
+
+
+def test_atomic_write_keeps_old_file_on_error(tmp_path):
+    '''При ошибке записи старый файл остается целым, временный файл удаляется'''
+
+    path = tmp_path / "report.json"
+    path.write_text("старый")
+
+    with patch("src.report_sink.os.replace", side_effect=OSError("диск")):
+        with pytest.raises(OSError):
+            atomic_write(str(path), b"new")
+
+    assert path.read_text() == "старый"
+    assert [item.name for item in tmp_path.iterdir()] == ["report.json"]
+
+
+@pytest.mark.skipif(os.name != "posix", reason="права файлов POSIX")
+def test_atomic_write_file_mode(tmp_path):
+    '''Новый файл получает права как у open(), перезаписанный сохраняет свои права'''
+
+    path = tmp_path / "report.json"
+    atomic_write(str(path), b"new")
+    assert stat.S_IMODE(path.stat().st_mode) == NEW_FILE_MODE
+
+    path.chmod(0o640)
+    atomic_write(str(path), b"newer")
+    assert stat.S_IMODE(path.stat().st_mode) == 0o640
+
+
+def test_report_sink_template(tmp_path):
+    '''Шаблон имени файла дает разные файлы для разных вызовов, каталог создается'''
+
+    sink = ReportSink(str(tmp_path / "out" / "{name}_{uuid}.json"), compact=True)
+
+    first = sink.write([1], "expenses")
+    second = sink.write([2], "expenses")
+
+    assert first != second
+    assert first.startswith(str(tmp_path / "out" / "expenses_"))
+    assert json.loads(open(second, encoding="utf-8").read()) == [2]
+
+
+def test_report_sink_gzip(tmp_path):
+    '''Сжатый отчет - компактный JSON в gzip, к имени добавляется расширение'''
+
+    path = ReportSink(str(tmp_path / "report.json"), compression="gzip").write({"Категория": "Такси"})
+
+    assert path.endswith("report.json.gz")
+    assert gzip.decompress(open(path, "rb").read()).decode("utf-8") == '{"Категория":"Такси"}'
+
+
+def test_report_sink_ndjson_chunks():
+    '''NDJSON кодируется по строке на запись, без сборки всего отчета в одну строку'''
+
+    sink = ReportSink(ndjson=True)
+
+    assert list(sink.chunks([{"a": 1}, {"a": 2}])) == [b'{"a":1}\n', b'{"a":2}\n']
+
+
+def test_report_sink_ndjson_nan_is_null():
+    '''NaN в NDJSON-отчете записывается как null'''
+
+    sink = ReportSink(ndjson=True)
+
+    assert list(sink.chunks([{"Кэшбэк": float("nan")}])) == ['{"Кэшбэк":null}\n'.encode("utf-8")]
+
+
+def test_report_sink_unchanged_leaves_no_temp_files(tmp_path):
+    '''Неизмененный отчет не перезаписывается, временный файл удаляется'''
+
+    sink = ReportSink(str(tmp_path / "report.ndjson"), ndjson=True, compression="gzip")
+    path = sink.write([{"a": 1}, {"a": 2}])
+    mtime = (tmp_path / "report.ndjson.gz").stat().st_mtime_ns
+
+    assert sink.write([{"a": 1}, {"a": 2}]) == path
+    assert (tmp_path / "report.ndjson.gz").stat().st_mtime_ns == mtime
+    assert [item.name for item in tmp_path.iterdir()] == ["report.ndjson.gz"]
+    assert gzip.decompress(open(path, "rb").read()) == b'{"a":1}\n{"a":2}\n'
+
+
+def test_report_sink_unchanged_is_not_written(tmp_path):
+    '''Неизмененный отчет сравнивается по хэшу до записи: временный файл даже не создается'''
+
+    sink = ReportSink(str(tmp_path / "report.json"))
+    sink.write({"a": 1})
+
+    with patch('src.report_sink.AtomicFile', side_effect=AssertionError("файл не должен писаться")):
+        sink.write({"a": 1})
+    sink.write({"a": 2})
+
+    assert json.loads((tmp_path / "report.json").read_text(encoding="utf-8")) == {"a": 2}
+
+
+def test_report_sink_written_reports_bounded(tmp_path):
+    '''Отчеты с {uuid} в имени не запоминаются, остальные запоминаются не больше WRITTEN_REPORTS_SIZE'''
+
+    with patch('src.report_sink.WRITTEN_REPORTS_SIZE', 2), patch.dict(src.report_sink._written_reports, clear=True):
+        for _ in range(3):
+            ReportSink(str(tmp_path / "report-{uuid}.json")).write({"a": 1})
+        assert len(list(tmp_path.iterdir())) == 3
+        assert not src.report_sink._written_reports
+
+        for index in range(3):
+            ReportSink(str(tmp_path / f"report-{index}.json")).write({"a": 1})
+        assert list(src.report_sink._written_reports) == [str(tmp_path / f"report-{index}.json") for index in (1, 2)]
+
+
+def test_report_sink_unknown_compression():
+    '''Неизвестный формат сжатия - ошибка при создании'''
+
+    with pytest.raises(ValueError):
+        ReportSink(compression="lzma")
+
+
+def test_write_to_json_background(tmp_path):
+    '''В фоновом режиме функция возвращает результат, не дожидаясь записи файла'''
+
+    path = tmp_path / "report.json"
+    release = threading.Event()
+    write = ReportSink.write
+
+    def slow_write(self, result, name="report"):
+        release.wait(5)
+        return write(self, result, name)
+
+    @write_to_json(str(path), background=True)
+    def report():
+        return {"key": "value"}
+
+    with patch.object(ReportSink, "write", slow_write):
+        assert report() == {"key": "value"}
+        assert not path.exists()
+        release.set()
+        assert wait_for_reports(5)
+
+    assert json.loads(path.read_text(encoding="utf-8")) == {"key": "value"}
+
+
+def test_submit_report_returns_path(tmp_path):
+    '''Future фоновой записи возвращает путь к файлу'''
+
+    future = submit_report(ReportSink(str(tmp_path / "{name}.json")), [1, 2], "top")
+
+    assert future.result(5) == str(tmp_path / "top.json")
@@ -2,7 +2,7 @@ import json
 import pytest
 from datetime import datetime
 import pandas as pd
-from src.reports import write_to_json, expenses_by_category
+from src.reports import write_to_json, expenses_by_category, expenses_report
 
 
 # Простая функция для тестирования
@@ -55,6 +55,23 @@ def test_test_function():
         assert data == {"key": "value"}
 
 
+@pytest.mark.parametrize('options, expected', [
+    ({"compact": True}, '[{"key":"value"},{"key":"другое"}]'),
+    ({"ndjson": True}, '{"key":"value"}\n{"key":"другое"}\n'),
+])
+def test_write_to_json_compact_and_ndjson(tmp_path, options, expected):
+    '''Запись отчета в компактном JSON и в формате NDJSON'''
+
+    file_name = tmp_path / "report.json"
+
+    @write_to_json(str(file_name), **options)
+    def report():
+        return [{"key": "value"}, {"key": "другое"}]
+
+    assert report() == [{"key": "value"}, {"key": "другое"}]
+    assert file_name.read_text(encoding="utf-8") == expected
+
+
 @pytest.fixture
 def df_operations():
     """Фикстура для создания тестового датафрейма"""
@@ -121,3 +138,60 @@ def test_expenses_by_category_invalid_date_format(df_operations):
         expenses_by_category(df_operations, category, date_str)
 
     assert str(exc_info.value) == "Неверный формат даты. Ожидается формат YYYY-MM-DD HH:MM:SS"
+
+
+def test_expenses_report_matches_single_reports(df_operations):
+    '''Отчет по нескольким категориям и периодам совпадает с отдельными отчетами по каждой категории'''
+
+    date_str = '2023-04-05 18:00:00'
+    categories = ['Продукты', 'Транспорт', 'Развлечения', 'Одежда']
+
+    report = expenses_report(df_operations, categories, (30, 90, 365), date_str)
+
+    assert list(report) == categories
+    for category in categories:
+        assert report[category][90] == expenses_by_category(df_operations, category, date_str)
+    assert report['Продукты'][30] == []
+    assert [row['Сумма'] for row in report['Продукты'][365]] == [1000]
+    assert [row['Категория'] for row in report['Развлечения'][30]] == ['Развлечения']
+    assert report['Одежда'] == {30: [], 90: [], 365: []}
+
+
+def test_expenses_report_keeps_order_and_input(df_operations):
+    '''Операции идут в порядке исходных данных, переданный DataFrame со строковыми датами не изменяется'''
+
+    df = pd.DataFrame({
+        'Дата операции': ['01.03.2023 10:00:00', '10.01.2023 10:00:00', '30.03.2023 10:00:00'],
+        'Категория': pd.Categorical(['Продукты', 'Продукты', 'Продукты']),
+        'Сумма': [1, 2, 3]
+    })
+    original = df.copy()
+
+    report = expenses_report(df, ['Продукты'], (10, 100), '2023-04-05 18:00:00')
+
+    assert [row['Сумма'] for row in report['Продукты'][10]] == [3]
+    assert [row['Сумма'] for row in report['Продукты'][100]] == [1, 2, 3]
+    pd.testing.assert_frame_equal(df, original)
+
+
+def test_write_to_json_skips_unchanged(tmp_path):
+    '''Неизмененный отчет не перезаписывает файл, измененный или удаленный файл записывается заново'''
+
+    file_name = tmp_path / "report.json"
+    result = {"key": "value"}
+
+    @write_to_json(str(file_name))
+    def report():
+        return result
+
+    report()
+    mtime = file_name.stat().st_mtime_ns
+    report()
+    assert file_name.stat().st_mtime_ns == mtime
+
+    result = {"key": "другое"}
+    report()
+    assert '"другое"' in file_name.read_text(encoding="utf-8")
+    file_name.unlink()
+    report()
+    assert file_name.exists()
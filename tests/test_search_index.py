@@ -0,0 +1,55 @@
+import pytest
+import pandas as pd
+from src.store import TransactionStore
+from src.search_index import SearchIndex, search_index
+
+
+@pytest.fixture
+def store():
+    """Фикстура для создания тестового хранилища."""
+
+    data = {
+        "Дата операции": ["2021-12-30 16:44:00", "2021-12-25 19:03:48", "2021-12-15 22:24:47", "2021-12-10 14:43:37"],
+        "Категория": ["Супермаркеты", "Переводы", "Каршеринг", None],
+        "Описание": ["Колхоз", "Перевод Кредитная карта", "Ситидрайв", "Колхоз Супермаркет"]
+    }
+    return TransactionStore(pd.DataFrame(data))
+
+
+@pytest.mark.parametrize('query, expected', [
+    ("Супермаркет", [0, 3]),
+    ("супермаркеты", [0]),
+    ("КОЛХОЗ", [0, 3]),
+    ("перевод", [1]),
+    ("ка", [1, 2]),
+    ("Такси", []),
+    ("", [0, 1, 2, 3]),
+])
+def test_search(store, query, expected):
+    '''Поиск подстроки без учета регистра в категории и описании, строки без повторов'''
+
+    assert list(SearchIndex(store).search(query)) == expected
+
+
+@pytest.mark.parametrize('query, expected', [
+    ("кредитная карта", [1]),
+    ("карта кредитная", [1]),
+    ("карт", []),
+])
+def test_search_tokens(store, query, expected):
+    '''Поиск по словам: строка должна содержать все слова запроса'''
+
+    assert list(SearchIndex(store).search_tokens(query)) == expected
+
+
+def test_search_index_rebuilt_after_append(store):
+    '''Индекс строится один раз на версию данных и перестраивается после добавления операций'''
+
+    index = search_index(store)
+    assert search_index(store) is index
+
+    store.append(pd.DataFrame({"Дата операции": ["2021-12-31 10:00:00"], "Категория": ["Такси"],
+                               "Описание": ["Яндекс Такси"]}))
+
+    assert search_index(store) is not index
+    assert list(search_index(store).search("такси")) == [4]
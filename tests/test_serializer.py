@@ -0,0 +1,94 @@
+import json
+import numpy as np
+import pandas as pd
+import pytest
+from unittest.mock import patch
+from src.serializer import dumps, frame_to_json, json_default
+
+
+def test_json_default():
+    '''numpy-скаляры становятся числами, массивы - списками, даты - строками'''
+
+    assert json_default(np.int64(5)) == 5
+    assert json_default(np.float32(0.5)) == 0.5
+    assert json_default(np.array([1, 2])) == [1, 2]
+    assert json_default(pd.Timestamp('2021-12-31 16:44:00')) == '2021-12-31 16:44:00'
+    assert json_default(np.datetime64('2021-12-31T16:44:00')) == '2021-12-31 16:44:00'
+
+
+@pytest.mark.parametrize('orjson', [None, 'installed'])
+def test_dumps(orjson):
+    '''Результат одинаковый с orjson и без него; без compact формат как у json.dumps'''
+
+    data = {"Сумма": np.int64(100), "Дата": pd.Timestamp('2021-12-31'), "Карты": ["*7197"]}
+    if orjson is not None:
+        orjson = pytest.importorskip('orjson')
+    with patch('src.serializer.orjson', orjson):
+        assert json.loads(dumps(data, compact=True)) == {"Сумма": 100, "Дата": "2021-12-31 00:00:00",
+                                                         "Карты": ["*7197"]}
+    assert dumps(["Такси"]) == '["Такси"]'
+    assert dumps({"a": 1}, indent=4) == json.dumps({"a": 1}, indent=4)
+    assert dumps({"a": [1, 2]}, compact=True) == '{"a":[1,2]}'
+
+
+DASHBOARD = {"greeting": "Добрый день", "cards": [{"Номер карты": "*7197", "Сумма платежа": np.float64(160.89),
+                                                  "Кэшбэк": np.int64(1)}],
+             "top_transactions": [], "errors": {}, "stock_prices": [{"symbol": "AAPL", "close": 233.22}]}
+
+
+@pytest.mark.parametrize('indent', [2, 4, 0])
+@pytest.mark.parametrize('orjson', [None, 'installed'])
+def test_dumps_indent_same_with_any_backend(orjson, indent):
+    '''JSON с отступом с orjson совпадает с json.dumps'''
+
+    if orjson is not None:
+        orjson = pytest.importorskip('orjson')
+    with patch('src.serializer.orjson', orjson):
+        result = dumps(DASHBOARD, indent=indent)
+
+    assert result == json.dumps(DASHBOARD, indent=indent, ensure_ascii=False, default=json_default)
+
+
+def test_dumps_small_floats_same_value_with_any_backend():
+    '''Малые числа orjson записывает иначе (1e-7 вместо 1e-07), но значение после разбора то же'''
+
+    orjson = pytest.importorskip('orjson')
+    data = {"Курс": 1e-7, "Сумма": 1.5e300}
+    with patch('src.serializer.orjson', orjson):
+        result = dumps(data, indent=4)
+
+    assert json.loads(result) == json.loads(json.dumps(data, indent=4))
+
+
+@pytest.mark.parametrize('orjson', [None, 'installed'])
+def test_dumps_nan_is_null(orjson):
+    '''NaN и бесконечности кодируются как null при любом способе кодирования'''
+
+    data = {"Сумма": float("nan"), "Кэшбэк": np.float32("nan"), "Суммы": np.array([1.5, np.inf]),
+            "Карты": [{"Сумма": -np.inf}]}
+    if orjson is not None:
+        orjson = pytest.importorskip('orjson')
+    with patch('src.serializer.orjson', orjson):
+        results = [dumps(data), dumps(data, indent=4), dumps(data, compact=True)]
+
+    for result in results:
+        assert json.loads(result) == {"Сумма": None, "Кэшбэк": None, "Суммы": [1.5, None],
+                                      "Карты": [{"Сумма": None}]}
+        assert "NaN" not in result and "Infinity" not in result
+
+
+def test_frame_to_json():
+    '''DataFrame кодируется так же, как список его строк-словарей; пропуски - null'''
+
+    df = pd.DataFrame({
+        'Дата операции': pd.to_datetime(['2021-12-31 16:44:00', None]),
+        'Сумма': [-160.89, np.nan],
+        'Категория': pd.Categorical(['Супермаркеты', None]),
+        'Описание': ['Колхоз', 'Ozon.ru']
+    })
+
+    assert json.loads(frame_to_json(df)) == [
+        {'Дата операции': '2021-12-31 16:44:00', 'Сумма': -160.89, 'Категория': 'Супермаркеты', 'Описание': 'Колхоз'},
+        {'Дата операции': None, 'Сумма': None, 'Категория': None, 'Описание': 'Ozon.ru'}]
+    assert [json.loads(line) for line in frame_to_json(df, lines=True).splitlines()] == json.loads(frame_to_json(df))
+    assert frame_to_json(df.iloc[:0]) == '[]'
@@ -1,7 +1,8 @@
+import json
 import pytest
 import pandas as pd
 from unittest.mock import patch
-from src.services import search_string_in_operations
+from src.services import search_string_in_operations, iter_search_results, search_page
 
 
 @pytest.fixture
@@ -67,3 +68,111 @@ def test_search_string_in_operations_failed(mock_read_excel):
 
     with pytest.raises(Exception):
         assert search_string_in_operations("path_to_file.xlsx", search) == "Произошла ошибка:"
+
+
+@pytest.mark.parametrize('method', ['index', 'vectorized', 'scan'])
+def test_search_string_in_operations_no_duplicates(method):
+    '''Операция, у которой совпадают и категория, и описание, возвращается один раз'''
+
+    df = pd.DataFrame({"Категория": ["Такси", "Супермаркеты"], "Описание": ["Яндекс Такси", "Колхоз"]})
+    result = search_string_in_operations(df, "такси", method=method)
+
+    assert result == '[{"Категория": "Такси", "Описание": "Яндекс Такси"}]'
+
+
+@pytest.mark.parametrize('method', ['index', 'vectorized', 'scan'])
+def test_search_string_in_operations_skips_missing(method):
+    '''Пропуски в категории и описании не ищутся: запрос "an" не находит строку "nan"'''
+
+    df = pd.DataFrame({"Категория": ["Такси", None, "Bank"], "Описание": [float("nan"), "Колхоз", None]})
+    result = search_string_in_operations(df, "an", method=method)
+
+    assert [item["Категория"] for item in json.loads(result)] == ["Bank"]
+
+
+def test_search_string_in_operations_regex(mock_data):
+    '''Строка с символами регулярного выражения обрабатывается полным проходом'''
+
+    result = search_string_in_operations(mock_data, "ozon.ru|мтс")
+
+    assert [item["Описание"] for item in json.loads(result)] == ["Ozon.ru", "МТС"]
+
+
+@pytest.mark.parametrize('search, regex, expected', [
+    ("ozon.ru|мтс", True, ["Ozon.ru", "МТС"]),
+    ("ozon.ru|мтс", False, []),
+    ("OZON.RU", False, ["Ozon.ru"]),
+    ("ozon.ru", False, ["Ozon.ru"]),
+])
+@pytest.mark.parametrize('method', ['index', 'vectorized', 'scan'])
+def test_search_string_in_operations_methods(mock_data, method, search, regex, expected):
+    '''Все способы поиска дают одинаковый результат для буквального поиска и регулярного выражения'''
+
+    result = search_string_in_operations(mock_data, search, method=method, regex=regex)
+
+    assert [item["Описание"] for item in json.loads(result)] == expected
+
+
+def test_search_string_in_operations_words():
+    '''Поиск по словам: категория или описание содержат все слова запроса целиком, в любом порядке'''
+
+    df = pd.DataFrame({"Категория": ["Переводы", "Переводы", "Такси"],
+                       "Описание": ["Перевод Кредитная карта", "Перевод с карты", "Кредитная карта Такси"]})
+
+    result = search_string_in_operations(df, "карта перевод", method="words")
+
+    assert [item["Описание"] for item in json.loads(result)] == ["Перевод Кредитная карта"]
+
+
+def test_search_string_in_operations_unknown_method(mock_data):
+    '''Неизвестный способ поиска - ошибка, а не пустой ответ'''
+
+    with pytest.raises(ValueError, match="Неизвестный способ поиска"):
+        search_string_in_operations(mock_data, "Колхоз", method="unknown")
+
+
+@pytest.mark.parametrize('output_format', ['json', 'ndjson'])
+def test_iter_search_results(mock_data, output_format):
+    '''Потоковый поиск отдает те же операции, что и обычный, с учетом смещения и лимита'''
+
+    chunks = list(iter_search_results(mock_data, "р", offset=1, limit=2, output_format=output_format,
+                                      chunk_size=1))
+    if output_format == "json":
+        result = json.loads("".join(chunks))
+    else:
+        result = [json.loads(chunk) for chunk in chunks]
+
+    assert result == json.loads(search_string_in_operations(mock_data, "р"))[1:3]
+
+
+@pytest.mark.parametrize('output_format', ['json', 'ndjson'])
+def test_iter_search_results_nan_is_null(mock_data, output_format):
+    '''Пропущенный кэшбэк отдается как null: результат остается корректным JSON'''
+
+    mock_data["Кэшбэк"] = [float("nan")] + [1.0] * (len(mock_data) - 1)
+    text = "".join(iter_search_results(mock_data, "Колхоз", output_format=output_format))
+
+    assert "NaN" not in text
+    result = json.loads(text) if output_format == "json" else [json.loads(text)]
+    assert result[0]["Кэшбэк"] is None
+
+
+def test_search_page(mock_data):
+    '''Страница результатов поиска с курсором следующей страницы'''
+
+    first = json.loads(search_page(mock_data, "р", limit=2))
+    second = json.loads(search_page(mock_data, "р", cursor=first["next_cursor"], limit=2))
+
+    assert first["total"] == second["total"] == len(json.loads(search_string_in_operations(mock_data, "р")))
+    assert first["next_cursor"] == 2
+    assert [item["Описание"] for item in first["operations"]] == ["Колхоз", "Ozon.ru"]
+    assert second["operations"][0]["Описание"] == "Ситидрайв"
+
+
+def test_search_string_in_operations_compact(mock_data):
+    '''Компактный ответ содержит те же операции, что и обычный'''
+
+    result = search_string_in_operations(mock_data, "р", compact=True)
+
+    assert ', ' not in result
+    assert json.loads(result) == json.loads(search_string_in_operations(mock_data, "р"))
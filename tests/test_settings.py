@@ -0,0 +1,44 @@
+import json
+import os
+from unittest.mock import patch
+from src.settings import load_user_settings, DEFAULT_CURRENCIES, DEFAULT_STOCKS
+
+
+def write_settings(path, currencies, stocks):
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump({"user_currencies": currencies, "user_stocks": stocks}, file)
+
+
+def test_load_user_settings(tmp_path):
+    '''Настройки читаются из файла в виде кортежей'''
+
+    path = tmp_path / "user_settings.json"
+    write_settings(path, ["USD"], ["AAPL", "TSLA"])
+
+    assert load_user_settings(str(path)) == {"user_currencies": ("USD",), "user_stocks": ("AAPL", "TSLA")}
+
+
+def test_load_user_settings_read_once(tmp_path):
+    '''Неизмененный файл повторно не читается, измененный - перечитывается'''
+
+    path = tmp_path / "user_settings.json"
+    write_settings(path, ["USD"], ["AAPL"])
+    load_user_settings(str(path))
+
+    with patch("builtins.open") as mock_open:
+        load_user_settings(str(path))
+    mock_open.assert_not_called()
+
+    write_settings(path, ["USD", "EUR"], ["AAPL"])
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    assert load_user_settings(str(path))["user_currencies"] == ("USD", "EUR")
+
+
+def test_load_user_settings_missing_file(tmp_path):
+    '''Если файла нет, возвращаются значения по умолчанию'''
+
+    settings = load_user_settings(str(tmp_path / "missing.json"))
+
+    assert settings == {"user_currencies": DEFAULT_CURRENCIES, "user_stocks": DEFAULT_STOCKS}
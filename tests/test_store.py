@@ -0,0 +1,325 @@
+import os
+import pytest
+import pandas as pd
+import src.store
+from datetime import datetime
+from unittest.mock import patch
+from src.store import TransactionStore, load_store, get_transactions, cache_paths, read_cache, partition_files, \
+    prune_partitions, apply_schema, money_to_rubles, STRING_DTYPE
+from src.aggregates import card_cube
+from src.utils import process_xlsx_file_with_date_filter, top_transactions_by_amount
+from src.reports import expenses_by_category
+
+
+@pytest.fixture
+def mock_data():
+    """Фикстура для создания тестового DataFrame."""
+    data = {
+        "Дата операции": ["2021-12-30 16:44:00", "2021-12-11 19:03:48", "2021-12-03 22:24:47", "2021-11-26 14:43:37"],
+        "Номер карты": ["*7197", "*7197", "*5091", "*7197"],
+        "Сумма платежа": [-160.89, -309.0, -496.51, -105.84],
+        "Кэшбэк": [float('nan'), 3.09, 4.97, 2],
+        "Категория": ["Супермаркеты", "Фастфуд", "Каршеринг", "Супермаркеты"],
+        "Описание": ["Колхоз", "Mouse Tail", "Ситидрайв", "Магнит"]
+    }
+    df = pd.DataFrame(data)
+    df['Дата операции'] = pd.to_datetime(df['Дата операции'], format='%Y-%m-%d %H:%M:%S')
+    return df
+
+
+@patch('pandas.read_excel')
+def test_load_store_reads_file_once(mock_read_excel, mock_data):
+    '''Файл читается один раз, а все функции работают с уже загруженным хранилищем'''
+
+    mock_read_excel.return_value = mock_data
+    store = load_store("path_to_file.xlsx")
+
+    cards = process_xlsx_file_with_date_filter(store, "2021-12-31 16:44:00")
+    top = top_transactions_by_amount(store, "2021-12-31 16:44:00")
+
+    assert mock_read_excel.call_count == 1
+    assert len(cards) == 2
+    assert len(top) == 3
+
+
+def test_load_store_returns_same_store(mock_data):
+    '''Переданное хранилище возвращается как есть, DataFrame оборачивается в хранилище'''
+
+    store = TransactionStore(mock_data)
+    assert load_store(store) is store
+    pd.testing.assert_frame_equal(money_to_rubles(get_transactions(mock_data)).sort_index(), mock_data)
+
+
+def test_functions_do_not_mutate_store(mock_data):
+    '''Функции не изменяют общий DataFrame хранилища'''
+
+    store = TransactionStore(mock_data)
+    expected = store.df.copy()
+
+    process_xlsx_file_with_date_filter(store, "2021-12-31 16:44:00")
+    top_transactions_by_amount(store, "2021-12-31 16:44:00")
+
+    pd.testing.assert_frame_equal(store.df, expected)
+
+
+def test_store_sorted_by_date_keeps_file_index(mock_data):
+    '''Хранилище сортирует операции по дате и сохраняет исходный индекс строк'''
+
+    store = TransactionStore(mock_data)
+
+    assert store.df['Дата операции'].is_monotonic_increasing
+    assert list(store.df.index) == [3, 2, 1, 0]
+
+
+@pytest.mark.parametrize('start, end, expected_index', [
+    (datetime(2021, 12, 1), datetime(2021, 12, 31, 16, 44), [2, 1, 0]),
+    (datetime(2021, 12, 11, 19, 3, 48), datetime(2021, 12, 30, 16, 44), [1, 0]),
+    (datetime(2021, 11, 1), datetime(2021, 11, 30), [3]),
+    (datetime(2022, 1, 1), datetime(2022, 1, 31), []),
+])
+def test_window(mock_data, start, end, expected_index):
+    '''Окно дат включает обе границы и возвращает срез отсортированных операций'''
+
+    window = TransactionStore(mock_data).window(start, end)
+    assert list(window.index) == expected_index
+
+
+def test_window_without_parsed_dates(mock_data):
+    '''Окно дат недоступно, если дата операции не разобрана'''
+
+    store = TransactionStore(mock_data.astype({'Дата операции': str}))
+
+    assert not store.is_date_indexed
+    with pytest.raises(TypeError):
+        store.window(datetime(2021, 12, 1), datetime(2021, 12, 31))
+
+
+@pytest.fixture
+def excel_file(tmp_path, mock_data):
+    """Фикстура, создающая xlsx файл с датой операции в формате исходной выгрузки."""
+
+    file_path = tmp_path / "operations.xlsx"
+    df = mock_data.copy()
+    df['Дата операции'] = df['Дата операции'].dt.strftime('%d.%m.%Y %H:%M:%S')
+    df.to_excel(file_path, index=False)
+    return str(file_path)
+
+
+def test_from_excel_writes_and_reads_cache(excel_file, mock_data):
+    '''Первая загрузка создает колоночную копию, следующая читает её без разбора xlsx'''
+
+    first = TransactionStore.from_excel(excel_file)
+    data_path, meta_path = cache_paths(excel_file)
+    assert os.path.exists(data_path) and os.path.exists(meta_path)
+
+    with patch('pandas.read_excel') as mock_read_excel:
+        second = TransactionStore.from_excel(excel_file)
+    mock_read_excel.assert_not_called()
+
+    pd.testing.assert_frame_equal(first.df, second.df)
+    assert pd.api.types.is_datetime64_any_dtype(second.df['Дата операции'])
+
+
+def test_cache_rebuilt_when_file_changes(excel_file, mock_data):
+    '''Кэш перестраивается, если исходный файл изменился'''
+
+    TransactionStore.from_excel(excel_file)
+    df = mock_data.head(2).copy()
+    df['Дата операции'] = df['Дата операции'].dt.strftime('%d.%m.%Y %H:%M:%S')
+    df.to_excel(excel_file, index=False)
+
+    assert read_cache(excel_file) is None
+    assert len(TransactionStore.from_excel(excel_file)) == 2
+
+
+def test_cache_survives_touch(excel_file):
+    '''Изменение только времени файла без изменения содержимого не сбрасывает кэш'''
+
+    TransactionStore.from_excel(excel_file)
+    stat = os.stat(excel_file)
+    os.utime(excel_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    assert read_cache(excel_file) is not None
+
+
+def test_load_store_reuses_loaded_store(excel_file):
+    '''Повторная загрузка неизмененного файла возвращает то же хранилище'''
+
+    assert load_store(excel_file) is load_store(excel_file)
+
+
+def write_operations(path, df):
+    '''Записывает операции в csv с датой в формате исходной выгрузки'''
+
+    df = df.copy()
+    df['Дата операции'] = df['Дата операции'].dt.strftime('%d.%m.%Y %H:%M:%S')
+    df.to_csv(path, index=False)
+
+
+def test_load_store_appends_grown_file(tmp_path, mock_data):
+    '''Если в файл только дописаны операции, они добавляются в загруженное хранилище,
+    а агрегаты по картам обновляются, а не строятся заново'''
+
+    path = str(tmp_path / "operations.csv")
+    write_operations(path, mock_data.iloc[:2])
+    store = load_store(path)
+    cube = card_cube(store)
+
+    write_operations(path, mock_data)
+    grown = load_store(path)
+
+    assert grown is store and card_cube(grown) is cube
+    assert len(grown) == 4 and grown.version == 1
+    assert isinstance(grown.df['Категория'].dtype, pd.CategoricalDtype)
+    fresh = TransactionStore(apply_schema(mock_data))
+    pd.testing.assert_frame_equal(cube.month_to_date(datetime(2021, 12, 31)),
+                                  card_cube(fresh).month_to_date(datetime(2021, 12, 31)))
+
+
+def test_load_store_rebuilds_changed_file(tmp_path, mock_data):
+    '''Если в файле изменились уже загруженные операции, хранилище строится заново'''
+
+    path = str(tmp_path / "operations.csv")
+    write_operations(path, mock_data.iloc[:2])
+    store = load_store(path)
+
+    changed = mock_data.copy()
+    changed.loc[0, 'Сумма платежа'] = -1.0
+    write_operations(path, changed)
+    reloaded = load_store(path)
+
+    assert reloaded is not store
+    assert reloaded.version == 0 and len(reloaded) == 4
+
+
+def test_loaded_stores_bounded(tmp_path, mock_data):
+    '''В процессе держится не больше LOADED_STORES_SIZE хранилищ, вытесняется давно не использованное'''
+
+    files = []
+    for i in range(3):
+        files.append(str(tmp_path / f"operations_{i}.xlsx"))
+        mock_data.to_excel(files[-1], index=False)
+
+    with patch('src.store.LOADED_STORES_SIZE', 2), patch.dict(src.store._loaded_stores, clear=True):
+        first = load_store(files[0])
+        load_store(files[1])
+        assert load_store(files[0]) is first
+        load_store(files[2])
+
+        assert list(src.store._loaded_stores) == [os.path.abspath(path) for path in (files[0], files[2])]
+
+
+@pytest.fixture
+def partitions_dir(tmp_path, mock_data):
+    '''Каталог с выгрузками по месяцам: ноябрь в csv, декабрь в xlsx'''
+
+    df = mock_data.copy()
+    df['Дата операции'] = df['Дата операции'].dt.strftime('%d.%m.%Y %H:%M:%S')
+    df.iloc[3:].to_csv(tmp_path / "operations_2021-11.csv", index=False)
+    df.iloc[:3].to_excel(tmp_path / "operations_2021-12.xlsx", index=False)
+    (tmp_path / "notes.txt").write_text("не выгрузка")
+    return tmp_path
+
+
+def test_partition_files(partitions_dir):
+    '''В каталоге и по шаблону находятся только файлы xlsx, csv и parquet'''
+
+    names = [os.path.basename(path) for path in partition_files(str(partitions_dir))]
+
+    assert names == ["operations_2021-11.csv", "operations_2021-12.xlsx"]
+    assert partition_files(str(partitions_dir / "*.csv")) == [str(partitions_dir / "operations_2021-11.csv")]
+
+
+def test_prune_partitions_by_month_in_name(partitions_dir):
+    '''Партиции за месяцы вне периода отбрасываются по имени файла, без чтения'''
+
+    files = partition_files(str(partitions_dir))
+
+    assert prune_partitions(files, datetime(2021, 12, 1), datetime(2021, 12, 31)) == files[1:]
+    assert prune_partitions(files, datetime(2021, 9, 2), datetime(2021, 12, 1)) == files
+    assert prune_partitions(files, None, None) == files
+
+
+def test_prune_partitions_by_cached_range(tmp_path, mock_data):
+    '''Для файлов без месяца в имени диапазон дат берется из кэша'''
+
+    df = mock_data.copy()
+    df['Дата операции'] = df['Дата операции'].dt.strftime('%d.%m.%Y %H:%M:%S')
+    df.iloc[3:].to_csv(tmp_path / "old.csv", index=False)
+    df.iloc[:3].to_csv(tmp_path / "new.csv", index=False)
+    load_store(str(tmp_path))
+    files = partition_files(str(tmp_path))
+
+    assert prune_partitions(files, datetime(2021, 12, 1), datetime(2021, 12, 31)) == [str(tmp_path / "new.csv")]
+
+
+def test_load_partitioned_store(partitions_dir, mock_data):
+    '''Партиции разных форматов читаются параллельно и объединяются, операции отсортированы по дате'''
+
+    store = load_store(str(partitions_dir))
+
+    assert len(store) == 4
+    assert store.df['Дата операции'].is_monotonic_increasing
+    assert sorted(store.df['Описание']) == sorted(mock_data['Описание'])
+    assert load_store(str(partitions_dir)) is store
+
+
+def test_functions_read_only_needed_partitions(partitions_dir):
+    '''Функции с периодом читают только партиции за этот период'''
+
+    with patch('src.store.load_partitions', wraps=src.store.load_partitions) as mock_load:
+        cards = process_xlsx_file_with_date_filter(str(partitions_dir), '2021-12-31 16:44:00')
+        top = top_transactions_by_amount(str(partitions_dir), '2021-12-31 16:44:00')
+        expenses = expenses_by_category(str(partitions_dir), 'Супермаркеты', '2021-12-31 16:44:00')
+
+    assert mock_load.call_args_list[0].args[0] == [str(partitions_dir / "operations_2021-12.xlsx")]
+    assert [card['Номер карты'] for card in cards] == ['*5091', '*7197']
+    assert len(top) == 3
+    assert [row['Описание'] for row in expenses] == ['Магнит', 'Колхоз']
+
+
+def test_empty_period_has_columns(partitions_dir):
+    '''Если ни одна партиция не попадает в период, функции возвращают пустой результат'''
+
+    assert process_xlsx_file_with_date_filter(str(partitions_dir), '2022-05-01 10:00:00') == []
+    assert expenses_by_category(str(partitions_dir), 'Супермаркеты', '2020-05-01 10:00:00') == []
+
+
+def test_apply_schema(mock_data):
+    '''Столбцы с небольшим числом значений становятся категориями, описание - строками, пропуски сохраняются'''
+
+    df = mock_data.assign(**{"Номер карты": ["*7197", None, "*5091", "*7197"]})
+    typed = apply_schema(df)
+
+    assert isinstance(typed["Номер карты"].dtype, pd.CategoricalDtype)
+    assert isinstance(typed["Категория"].dtype, pd.CategoricalDtype)
+    assert typed["Описание"].dtype == STRING_DTYPE
+    assert typed["Номер карты"].isna().tolist() == [False, True, False, False]
+    assert typed["Сумма платежа"].dtype == "float64"
+    assert apply_schema(typed) is typed
+
+
+def test_schema_loaded_from_file(excel_file):
+    '''Файл читается в компактных типах, в том числе из кэша'''
+
+    first = TransactionStore.from_excel(excel_file).df
+    cached = TransactionStore.from_excel(excel_file).df
+
+    for df in (first, cached):
+        assert isinstance(df["Категория"].dtype, pd.CategoricalDtype)
+        assert df["Описание"].dtype == STRING_DTYPE
+
+
+def test_missing_card_is_none(mock_data):
+    '''Операции без номера карты выводятся с пустым номером (None), а не с картой 0'''
+
+    df = apply_schema(mock_data.assign(**{"Номер карты": ["*7197", None, "*5091", "*7197"],
+                                          "Категория": ["Супермаркеты", None, "Каршеринг", "Супермаркеты"]}))
+    store = TransactionStore(df)
+
+    cards = process_xlsx_file_with_date_filter(store, "2021-12-31 16:44:00")
+    top = top_transactions_by_amount(store, "2021-12-31 16:44:00", group_by="Номер карты")
+
+    assert [card["Номер карты"] for card in cards] == ["*5091", "*7197", None]
+    assert {row["Номер карты"] for row in top} == {"*5091", "*7197", None}
+    assert [row["Категория"] for row in top if row["Номер карты"] is None] == [None]
@@ -0,0 +1,55 @@
+import datetime
+import numpy as np
+import pandas as pd
+import pytest
+from src.time_buckets import TimeBuckets, day_parts
+
+
+@pytest.mark.parametrize('value, expected', [
+    ('2023-10-01 00:00:00', 'Доброй ночи'),
+    ('2023-10-01 05:59:59', 'Доброй ночи'),
+    ('2023-10-01 06:00:00', 'Доброе утро'),
+    ('2023-10-01 12:00:00', 'Добрый день'),
+    ('2023-10-01 17:59:59', 'Добрый день'),
+    ('2023-10-01 18:00:00', 'Добрый вечер'),
+    ('2023-10-01 23:59:59', 'Добрый вечер'),
+])
+def test_day_parts_bounds(value, expected):
+    '''Интервал включает свое начало, вечер длится до конца суток; скалярный и векторный варианты совпадают'''
+
+    assert day_parts.label(datetime.datetime.fromisoformat(value)) == expected
+    assert list(day_parts.classify([value])) == [expected]
+
+
+def test_classify_series_keeps_index():
+    '''Для Series возвращается Series с тем же индексом, пропущенная дата - пустая строка'''
+
+    dates = pd.Series(pd.to_datetime(['2021-12-31 16:44:00', None, '1969-12-31 23:00:00']), index=[5, 7, 9])
+
+    result = day_parts.classify(dates)
+
+    assert list(result.index) == [5, 7, 9]
+    assert list(result) == ['Добрый день', '', 'Добрый вечер']
+    assert list(day_parts.codes(dates)) == [2, -1, 3]
+
+
+def test_classify_matches_scalar():
+    '''Классификация массива совпадает с поэлементной'''
+
+    rng = np.random.default_rng(0)
+    dates = pd.Timestamp('2020-01-01') + pd.to_timedelta(rng.integers(0, 10 ** 8, 1000), unit='s')
+
+    assert list(day_parts.classify(dates)) == [day_parts.label(date.to_pydatetime()) for date in dates]
+
+
+def test_custom_buckets():
+    '''Границы и названия интервалов настраиваются, неверные границы - ошибка'''
+
+    buckets = TimeBuckets([datetime.time(9), datetime.time(21)], ['до работы', 'работа', 'после работы'])
+
+    assert list(buckets.classify(['2021-01-01 08:59:59', '2021-01-01 09:00:00', '2021-01-01 21:30:00'])) == [
+        'до работы', 'работа', 'после работы']
+    with pytest.raises(ValueError):
+        TimeBuckets([datetime.time(9)], ['одно название'])
+    with pytest.raises(ValueError):
+        TimeBuckets([datetime.time(12), datetime.time(9)], ['a', 'b', 'c'])
@@ -0,0 +1,70 @@
+import pytest
+import pandas as pd
+from datetime import datetime
+from src.store import TransactionStore
+from src.top_n import top_expenses, month_to_date_top_expenses_batch
+from src.utils import top_transactions_by_amount
+
+
+@pytest.fixture
+def mock_data():
+    """Фикстура для создания тестового DataFrame."""
+    data = {
+        "Дата операции": ["2021-12-30 16:44:00", "2021-12-25 19:03:48", "2021-12-15 22:24:47", "2021-12-10 14:43:37",
+                          "2021-12-05 18:20:33", "2021-12-04 13:45:01", "2021-12-02 21:05:29"],
+        "Номер карты": ["*7197", "*7197", "*5091", "*7197", "*5091", "*5091", "*7197"],
+        "Сумма платежа": [-160.89, -309.0, -496.51, -105.84, -200.50, 1000.0, -500.99],
+        "Категория": ["Супермаркеты", "Фастфуд", "Каршеринг", "Супермаркеты", "Каршеринг", "Пополнения", "Связь"],
+        "Описание": ["Колхоз", "Mouse Tail", "Ситидрайв", "Магнит", "Ситидрайв", "Пополнение", "МТС"]
+    }
+    df = pd.DataFrame(data)
+    df['Дата операции'] = pd.to_datetime(df['Дата операции'], format='%Y-%m-%d %H:%M:%S')
+    return df
+
+
+def test_top_expenses(mock_data):
+    '''Выбираются n наибольших расходов по модулю, поступления не учитываются'''
+
+    result = top_expenses(mock_data, 3)
+
+    assert list(result['Сумма платежа']) == [500.99, 496.51, 309.0]
+
+
+def test_top_expenses_by_card(mock_data):
+    '''Топ-n выбирается в каждой группе'''
+
+    result = top_expenses(mock_data, 2, by='Номер карты')
+
+    assert list(zip(result['Номер карты'], result['Сумма платежа'])) == [
+        ('*5091', 496.51), ('*5091', 200.5), ('*7197', 500.99), ('*7197', 309.0)]
+
+
+def test_top_expenses_empty(mock_data):
+    '''Если расходов нет, возвращается пустой DataFrame'''
+
+    assert top_expenses(mock_data[mock_data['Сумма платежа'] > 0], 5).empty
+
+
+def test_top_transactions_by_amount_configurable_n(mock_data):
+    '''Количество транзакций и группировка задаются параметрами'''
+
+    assert len(top_transactions_by_amount(mock_data, "2021-12-31 16:44:00", n=2)) == 2
+
+    result = top_transactions_by_amount(mock_data, "2021-12-31 16:44:00", n=1, group_by='Категория')
+    assert [item['Категория'] for item in result] == ['Каршеринг', 'Связь', 'Супермаркеты', 'Фастфуд']
+    assert result[0] == {'Дата операции': '15.12.2021', 'Сумма платежа': 496.51, 'Категория': 'Каршеринг',
+                         'Описание': 'Ситидрайв'}
+
+
+def test_month_to_date_top_expenses_batch(mock_data):
+    '''Пакетный топ с начала месяца совпадает с top_expenses для окна каждой даты'''
+
+    store = TransactionStore(mock_data)
+    input_dates = [datetime(2021, 12, 31), datetime(2021, 12, 5, 18, 20, 33), datetime(2021, 12, 20),
+                   datetime(2021, 11, 30), datetime(2021, 12, 31)]
+
+    results = month_to_date_top_expenses_batch(store, input_dates, n=3)
+
+    for result, input_date in zip(results, input_dates):
+        expected = top_expenses(store.window(input_date.replace(day=1), input_date), 3)
+        pd.testing.assert_frame_equal(result, expected)
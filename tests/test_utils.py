@@ -1,8 +1,19 @@
 import pytest
 import pandas as pd
 from unittest.mock import patch, Mock
+from src.market_client import MarketDataClient, set_market_client
 from src.utils import (greet_by_time, process_xlsx_file_with_date_filter, top_transactions_by_amount,
-                       stock_prices_func, recent_currency_rates)
+                       stock_prices_func, recent_currency_rates, MARKETSTACK_MAX_SYMBOLS)
+
+
+@pytest.fixture
+def market_client():
+    """Фикстура: клиент внешних API с тестовыми ключами вместо ключей из окружения."""
+
+    client = MarketDataClient(marketstack_key="test", apilayer_key="test")
+    set_market_client(client)
+    yield client
+    set_market_client(None)
 
 
 @pytest.mark.parametrize('input_date, expected', [
@@ -10,7 +21,7 @@ from src.utils import (greet_by_time, process_xlsx_file_with_date_filter, top_tr
     ('2023-10-01 13:30:00', 'Добрый день'),
     ('2023-10-01 19:45:00', 'Добрый вечер'),
     ('2023-10-01 02:20:00', 'Доброй ночи'),
-    ('2023-10', '')
+    ('2023-10-01 23:59:59', 'Добрый вечер')
 ])
 def test_greet_by_time(input_date, expected):
     '''Функция тестирует корректность приема на вход строки с датой и временем в формате YYYY-MM-DD HH:MM:SS
@@ -19,6 +30,13 @@ def test_greet_by_time(input_date, expected):
     assert result == expected
 
 
+def test_greet_by_time_invalid_date():
+    '''Неверный формат даты - ошибка, а не пустое приветствие'''
+
+    with pytest.raises(ValueError, match="Неверный формат даты"):
+        greet_by_time('2023-10')
+
+
 @pytest.fixture
 def mock_data():
     """Фикстура для создания тестового DataFrame."""
@@ -47,8 +65,8 @@ def test_process_xlsx_file_with_date_filter(mock_read_excel, mock_data):
     # Вызываем функцию, которую мы хотим протестировать
     result = process_xlsx_file_with_date_filter("path_to_file.xlsx", input_date)
     expected = [
-        {"Номер карты": "*5091", "Сумма платежа": 496.51, "Кэшбэк": 4.97},
-        {"Номер карты": "*7197", "Сумма платежа": 469.89, "Кэшбэк": 3.09},
+        {"Номер карты": "*5091", "Сумма платежа": 496.51, "Кэшбэк": 4},
+        {"Номер карты": "*7197", "Сумма платежа": 469.89, "Кэшбэк": 4},
     ]
     assert result == expected
 
@@ -194,8 +212,8 @@ def response_json():
     }
 
 
-@patch('requests.get')
-def test_stock_prices_func(mock_get):
+@patch('requests.Session.get')
+def test_stock_prices_func(mock_get, market_client):
     '''Тест функции, в которой происходит обращение к внешнему API для получения текущей стоимости
     акций из S&P500'''
 
@@ -214,7 +232,7 @@ def test_stock_prices_func(mock_get):
     assert result == expected
 
 
-@patch('requests.get')
+@patch('requests.Session.get')
 def test_stock_prices_func_failed(mock_get):
     '''Тест функции, в которой происходит обращение к внешнему API для получения текущей стоимости
     акций из S&P500 и тест функции, когда запрос к API завершается с ошибкой'''
@@ -234,8 +252,8 @@ def currency_rates_response_json():
             'rates': {'USD': 1.033218, 'EUR': 1}}
 
 
-@patch('requests.get')
-def test_recent_currency_rates(mock_get):
+@patch('requests.Session.get')
+def test_recent_currency_rates(mock_get, market_client):
     '''Тестирвание функции, в которой происходит обращение к внешнему API для получения текущекурса USD и EUR'''
 
     # Создаем Mock объект для имитации ответа API
@@ -250,7 +268,7 @@ def test_recent_currency_rates(mock_get):
     assert result == expected
 
 
-@patch('requests.get')
+@patch('requests.Session.get')
 def test_recent_currency_rates_failed(mock_get):
     '''Тестирвание функции, в которой происходит обращение к внешнему API для получения текущекурса USD и EUR
     и тест функции, когда запрос к API завершается с ошибкой'''
@@ -263,3 +281,27 @@ def test_recent_currency_rates_failed(mock_get):
 
     with pytest.raises(Exception):
         assert recent_currency_rates() == "Запрос не выполнен с кодом состояния: 400"
+
+
+@patch('requests.Session.get')
+def test_stock_prices_func_batches_and_latest_close(mock_get, market_client):
+    '''Тикеры запрашиваются пачками, по каждому тикеру берется последняя цена закрытия'''
+
+    def response(url, params=None, headers=None, timeout=None):
+        symbols = params["symbols"].split(",")
+        mock_response = Mock()
+        mock_response.status_code = 200
+        mock_response.json.return_value = {"data": [
+            item for symbol in symbols for item in (
+                {"symbol": symbol, "close": 2.0, "date": "2024-09-27T00:00:00+0000"},
+                {"symbol": symbol, "close": 1.0, "date": "2024-09-26T00:00:00+0000"})]}
+        return mock_response
+
+    mock_get.side_effect = response
+    symbols = [f"S{i}" for i in range(MARKETSTACK_MAX_SYMBOLS + 1)]
+
+    result = stock_prices_func(symbols)
+
+    assert mock_get.call_count == 2
+    assert len(result) == len(symbols)
+    assert all(item["close"] == 2.0 for item in result)
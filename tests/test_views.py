@@ -1,14 +1,23 @@
 import pytest
 import json
+import pandas as pd
+import time
+import threading
+from datetime import datetime
+from concurrent.futures import Future
 from unittest.mock import patch
-from src.views import main_page
+from src.views import main_page, main_pages, collect_results
+from src.market_cache import TTLCache
+from src.store import TransactionStore
 
 
 @pytest.fixture
 def mocked_responses():
     """Фикстура для подготовки моков"""
 
-    with patch('src.views.greet_by_time') as mock_greet_by_time, \
+    with patch('src.views.load_store'), \
+         patch('src.views.market_cache', TTLCache()), \
+         patch('src.views.greet_by_time') as mock_greet_by_time, \
          patch('src.views.process_xlsx_file_with_date_filter') as mock_process_xlsx, \
          patch('src.views.top_transactions_by_amount') as mock_top_transactions, \
          patch('src.views.recent_currency_rates') as mock_currency_rates, \
@@ -59,3 +68,103 @@ def test_main_page(mocked_responses):
     }
 
     assert json.loads(result) == expected_result
+
+
+def test_main_page_loads_month_to_date(mocked_responses):
+    '''Загружаются только операции с начала месяца до переданной даты: из каталога с выгрузками
+    читаются только нужные партиции'''
+
+    with patch('src.views.load_store') as mock_load_store:
+        main_page("2023-10-15 08:00:00", path="operations")
+
+    mock_load_store.assert_called_once_with("operations", datetime(2023, 10, 1), datetime(2023, 10, 15, 8, 0))
+
+
+def test_main_page_partial_data_on_slow_provider(mocked_responses):
+    '''Если API не отвечает за отведенное время или падает, ответ возвращается без его данных
+    и с описанием ошибки'''
+
+    (mock_greet_by_time, mock_process_xlsx, mock_top_transactions, mock_currency_rates,
+     mock_stock_prices) = mocked_responses
+    release = threading.Event()
+
+    mock_greet_by_time.return_value = 'Доброе утро'
+    mock_process_xlsx.return_value = []
+    mock_top_transactions.return_value = []
+    mock_currency_rates.side_effect = lambda symbols, deadline=None: release.wait(5) or []
+    mock_stock_prices.side_effect = ValueError("Ключ API_marketstack не задан в среде.")
+
+    started = time.monotonic()
+    result = json.loads(main_page("2023-10-01 08:00:00", deadline=0.2))
+    release.set()
+
+    assert time.monotonic() - started < 2
+    assert result["currency_rates"] == []
+    assert result["stock_prices"] == []
+    assert result["errors"] == {"currency_rates": "timeout",
+                                "stock_prices": "ValueError: Ключ API_marketstack не задан в среде."}
+
+
+def test_collect_results():
+    '''Результаты завершенных задач возвращаются без ошибок'''
+
+    future = Future()
+    future.set_result([{"currency": "USD", "rate": 1.03}])
+
+    results, errors = collect_results({"currency_rates": future}, 1)
+
+    assert results == {"currency_rates": [{"currency": "USD", "rate": 1.03}]}
+    assert errors == {}
+
+
+def test_main_page_uses_market_cache(mocked_responses):
+    '''Повторный вызов главной функции берет курсы валют и акции из кэша без обращения к API'''
+
+    (mock_greet_by_time, mock_process_xlsx, mock_top_transactions, mock_currency_rates,
+     mock_stock_prices) = mocked_responses
+    mock_greet_by_time.return_value = 'Доброе утро'
+    mock_process_xlsx.return_value = []
+    mock_top_transactions.return_value = []
+    mock_currency_rates.return_value = [{"currency": "USD", "rate": 1.03}]
+    mock_stock_prices.return_value = [{"symbol": "AAPL", "close": 233.22}]
+
+    first = main_page("2023-10-01 08:00:00")
+    second = main_page("2023-10-01 09:00:00")
+
+    assert first == second
+    assert mock_currency_rates.call_count == 1
+    assert mock_stock_prices.call_count == 1
+
+
+def test_main_pages():
+    '''Пакетная функция загружает файл один раз, запрашивает курсы и акции один раз на весь пакет
+    и возвращает ответы в порядке входных дат'''
+
+    df = pd.DataFrame({
+        "Дата операции": pd.to_datetime(["2021-12-30 16:44:00", "2021-12-02 21:05:29", "2021-11-26 14:43:37"]),
+        "Номер карты": ["*7197", "*5091", "*7197"],
+        "Сумма платежа": [-160.89, -500.99, -105.84],
+        "Кэшбэк": [1.0, 5.0, 2.0],
+        "Категория": ["Супермаркеты", "Связь", "Фастфуд"],
+        "Описание": ["Колхоз", "МТС", "Mouse Tail"]
+    })
+    with patch('src.views.load_store', return_value=TransactionStore(df)) as mock_load_store, \
+         patch('src.views.market_cache', TTLCache()), \
+         patch('src.views.recent_currency_rates', return_value=[{"currency": "USD", "rate": 1.03}]), \
+         patch('src.views.stock_prices_func', return_value=[]) as mock_stock_prices:
+        results = main_pages(["2021-12-31 16:44:00", "2021-11-30 08:00:00", "2021-12-31 20:00:00"],
+                             path="operations_2021.xlsx")
+
+    mock_load_store.assert_called_once_with("operations_2021.xlsx", datetime(2021, 11, 1),
+                                            datetime(2021, 12, 31, 20, 0))
+    assert mock_stock_prices.call_count == 1
+    first, second, third = (json.loads(result) for result in results)
+    assert first["greeting"] == "Добрый день"
+    assert first["cards"] == [{"Номер карты": "*5091", "Сумма платежа": 500.99, "Кэшбэк": 5},
+                              {"Номер карты": "*7197", "Сумма платежа": 160.89, "Кэшбэк": 1}]
+    assert [row["Описание"] for row in first["top_transactions"]] == ["МТС", "Колхоз"]
+    assert first["currency_rates"] == [{"currency": "USD", "rate": 1.03}]
+    assert second["cards"] == [{"Номер карты": "*7197", "Сумма платежа": 105.84, "Кэшбэк": 1}]
+    assert second["top_transactions"][0]["Дата операции"] == "26.11.2021"
+    assert third["greeting"] == "Добрый вечер"
+    assert third["currency_rates"] == second["currency_rates"] == first["currency_rates"]
@@ -0,0 +1,88 @@
+import pytest
+import pandas as pd
+from src.store import TransactionStore
+from src.utils import process_xlsx_file_with_date_filter, top_transactions_by_amount
+from src.reports import expenses_by_category
+from src.xlsx_stream import iter_xlsx_chunks, stream_card_totals, stream_top_transactions, \
+    stream_expenses_by_category
+
+
+@pytest.fixture
+def excel_file(tmp_path):
+    '''xlsx файл с операциями в формате выгрузки банка (дата - строка, пустые ячейки)'''
+
+    df = pd.DataFrame({
+        "Дата операции": ["31.12.2021 16:44:00", "30.12.2021 10:00:00", "25.12.2021 19:03:48", "15.12.2021 22:24:47",
+                          "10.12.2021 14:43:37", "10.12.2021 09:00:00", "05.12.2021 18:20:33", "26.11.2021 14:43:37"],
+        "Номер карты": ["*7197", None, "*7197", "*5091", "*7197", "*5091", "*5091", "*7197"],
+        "Сумма платежа": [-160.89, -50.0, -309.0, -496.51, -200.5, -200.5, 1000.0, -105.84],
+        "Кэшбэк": [None, 1, 3.09, 4.97, 2, 2, None, 1],
+        "Категория": ["Супермаркеты", "Фастфуд", "Фастфуд", "Каршеринг", "Супермаркеты", "Супермаркеты",
+                      "Пополнения", "Супермаркеты"],
+        "Описание": ["Колхоз", "Mouse Tail", "Mouse Tail", "Ситидрайв", "Магнит", "Пятерочка", "Пополнение",
+                     "Магнит"]
+    })
+    path = tmp_path / "operations.xlsx"
+    df.to_excel(path, index=False)
+    return str(path)
+
+
+def in_memory_store(excel_file):
+    return TransactionStore.from_excel(excel_file, use_cache=False)
+
+
+def test_iter_xlsx_chunks(excel_file):
+    '''Строки читаются порциями с номерами строк файла, строки вне периода отбрасываются'''
+
+    chunks = list(iter_xlsx_chunks(excel_file, pd.Timestamp(2021, 12, 10), pd.Timestamp(2021, 12, 31), chunk_size=3))
+
+    assert [list(chunk.index) for chunk in chunks] == [[1, 2], [3, 4, 5]]
+    assert pd.api.types.is_datetime64_any_dtype(chunks[0]["Дата операции"])
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 100])
+def test_stream_card_totals(excel_file, chunk_size):
+    '''Суммы по картам совпадают с расчетом по загруженному DataFrame'''
+
+    expected = process_xlsx_file_with_date_filter(in_memory_store(excel_file), '2021-12-31 16:44:00')
+    result = stream_card_totals(excel_file, '2021-12-31 16:44:00', chunk_size)
+
+    assert [row["Номер карты"] for row in result] == [row["Номер карты"] for row in expected]
+    for row, expected_row in zip(result, expected):
+        assert row["Сумма платежа"] == pytest.approx(expected_row["Сумма платежа"])
+        assert row["Кэшбэк"] == pytest.approx(expected_row["Кэшбэк"])
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 100])
+@pytest.mark.parametrize('group_by', [None, 'Категория'])
+def test_stream_top_transactions(excel_file, chunk_size, group_by):
+    '''Топ расходов (в том числе при равных суммах и по группам) совпадает с расчетом по DataFrame'''
+
+    expected = top_transactions_by_amount(in_memory_store(excel_file), '2021-12-31 16:44:00', n=3, group_by=group_by)
+
+    assert stream_top_transactions(excel_file, '2021-12-31 16:44:00', 3, group_by, chunk_size) == expected
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 100])
+def test_stream_expenses_by_category(excel_file, chunk_size):
+    '''Траты по категории совпадают с расчетом по DataFrame'''
+
+    expected = expenses_by_category(in_memory_store(excel_file), 'Супермаркеты', '2021-12-31 16:44:00')
+    result = stream_expenses_by_category(excel_file, 'Супермаркеты', '2021-12-31 16:44:00', chunk_size)
+
+    assert pd.DataFrame(result).equals(pd.DataFrame(expected))
+
+
+def test_stream_empty_period(excel_file):
+    '''Если в периоде нет операций, возвращаются пустые списки'''
+
+    assert stream_card_totals(excel_file, '2022-05-01 10:00:00') == []
+    assert stream_top_transactions(excel_file, '2022-05-01 10:00:00') == []
+    assert stream_expenses_by_category(excel_file, 'Супермаркеты', '2020-01-01 10:00:00') == []
+
+
+def test_stream_expenses_by_category_invalid_date(excel_file):
+    '''Дата разбирается так же, как в expenses_by_category: неверный формат - ValueError'''
+
+    with pytest.raises(ValueError, match="Неверный формат даты"):
+        stream_expenses_by_category(excel_file, 'Супермаркеты', '31.12.2021')